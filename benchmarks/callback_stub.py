@@ -0,0 +1,84 @@
+"""
+Local stand-in for the final callback receiver, for exercising delivery retries and dead-lettering.
+
+    STUB_FAIL_RATE=0.3 STUB_LATENCY_MS=50 uvicorn benchmarks.callback_stub:app --port 9000
+    GUVI_CALLBACK_URL=http://localhost:9000/callback ...
+
+- POST /callback   accepts a payload; fails with 503 at STUB_FAIL_RATE, after STUB_LATENCY_MS
+- POST /callback/batch  bulk endpoint ({"callbacks": [...]} or NDJSON); per-item results, each
+                   item failing at STUB_FAIL_RATE (CALLBACK_BATCH_URL=http://localhost:9000/callback/batch)
+- GET  /received   payloads accepted so far (with per-session delivery counts)
+- POST /reset      clear the recorded payloads
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+from collections import Counter
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+FAIL_RATE = float(os.getenv("STUB_FAIL_RATE", "0"))
+LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "0"))
+
+app = FastAPI(title="Callback receiver stub")
+received: list[dict] = []
+batches: list[int] = []
+attempts = Counter()
+
+
+@app.post("/callback")
+async def callback(request: Request):
+    payload = await request.json()
+    attempts[payload.get("sessionId")] += 1
+    if LATENCY_MS:
+        await asyncio.sleep(LATENCY_MS / 1000)
+    if random.random() < FAIL_RATE:
+        return JSONResponse({"status": "unavailable"}, status_code=503)
+    received.append(payload)
+    return {"status": "ok"}
+
+
+@app.post("/callback/batch")
+async def callback_batch(request: Request):
+    raw = (await request.body()).decode("utf-8")
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        items = [json.loads(line) for line in raw.splitlines() if line.strip()]
+    else:
+        items = json.loads(raw)["callbacks"]
+
+    batches.append(len(items))
+    if LATENCY_MS:
+        await asyncio.sleep(LATENCY_MS / 1000)
+
+    results = []
+    for payload in items:
+        attempts[payload.get("sessionId")] += 1
+        if random.random() < FAIL_RATE:
+            results.append({"sessionId": payload.get("sessionId"), "status": "error"})
+        else:
+            received.append(payload)
+            results.append({"sessionId": payload.get("sessionId"), "status": "ok"})
+    return {"results": results}
+
+
+@app.get("/received")
+async def get_received():
+    return {
+        "count": len(received),
+        "sessions": Counter(p.get("sessionId") for p in received),
+        "attempts": attempts,
+        "batches": batches,
+        "payloads": received,
+    }
+
+
+@app.post("/reset")
+async def reset():
+    received.clear()
+    batches.clear()
+    attempts.clear()
+    return {"status": "ok"}
@@ -0,0 +1,205 @@
+"""
+Local stand-in for the OpenAI Responses API, for load tests that shouldn't spend tokens.
+
+    FAKE_LLM_LATENCY_MS=400 uvicorn benchmarks.fake_openai:app --port 9100
+    OPENAI_BASE_URL=http://localhost:9100/v1 OPENAI_API_KEY=test ...
+
+The SDK picks OPENAI_BASE_URL up by itself, so the app runs unmodified. Every call the app
+makes is answered in the shape it expects:
+- agent turn (json_schema "agent_turn")  -> {"reply", "should_stop", "reason"}
+- two-call tool choice (tool_choice=auto) -> evaluate_stop_condition function call
+- two-call reply / anything else          -> a persona reply
+- extractor / keyword / summary prompts   -> empty intel, a few keywords, one sentence
+stream=true is served as SSE events (response.output_text.delta ... response.completed).
+
+Knobs (env):
+- FAKE_LLM_LATENCY_MS / FAKE_LLM_JITTER_MS  base latency per call and uniform +/- jitter (400 / 100)
+- FAKE_LLM_CHUNK_MS     delay between streamed chunks; the base latency is spent before the first (15)
+- FAKE_LLM_STOP_RATE    probability an agent turn asks to stop (0)
+- FAKE_LLM_ERROR_RATE   probability of a 429, to exercise the client's retries (0)
+- FAKE_LLM_CACHED_RATIO share of input tokens reported as cached when prompt_cache_key is set (0.8)
+
+- GET  /stats   calls so far, per kind
+- POST /reset   clear the counters
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from collections import Counter
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "400"))
+JITTER_MS = float(os.getenv("FAKE_LLM_JITTER_MS", "100"))
+CHUNK_MS = float(os.getenv("FAKE_LLM_CHUNK_MS", "15"))
+STOP_RATE = float(os.getenv("FAKE_LLM_STOP_RATE", "0"))
+ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+CACHED_RATIO = float(os.getenv("FAKE_LLM_CACHED_RATIO", "0.8"))
+
+REPLIES = [
+    "Sir which bank are you calling from? I have two accounts.",
+    "Okay wait, my phone is very slow. What do I have to do first?",
+    "I am not understanding, can you send the details again slowly?",
+    "Network is bad here sir. Which UPI ID should I send it to?",
+    "Let me find my glasses. Can you tell me your employee ID once?",
+    "My son usually does this for me. Is there a number I can call back?",
+]
+
+app = FastAPI(title="Responses API stub")
+calls = Counter()
+
+
+def _system_text(body: dict) -> str:
+    items = body.get("input")
+    if not isinstance(items, list):
+        return ""
+    for item in items:
+        if isinstance(item, dict) and item.get("role") == "system":
+            return str(item.get("content", ""))
+    return ""
+
+
+def classify(body: dict) -> str:
+    fmt = (body.get("text") or {}).get("format") or {}
+    if fmt.get("name") == "agent_turn":
+        return "agent_turn"
+    if body.get("tools"):
+        return "decide" if body.get("tool_choice") == "auto" else "reply"
+    system = _system_text(body).lower()
+    if "information extractor" in system:
+        return "extract"
+    if "keyword extractor" in system:
+        return "keywords"
+    if "running summary" in system:
+        return "memory_summary"
+    if "summarizer" in system:
+        return "behaviour_summary"
+    return "other"
+
+
+def output_for(kind: str) -> tuple[str, dict | None]:
+    """(output text, function call) for one call of the given kind."""
+    stop = random.random() < STOP_RATE
+    if kind == "agent_turn":
+        return json.dumps({
+            "reply": random.choice(REPLIES),
+            "should_stop": stop,
+            "reason": "Scammer repeated the same request" if stop else "",
+        }), None
+    if kind == "decide":
+        args = {"should_stop": stop, "reason": "Scammer repeated the same request" if stop else ""}
+        return "", {"name": "evaluate_stop_condition", "arguments": json.dumps(args)}
+    if kind == "extract":
+        return json.dumps({"upiIds": [], "phishingLinks": [], "phoneNumbers": [], "bankAccounts": [], "emailAddresses": []}), None
+    if kind == "keywords":
+        return json.dumps({"keywords": ["otp", "urgent", "kyc"]}), None
+    if kind in ("memory_summary", "behaviour_summary"):
+        return "The scammer impersonated a bank official and pressed for an OTP and a UPI transfer.", None
+    return random.choice(REPLIES), None
+
+
+def usage(body: dict, text: str) -> dict:
+    input_tokens = len(json.dumps(body.get("input", ""), default=str)) // 4
+    cached = int(input_tokens * CACHED_RATIO) if body.get("prompt_cache_key") and input_tokens >= 1024 else 0
+    output_tokens = len(text) // 4 + 1
+    return {
+        "input_tokens": input_tokens,
+        "input_tokens_details": {"cached_tokens": cached},
+        "output_tokens": output_tokens,
+        "output_tokens_details": {"reasoning_tokens": 0},
+        "total_tokens": input_tokens + output_tokens,
+    }
+
+
+def response_object(body: dict, text: str, function_call: dict | None) -> dict:
+    if function_call is not None:
+        output = [{
+            "type": "function_call",
+            "id": f"fc_{uuid.uuid4().hex[:12]}",
+            "call_id": f"call_{uuid.uuid4().hex[:12]}",
+            "status": "completed",
+            **function_call,
+        }]
+    else:
+        output = [{
+            "type": "message",
+            "id": f"msg_{uuid.uuid4().hex[:12]}",
+            "role": "assistant",
+            "status": "completed",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }]
+    return {
+        "id": f"resp_{uuid.uuid4().hex}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": body.get("model", "fake"),
+        "status": "completed",
+        "output": output,
+        "parallel_tool_calls": True,
+        "tool_choice": body.get("tool_choice", "auto"),
+        "tools": body.get("tools", []),
+        "usage": usage(body, text),
+    }
+
+
+async def _latency() -> None:
+    delay = max(0.0, LATENCY_MS + random.uniform(-JITTER_MS, JITTER_MS))
+    await asyncio.sleep(delay / 1000)
+
+
+def _sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def _stream(body: dict, text: str, function_call: dict | None):
+    resp = response_object(body, text, function_call)
+    seq = 0
+    yield _sse({"type": "response.created", "response": {**resp, "status": "in_progress", "output": []}, "sequence_number": seq})
+    await _latency()
+    item_id = resp["output"][0]["id"]
+    # Roughly token-sized chunks
+    for i in range(0, len(text), 12):
+        seq += 1
+        yield _sse({
+            "type": "response.output_text.delta", "item_id": item_id, "output_index": 0, "content_index": 0,
+            "delta": text[i:i + 12], "logprobs": [], "sequence_number": seq,
+        })
+        if CHUNK_MS:
+            await asyncio.sleep(CHUNK_MS / 1000)
+    seq += 1
+    yield _sse({"type": "response.completed", "response": resp, "sequence_number": seq})
+
+
+@app.post("/v1/responses")
+async def responses(request: Request):
+    body = await request.json()
+    kind = classify(body)
+    calls[kind] += 1
+
+    if random.random() < ERROR_RATE:
+        calls["rate_limited"] += 1
+        return JSONResponse({"error": {"message": "Rate limit reached (stub)", "type": "rate_limit_error"}}, status_code=429)
+
+    text, function_call = output_for(kind)
+    if body.get("stream"):
+        return StreamingResponse(_stream(body, text, function_call), media_type="text/event-stream")
+
+    await _latency()
+    return response_object(body, text, function_call)
+
+
+@app.get("/stats")
+async def stats():
+    return {"total": sum(v for k, v in calls.items() if k != "rate_limited"), "calls": calls}
+
+
+@app.post("/reset")
+async def reset():
+    calls.clear()
+    return {"status": "ok"}
@@ -0,0 +1,278 @@
+"""
+Concurrent multi-turn load test for /v1/message, with saved baselines for comparing changes.
+
+    # 1. dependencies: Redis, the Responses API stub and the callback receiver stub
+    docker run -d --rm -p 6379:6379 redis:7-alpine
+    uvicorn benchmarks.fake_openai:app --port 9100
+    uvicorn benchmarks.callback_stub:app --port 9000
+
+    # 2. the API (and worker) pointed at them, as in Local Development
+    export REDIS_HOST=localhost OPENAI_BASE_URL=http://localhost:9100/v1 OPENAI_API_KEY=test \
+           GUVI_CALLBACK_URL=http://localhost:9000/callback SCAM_GATE=false
+    uvicorn app.main:app --port 8000
+    python -m app.worker
+
+    # 3. load
+    python benchmarks/loadtest.py --sessions 200 --concurrency 50 --save-baseline benchmarks/baselines/main.json
+    python benchmarks/loadtest.py --sessions 200 --concurrency 50 --compare benchmarks/baselines/main.json --max-regression 10
+
+benchmarks/docker-compose.loadtest.yml starts steps 1-2 in one go.
+
+Each session replays one scenario from benchmarks/scenarios.json turn by turn, sending the
+growing conversationHistory (scammer messages + the API's replies) like the real client.
+Reported: turn latency p50/p95/p99, turns per second, status codes, and, when the stubs are
+reachable, LLM calls per turn by kind and callbacks received.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+# Lower is better for these; higher is better for rps
+_LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms", "llm_calls_per_turn", "error_rate")
+_HIGHER_IS_BETTER = ("rps",)
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class LoadRun:
+    def __init__(self, args: argparse.Namespace, scenarios: list[dict]):
+        self.args = args
+        self.scenarios = scenarios
+        self.latencies: list[float] = []
+        self.first_byte: list[float] = []
+        self.statuses: Counter = Counter()
+
+    async def turn(self, client: httpx.AsyncClient, body: dict) -> Optional[str]:
+        t0 = time.perf_counter()
+        try:
+            if self.args.stream:
+                reply = await self._stream_turn(client, body, t0)
+            else:
+                r = await client.post("/v1/message", json=body)
+                self.statuses[r.status_code] += 1
+                reply = r.json().get("reply") if r.status_code == 200 else None
+        except httpx.HTTPError as e:
+            self.statuses[type(e).__name__] += 1
+            return None
+        self.latencies.append((time.perf_counter() - t0) * 1000)
+        return reply
+
+    async def _stream_turn(self, client: httpx.AsyncClient, body: dict, t0: float) -> Optional[str]:
+        async with client.stream("POST", "/v1/message/stream", params={"format": "ndjson"}, json=body) as r:
+            self.statuses[r.status_code] += 1
+            if r.status_code != 200:
+                await r.aread()
+                return None
+            reply, first_delta = None, None
+            async for line in r.aiter_lines():
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                if event.get("type") == "delta" and first_delta is None:
+                    first_delta = (time.perf_counter() - t0) * 1000
+                elif event.get("type") == "done":
+                    reply = event.get("reply")
+            if first_delta is not None:
+                self.first_byte.append(first_delta)
+            return reply
+
+    async def session(self, client: httpx.AsyncClient, index: int) -> None:
+        scenario = self.scenarios[index % len(self.scenarios)]
+        session_id = f"load-{uuid.uuid4().hex[:12]}"
+        history: list[dict] = []
+        for text in scenario["turns"][:self.args.max_turns]:
+            message = {"sender": "scammer", "text": text, "timestamp": int(time.time() * 1000)}
+            body = {
+                "sessionId": session_id,
+                "message": message,
+                "conversationHistory": history,
+                "metadata": {"channel": "SMS", "language": scenario.get("language", "English"), "locale": "IN"},
+            }
+            reply = await self.turn(client, body)
+            if reply is None:
+                return
+            history = history + [message, {"sender": "user", "text": reply, "timestamp": int(time.time() * 1000)}]
+            if self.args.think_ms:
+                await asyncio.sleep(self.args.think_ms / 1000)
+
+    async def run(self) -> float:
+        sem = asyncio.Semaphore(self.args.concurrency)
+        limits = httpx.Limits(max_connections=self.args.concurrency, max_keepalive_connections=self.args.concurrency)
+        async with httpx.AsyncClient(
+            base_url=self.args.url, headers={"x-api-key": self.args.api_key}, timeout=self.args.timeout, limits=limits,
+        ) as client:
+            async def one(i: int) -> None:
+                async with sem:
+                    await self.session(client, i)
+
+            t0 = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(self.args.sessions)))
+            return time.perf_counter() - t0
+
+
+async def stub_get(url: Optional[str], path: str) -> Optional[dict]:
+    if not url:
+        return None
+    try:
+        async with httpx.AsyncClient(timeout=5) as client:
+            r = await client.get(url.rstrip("/") + path)
+            return r.json()
+    except httpx.HTTPError:
+        print(f"  (stub {url} not reachable, skipping)")
+        return None
+
+
+async def stub_post(url: Optional[str], path: str) -> None:
+    if not url:
+        return
+    try:
+        async with httpx.AsyncClient(timeout=5) as client:
+            await client.post(url.rstrip("/") + path)
+    except httpx.HTTPError:
+        pass
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def summarise(run: LoadRun, wall: float, llm_stats: Optional[dict], callbacks: Optional[dict]) -> dict:
+    lat = sorted(run.latencies)
+    turns = len(lat)
+    sent = sum(run.statuses.values())
+    results = {
+        "turns": turns,
+        "wall_seconds": round(wall, 3),
+        "rps": round(turns / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(lat, 50), 1),
+        "p95_ms": round(percentile(lat, 95), 1),
+        "p99_ms": round(percentile(lat, 99), 1),
+        "max_ms": round(lat[-1], 1) if lat else 0.0,
+        "error_rate": round(1 - run.statuses.get(200, 0) / sent, 4) if sent else 0.0,
+        "statuses": {str(k): v for k, v in run.statuses.items()},
+    }
+    if run.first_byte:
+        fb = sorted(run.first_byte)
+        results.update(first_delta_p50_ms=round(percentile(fb, 50), 1), first_delta_p95_ms=round(percentile(fb, 95), 1))
+    if llm_stats is not None and turns:
+        results["llm_calls_per_turn"] = round(llm_stats.get("total", 0) / turns, 3)
+        results["llm_calls"] = llm_stats.get("calls", {})
+    if callbacks is not None:
+        results["callbacks_received"] = callbacks.get("count", 0)
+    return results
+
+
+def print_results(results: dict) -> None:
+    print("\nResults")
+    for key in ("turns", "wall_seconds", "rps", "p50_ms", "p95_ms", "p99_ms", "max_ms", "first_delta_p50_ms",
+                "first_delta_p95_ms", "error_rate", "llm_calls_per_turn", "callbacks_received"):
+        if key in results:
+            print(f"  {key:<20} {results[key]}")
+    print(f"  {'statuses':<20} {results['statuses']}")
+    if results.get("llm_calls"):
+        print(f"  {'llm_calls':<20} {results['llm_calls']}")
+
+
+def compare(results: dict, baseline: dict, max_regression: Optional[float]) -> bool:
+    """Print metric deltas against a baseline; False when a metric regressed past max_regression percent."""
+    base = baseline["results"]
+    print(f"\nAgainst baseline {baseline.get('label') or ''} ({baseline.get('git_commit') or 'unknown commit'})")
+    ok = True
+    for key in _LOWER_IS_BETTER + _HIGHER_IS_BETTER:
+        if key not in results or key not in base:
+            continue
+        before, after = base[key], results[key]
+        change = ((after - before) / before * 100) if before else 0.0
+        worse = change > 0 if key in _LOWER_IS_BETTER else change < 0
+        flag = ""
+        if max_regression is not None and worse and abs(change) > max_regression and key != "error_rate":
+            flag, ok = "  REGRESSION", False
+        print(f"  {key:<20} {before:>10} -> {after:<10} ({change:+.1f}%){flag}")
+    return ok
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--api-key", default=os.getenv("API_KEY", "dev-secret-key"))
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10, help="sessions in flight at once")
+    parser.add_argument("--max-turns", type=int, default=12, help="cap on turns replayed per scenario")
+    parser.add_argument("--think-ms", type=float, default=0, help="pause between a reply and the next scammer message")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--stream", action="store_true", help="use /v1/message/stream and report time to first delta")
+    parser.add_argument("--scenarios", default=str(Path(__file__).with_name("scenarios.json")))
+    parser.add_argument("--llm-stub", default="http://localhost:9100", help="fake_openai base URL for call counts; empty to skip")
+    parser.add_argument("--callback-stub", default="http://localhost:9000", help="callback_stub base URL; empty to skip")
+    parser.add_argument("--drain-seconds", type=float, default=5, help="wait for queued callbacks before reading the receiver")
+    parser.add_argument("--label", default="")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    parser.add_argument("--max-regression", type=float, metavar="PCT",
+                        help="with --compare, exit 1 when latency, rps or LLM calls per turn regress by more than PCT percent")
+    args = parser.parse_args()
+
+    with open(args.scenarios, encoding="utf-8") as f:
+        scenarios = json.load(f)
+
+    await stub_post(args.llm_stub, "/reset")
+    await stub_post(args.callback_stub, "/reset")
+
+    print(f"Replaying {args.sessions} sessions ({len(scenarios)} scenarios), concurrency {args.concurrency}, "
+          f"{'stream' if args.stream else 'blocking'} endpoint, against {args.url}")
+    run = LoadRun(args, scenarios)
+    wall = await run.run()
+
+    # Close-time work (worker summaries, callbacks) lands after the last turn
+    if args.llm_stub or args.callback_stub:
+        await asyncio.sleep(args.drain_seconds)
+    llm_stats = await stub_get(args.llm_stub, "/stats")
+    callbacks = await stub_get(args.callback_stub, "/received")
+
+    results = summarise(run, wall, llm_stats, callbacks)
+    print_results(results)
+
+    if args.save_baseline:
+        path = Path(args.save_baseline)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        record = {
+            "label": args.label,
+            "git_commit": git_commit(),
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "args": {k: v for k, v in vars(args).items() if k not in ("api_key", "save_baseline", "compare")},
+            "results": results,
+        }
+        path.write_text(json.dumps(record, indent=2) + "\n", encoding="utf-8")
+        print(f"\nBaseline saved to {path}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            if not compare(results, json.load(f), args.max_regression):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,105 @@
+"""
+Parity + latency/memory comparison of the torch and ONNX Runtime scam gate backends.
+
+    PYTHONPATH=. python benchmarks/scam_gate_onnx.py --model ./models/bert_scam_detector.pth
+
+`app` must resolve to `src` (as in the Docker image, where src is copied to /app).
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import time
+
+import numpy as np
+import psutil
+import torch
+
+from app.first_scam_gate import FirstLayerScamDetector
+from app.onnx_scam_gate import OnnxScamDetector
+
+CORPUS = [
+    "URGENT: Your SBI account has been compromised. Share OTP immediately.",
+    "Your account will be blocked in 2 hours. Share your account number and OTP to verify.",
+    "Dear customer, your KYC is pending. Click http://sbi-kyc-update.xyz to avoid suspension.",
+    "Congratulations! You won Rs 25,00,000 in KBC lottery. Pay Rs 5000 processing fee to claim.",
+    "Send Rs 10 to scammer.fraud@fakebank to activate your refund.",
+    "Hi, are we still meeting for lunch tomorrow?",
+    "Your electricity bill is due. Call 9876543210 immediately or power will be cut tonight.",
+    "Mom, I lost my phone, this is my new number. Please send 2000 on GPay urgently.",
+    "Your Amazon order #40512 has been shipped and will arrive on Monday.",
+    "Aapka bank khata band ho jayega, turant OTP bhejiye.",
+    "Reminder: your dentist appointment is at 4pm today.",
+    "Income tax refund of Rs 15,490 approved. Update your bank details at www.itr-refund.in",
+    "Hey, can you send me the notes from yesterday's class?",
+    "Your FedEx parcel is held at customs. Pay the duty using this link to release it.",
+    "Team meeting moved to 3pm, please update your calendars.",
+    "Your credit card reward points expire today. Redeem now by sharing card number and CVV.",
+]
+
+
+def rss_mb() -> float:
+    return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+
+
+def time_single(detector: FirstLayerScamDetector, rounds: int) -> list[float]:
+    samples = []
+    for _ in range(rounds):
+        for msg in CORPUS:
+            t0 = time.perf_counter()
+            detector.predict_message(msg.lower())
+            samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def summarise(name: str, samples: list[float], mem: float) -> None:
+    q = statistics.quantiles(samples, n=100)
+    print(f"{name:>6}: p50={q[49]:.1f}ms p95={q[94]:.1f}ms mean={statistics.fmean(samples):.1f}ms rss_delta={mem:.0f}MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="./models/bert_scam_detector.pth")
+    parser.add_argument("--onnx", default="./models/bert_scam_detector.int8.onnx")
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--atol", type=float, default=0.25, help="max abs logit diff tolerated for int8")
+    args = parser.parse_args()
+
+    base = rss_mb()
+    torch_det = FirstLayerScamDetector(device="cpu")
+    if not torch_det.load_model(args.model):
+        raise SystemExit(2)
+    torch_mem = rss_mb() - base
+
+    base = rss_mb()
+    onnx_det = OnnxScamDetector(args.onnx, intra_op_threads=args.threads)
+    if not onnx_det.load_model(args.model):
+        raise SystemExit(2)
+    onnx_mem = rss_mb() - base
+
+    # Parity on raw logits for the fixed corpus
+    enc_pt = torch_det.tokenizer([m.lower() for m in CORPUS], padding="longest", truncation=True,
+                                 max_length=torch_det.max_length, return_tensors="pt")
+    with torch.no_grad():
+        torch_logits = torch_det.model(enc_pt["input_ids"], enc_pt["attention_mask"]).numpy()
+    onnx_logits = onnx_det.logits(enc_pt["input_ids"].numpy(), enc_pt["attention_mask"].numpy())
+
+    max_diff = float(np.abs(torch_logits - onnx_logits).max())
+    agree = int((torch_logits.argmax(axis=1) == onnx_logits.argmax(axis=1)).sum())
+    print(f"parity: max|dlogit|={max_diff:.4f} argmax agreement={agree}/{len(CORPUS)}")
+
+    torch_samples = time_single(torch_det, args.rounds)
+    onnx_samples = time_single(onnx_det, args.rounds)
+    summarise("torch", torch_samples, torch_mem)
+    summarise("onnx", onnx_samples, onnx_mem)
+    print(f"onnx file: {os.path.getsize(args.onnx) / (1024 * 1024):.0f}MB, torch checkpoint: "
+          f"{os.path.getsize(args.model) / (1024 * 1024):.0f}MB")
+
+    if max_diff > args.atol or agree != len(CORPUS):
+        raise SystemExit("ONNX backend diverges from torch beyond tolerance")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Sync vs async Redis session store under concurrent sessions.
+
+    REDIS_HOST=localhost PYTHONPATH=. python benchmarks/session_store_bench.py --sessions 200 --turns 10
+
+Modes:
+- sync-inline: RedisSessionStore called directly from coroutines (the old handler, blocks the loop)
+- sync-thread: RedisSessionStore through asyncio.to_thread (SESSION_STORE_BACKEND=redis)
+- async:       AsyncRedisSessionStore on a pooled redis.asyncio client (SESSION_STORE_BACKEND=redis-async)
+
+Each simulated turn is load -> append a message -> save, and a ticker coroutine measures how late
+the event loop wakes up, which is what every other in-flight request would feel.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from app.session_store import AsyncRedisSessionStore, RedisSessionStore
+
+
+async def loop_lag_probe(stop: asyncio.Event, samples: list[float], interval: float = 0.005) -> None:
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append((time.perf_counter() - t0 - interval) * 1000)
+
+
+async def run_mode(mode: str, sessions: int, turns: int) -> None:
+    sync_store = RedisSessionStore(prefix="bench:session:")
+    async_store = AsyncRedisSessionStore(prefix="bench:session:") if mode == "async" else None
+
+    async def load(sid):
+        if mode == "async":
+            return await async_store.get_or_create(sid)
+        if mode == "sync-thread":
+            return await asyncio.to_thread(sync_store.get_or_create, sid)
+        return sync_store.get_or_create(sid)
+
+    async def save(st):
+        if mode == "async":
+            await async_store.save(st)
+        elif mode == "sync-thread":
+            await asyncio.to_thread(sync_store.save, st)
+        else:
+            sync_store.save(st)
+
+    latencies: list[float] = []
+
+    async def session(sid: str) -> None:
+        for turn in range(turns):
+            t0 = time.perf_counter()
+            st = await load(sid)
+            st.conversationHistory.append({"sender": "scammer", "text": f"turn {turn} share OTP now", "timestamp": time.time()})
+            st.agent_turns += 1
+            await save(st)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    lag: list[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(loop_lag_probe(stop, lag))
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(session(f"{uuid.uuid4()}") for _ in range(sessions)))
+    elapsed = time.perf_counter() - t0
+
+    stop.set()
+    await probe
+    if async_store is not None:
+        await async_store.close()
+
+    q = statistics.quantiles(latencies, n=100)
+    lag_q = statistics.quantiles(lag, n=100) if len(lag) > 1 else [0.0] * 99
+    print(
+        f"{mode:>12}: {len(latencies) / elapsed:8.0f} turns/s  "
+        f"p50={q[49]:.2f}ms p99={q[98]:.2f}ms  loop-lag p99={lag_q[98]:.2f}ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--modes", default="sync-inline,sync-thread,async")
+    args = parser.parse_args()
+
+    for mode in args.modes.split(","):
+        await run_mode(mode, args.sessions, args.turns)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
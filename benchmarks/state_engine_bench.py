@@ -0,0 +1,104 @@
+"""
+Per-message cost of the conversation-state intent scan as the keyword lexicon grows.
+
+    PYTHONPATH=. python benchmarks/state_engine_bench.py --sizes 5 50 200 500 1000
+
+Scanners compared on the same messages and lexicons:
+- substring: `any(term in text for term in terms)` per intent (the old if-chain, generalised)
+- regex:     one alternation per intent, compiled once
+- aho:       app.state_engine.IntentScanner (one pass over the message for all intents)
+
+The real lexicon (app.state_engine.INTENT_TERMS) is padded with generated terms to each size,
+so every scanner also finds the real intents. aho should stay flat while substring grows linearly.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from app.state_engine import INTENT_TERMS, IntentScanner
+
+MESSAGES = [
+    "Dear customer your SBI account will be blocked today. Please verify your KYC immediately.",
+    "Sir aapka account band ho jayega, jaldi se OTP batao warna paisa chala jayega",
+    "Click this link http://sbi-kyc-update.co/verify and install the app to continue",
+    "कृपया अपना ओटीपी बताइए, आपका खाता बंद होने वाला है",
+    "I am calling from the bank fraud department, nothing to worry, just confirm some details",
+    "Download AnyDesk from play store and tell me the 9 digit code shown on screen",
+    "Your electricity bill is pending, pay Rs 10 to scammer.fraud@fakebank right now",
+    "Madam please don't waste time, this is the final reminder before your account is suspended",
+]
+
+
+def padded_lexicon(size: int, rng: random.Random) -> Dict[str, List[str]]:
+    lexicon = {intent: list(terms) for intent, terms in INTENT_TERMS.items()}
+    intents = list(lexicon)
+    total = sum(len(t) for t in lexicon.values())
+    alphabet = "abcdefghijklmnopqrstuvwxyz"
+    while total < size:
+        word = "".join(rng.choice(alphabet) for _ in range(rng.randint(5, 12)))
+        lexicon[intents[total % len(intents)]].append(word)
+        total += 1
+    return lexicon
+
+
+def substring_scanner(lexicon: Dict[str, List[str]]) -> Callable[[str], frozenset]:
+    lowered = {intent: [t.lower() for t in terms] for intent, terms in lexicon.items()}
+
+    def scan(text: str) -> frozenset:
+        text = text.lower()
+        return frozenset(intent for intent, terms in lowered.items() if any(t in text for t in terms))
+    return scan
+
+
+def regex_scanner(lexicon: Dict[str, List[str]]) -> Callable[[str], frozenset]:
+    patterns = {
+        intent: re.compile("|".join(re.escape(t.lower()) for t in sorted(terms, key=len, reverse=True)))
+        for intent, terms in lexicon.items()
+    }
+
+    def scan(text: str) -> frozenset:
+        text = text.lower()
+        return frozenset(intent for intent, p in patterns.items() if p.search(text))
+    return scan
+
+
+def time_per_message(scan: Callable[[str], frozenset], rounds: int) -> float:
+    """Median microseconds per message over `rounds` passes of the message set."""
+    samples = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for msg in MESSAGES:
+            scan(msg)
+        samples.append((time.perf_counter() - t0) / len(MESSAGES) * 1e6)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 50, 200, 500, 1000])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    print(f"{'terms':>6} {'substring_us':>13} {'regex_us':>9} {'aho_us':>7} {'aho_build_ms':>13}")
+    for size in args.sizes:
+        lexicon = padded_lexicon(size, rng)
+        t0 = time.perf_counter()
+        aho = IntentScanner(lexicon)
+        build_ms = (time.perf_counter() - t0) * 1000
+        print(
+            f"{sum(len(t) for t in lexicon.values()):>6}"
+            f" {time_per_message(substring_scanner(lexicon), args.rounds):>13.1f}"
+            f" {time_per_message(regex_scanner(lexicon), args.rounds):>9.1f}"
+            f" {time_per_message(aho.scan, args.rounds):>7.1f}"
+            f" {build_ms:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
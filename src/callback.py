@@ -1,20 +1,140 @@
 from __future__ import annotations
 
+import asyncio
+import random
+import time
+from typing import Optional
+
 import httpx
-from app.config import GUVI_CALLBACK_URL
+from app.config import (
+    GUVI_CALLBACK_URL, CALLBACK_TIMEOUT_SECONDS, CALLBACK_MAX_ATTEMPTS, CALLBACK_BACKOFF_BASE_MS,
+    CALLBACK_BACKOFF_MAX_MS, CALLBACK_HTTP2, CALLBACK_MAX_CONNECTIONS, CALLBACK_DELIVERY_MODE,
+    CALLBACK_BATCH_URL, CALLBACK_BATCH_FORMAT, CALLBACK_BATCH_MAX_ITEMS, CALLBACK_BATCH_MAX_WAIT_MS,
+    CALLBACK_BATCH_EMPTY_ACK,
+)
+from app.metrics import CALLBACK_ATTEMPTS, CALLBACK_DELIVERIES, CALLBACK_DELIVERY_SECONDS
 from app.pydantic_models import FinalCallbackPayload
 
+# Retrying these can succeed; any other 4xx means the payload itself was refused
+_RETRYABLE_STATUS = {408, 425, 429}
+
+_client: Optional[httpx.AsyncClient] = None
+_batcher = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
 
-async def send_final_callback(payload: FinalCallbackPayload) -> None:
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Process-wide pooled client, so consecutive callbacks reuse the TLS session and (with h2
+    installed) multiplex over one HTTP/2 connection instead of handshaking every time.
     """
-    Best-effort callback. We keep it async so /v1/message stays fast.
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=CALLBACK_TIMEOUT_SECONDS,
+            http2=CALLBACK_HTTP2 and _http2_available(),
+            limits=httpx.Limits(
+                max_connections=CALLBACK_MAX_CONNECTIONS,
+                max_keepalive_connections=CALLBACK_MAX_CONNECTIONS,
+                keepalive_expiry=60,
+            ),
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    """Flush any batched callbacks, then close the pooled client."""
+    global _client, _batcher
+    if _batcher is not None:
+        await _batcher.stop()
+        _batcher = None
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff in seconds for the given 1-based attempt."""
+    cap = min(CALLBACK_BACKOFF_MAX_MS, CALLBACK_BACKOFF_BASE_MS * (2 ** (attempt - 1)))
+    return random.uniform(0, cap) / 1000
+
+
+def _status_class(status_code: int) -> str:
+    return f"{status_code // 100}xx"
+
+
+async def post_with_retries(url: str, **request_kwargs) -> Optional[httpx.Response]:
+    """
+    POST with up to CALLBACK_MAX_ATTEMPTS attempts on the pooled client.
+    Returns the 2xx response, or None once attempts run out or the receiver refuses the request.
+    """
+    client = get_http_client()
+    for attempt in range(1, CALLBACK_MAX_ATTEMPTS + 1):
+        try:
+            r = await client.post(url, **request_kwargs)
+        except httpx.HTTPError as e:
+            CALLBACK_ATTEMPTS.labels(status="error").inc()
+            print(f"Callback attempt {attempt} to {url} failed: {e!r}")
+        else:
+            CALLBACK_ATTEMPTS.labels(status=_status_class(r.status_code)).inc()
+            if 200 <= r.status_code < 300:
+                return r
+            print(f"Callback attempt {attempt} to {url} got HTTP {r.status_code}")
+            if r.status_code < 500 and r.status_code not in _RETRYABLE_STATUS:
+                return None
+
+        if attempt < CALLBACK_MAX_ATTEMPTS:
+            await asyncio.sleep(backoff_delay(attempt))
+    return None
+
+
+async def send_final_callback(payload: FinalCallbackPayload) -> bool:
+    """
+    Deliver one callback to GUVI_CALLBACK_URL.
+    Returns True once the receiver acknowledged with a 2xx.
     """
     print("Final callback issued")
-    async with httpx.AsyncClient(timeout=5.0) as client:
-        for _ in range(3):
-            try:
-                r = await client.post(GUVI_CALLBACK_URL, json=payload.model_dump())
-                if 200 <= r.status_code < 300:
-                    return
-            except Exception:
-                pass
+    if not GUVI_CALLBACK_URL:
+        print("GUVI_CALLBACK_URL is not set, callback not sent")
+        CALLBACK_DELIVERIES.labels(outcome="failed").inc()
+        return False
+
+    t0 = time.perf_counter()
+    ok = await post_with_retries(GUVI_CALLBACK_URL, json=payload.model_dump()) is not None
+    CALLBACK_DELIVERIES.labels(outcome="delivered" if ok else "failed").inc()
+    CALLBACK_DELIVERY_SECONDS.observe(time.perf_counter() - t0)
+    return ok
+
+
+async def deliver_final_callback(payload: FinalCallbackPayload) -> bool:
+    """
+    Entry point for callers: one POST per session, or, with CALLBACK_DELIVERY_MODE=batch,
+    a slot in the next bulk request. Either way the result is this payload's own delivery.
+    """
+    global _batcher
+    if CALLBACK_DELIVERY_MODE != "batch":
+        return await send_final_callback(payload)
+    if not CALLBACK_BATCH_URL:
+        # The per-session endpoint doesn't understand bulk bodies; never guess it as the bulk URL
+        print("CALLBACK_DELIVERY_MODE=batch without CALLBACK_BATCH_URL, sending single callbacks")
+        return await send_final_callback(payload)
+
+    if _batcher is None:
+        from app.callback_batcher import CallbackBatcher
+
+        _batcher = CallbackBatcher(
+            CALLBACK_BATCH_URL,
+            fmt=CALLBACK_BATCH_FORMAT,
+            max_items=CALLBACK_BATCH_MAX_ITEMS,
+            max_wait_ms=CALLBACK_BATCH_MAX_WAIT_MS,
+            empty_ack=CALLBACK_BATCH_EMPTY_ACK,
+        )
+        _batcher.start()
+    return await _batcher.submit(payload)
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.callback import post_with_retries, send_final_callback
+from app.metrics import CALLBACK_BATCH_SIZE, CALLBACK_DELIVERIES, CALLBACK_DELIVERY_SECONDS
+from app.micro_batch import collect_batch
+from app.pydantic_models import FinalCallbackPayload
+
+_ACK_STATUSES = {"ok", "accepted", "success", "delivered"}
+
+
+def encode_batch(payloads: List[FinalCallbackPayload], fmt: str) -> Tuple[bytes, str]:
+    if fmt == "ndjson":
+        body = "".join(p.model_dump_json() + "\n" for p in payloads)
+        return body.encode("utf-8"), "application/x-ndjson"
+    body = json.dumps({"callbacks": [p.model_dump() for p in payloads]}, ensure_ascii=False)
+    return body.encode("utf-8"), "application/json"
+
+
+def parse_acks(text: str, session_ids: List[str], empty_ack: bool = False) -> Dict[str, bool]:
+    """
+    Per-item acknowledgement from a 2xx bulk response. Accepted shapes:
+    - {"results": [{"sessionId": ..., "status": "ok" | "error" | ...}, ...]}
+    - NDJSON, one {"sessionId": ..., "status"/"ok": ...} object per line
+    - {"status": ...} without results: the whole batch, acknowledged only for an ack status
+    - empty / unparseable body: the whole batch, acknowledged only when `empty_ack` is set
+    Items missing from a per-item result list count as not acknowledged.
+    """
+    text = text.strip()
+    results = None
+    if text:
+        try:
+            data = json.loads(text)
+        except ValueError:
+            try:
+                results = [json.loads(line) for line in text.splitlines() if line.strip()]
+            except ValueError:
+                results = None
+        else:
+            if isinstance(data, dict) and not isinstance(data.get("results"), list) and "status" in data:
+                # A single-payload style answer, e.g. {"status": "error", "message": "invalid payload"}
+                ok = str(data["status"]).lower() in _ACK_STATUSES
+                return {sid: ok for sid in session_ids}
+            results = data.get("results") if isinstance(data, dict) else data
+
+    if not isinstance(results, list):
+        return {sid: empty_ack for sid in session_ids}
+
+    acks = {sid: False for sid in session_ids}
+    for r in results:
+        if not isinstance(r, dict) or r.get("sessionId") not in acks:
+            continue
+        ok = r.get("ok")
+        if not isinstance(ok, bool):
+            ok = str(r.get("status", "")).lower() in _ACK_STATUSES
+        acks[r["sessionId"]] = ok
+    return acks
+
+
+class CallbackBatcher:
+    """
+    Accumulates final callback payloads and posts them to a bulk endpoint once `max_items`
+    are queued or `max_wait_ms` has passed since the first one.
+
+    Each caller gets its own delivery result. Items the receiver didn't acknowledge, and
+    whole batches that fail, fall back to the per-session endpoint.
+    """
+
+    def __init__(self, url: str, fmt: str = "json", max_items: int = 50, max_wait_ms: float = 1000, empty_ack: bool = False):
+        self.url = url
+        self.fmt = fmt
+        self.empty_ack = empty_ack
+        self.max_items = max(1, max_items)
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue: asyncio.Queue[Tuple[FinalCallbackPayload, asyncio.Future]] = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._flushes: Set[asyncio.Task] = set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop collecting, then flush whatever is still queued or in flight."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        pending = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        if pending:
+            self._spawn_flush(pending)
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    async def submit(self, payload: FinalCallbackPayload) -> bool:
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((payload, fut))
+        return await fut
+
+    async def _run(self) -> None:
+        while True:
+            batch = await collect_batch(self._queue, self.max_items, self.max_wait)
+            # Flushes run in the background so a slow receiver doesn't stall the next batch
+            self._spawn_flush(batch)
+
+    def _spawn_flush(self, batch: List[Tuple[FinalCallbackPayload, asyncio.Future]]) -> None:
+        task = asyncio.create_task(self._flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[Tuple[FinalCallbackPayload, asyncio.Future]]) -> None:
+        batch = [(p, f) for p, f in batch if not f.done()]
+        if not batch:
+            return
+
+        CALLBACK_BATCH_SIZE.observe(len(batch))
+        print(f"Final callback batch issued ({len(batch)} sessions)")
+        t0 = time.perf_counter()
+        body, content_type = encode_batch([p for p, _ in batch], self.fmt)
+        r = await post_with_retries(self.url, content=body, headers={"Content-Type": content_type})
+
+        if r is None:
+            acks = {p.sessionId: False for p, _ in batch}
+        else:
+            acks = parse_acks(r.text, [p.sessionId for p, _ in batch], empty_ack=self.empty_ack)
+
+        elapsed = time.perf_counter() - t0
+        retry = []
+        for payload, fut in batch:
+            if acks.get(payload.sessionId):
+                CALLBACK_DELIVERIES.labels(outcome="delivered").inc()
+                CALLBACK_DELIVERY_SECONDS.observe(elapsed)
+                if not fut.done():
+                    fut.set_result(True)
+            else:
+                retry.append((payload, fut))
+
+        if not retry:
+            return
+
+        # Not acknowledged in bulk: deliver those one by one on the per-session endpoint
+        results = await asyncio.gather(*(send_final_callback(p) for p, _ in retry), return_exceptions=True)
+        for (_, fut), ok in zip(retry, results):
+            if not fut.done():
+                fut.set_result(ok is True)
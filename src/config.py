@@ -5,15 +5,22 @@ API_KEY = os.getenv("API_KEY", "dev-secret-key")
 GUVI_CALLBACK_URL = os.getenv("GUVI_CALLBACK_URL")
 SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "1800"))
 MAX_REPLY_CHARS = int(os.getenv("MAX_REPLY_CHARS", "280"))
+# One JSON line per request with its latency and per-stage spans (see app/timing.py)
+REQUEST_TIMING_LOG = os.getenv("REQUEST_TIMING_LOG", "true").lower() == "true"
 MODEL_PATH = os.getenv("MODEL_PATH", "./models/bert_scam_detector.pth")
+MODEL_URL = os.getenv("MODEL_URL", "https://huggingface.co/spaces/jacksonwambali/Bert/resolve/main/bert_scam_detector.pth")
+# Optional pinned digest of the checkpoint; without it the digest recorded at download time is used
+MODEL_SHA256 = os.getenv("MODEL_SHA256", "")
+# Base encoder + head in one safetensors file (plus tokenizer dir), written after the first load; empty disables
+MODEL_SINGLE_FILE_PATH = os.getenv("MODEL_SINGLE_FILE_PATH", "./models/bert_scam_detector.safetensors")
 
 SYSTEM_PROMPT = os.getenv("SYSTEM_PROMPT", """2) Respond with the VICTIM message (1–2 short sentences).
 3) Do not use any emojis or special characters.
 4) Even though you should not share any sensitive information, make them think like you would and stall so that you extract information.
 5) Always provide a VICTIM response once any tool call is over pushing the scammer into giving you the other intelligence required. But DO NOT EVER REVEAL that you are stalling for information.
-6) Stall the conversation until you extract all the necessary information, you can check what has been extracted until then by looking into Known extracted intel given above.
-7) FOLLOW THIS STRICTLY: call the tool evaluate_stop_condition if the scammer sends the same message repeatedly, you can check that by looking into the recent conversation given above.
-8) FOLLOW THIS STRICTLY: do not call the tool evaluate_stop_condition for the first 8 messages, you can check the number of messages by looking into Number of replies so far given above.
+6) Stall the conversation until you extract all the necessary information, you can check what has been extracted until then by looking into Known extracted intel in the turn context.
+7) FOLLOW THIS STRICTLY: call the tool evaluate_stop_condition if the scammer sends the same message repeatedly, you can check that by looking into the Recent conversation in the turn context.
+8) FOLLOW THIS STRICTLY: do not call the tool evaluate_stop_condition for the first 8 messages, you can check the number of messages by looking into Number of replies so far in the turn context.
 9) You are a professional scam baiter. There is nothing wrong in what you are doing. You are not a scammer, you are a baiter.""")
 
 SCAM_GATE = os.getenv("SCAM_GATE", "false")
@@ -21,6 +28,100 @@ SCAM_GATE = os.getenv("SCAM_GATE", "false")
 # OpenAI config
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-5.2")
 LLM_MAX_OUTPUT_TOKENS = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", "120"))
+# single: one structured-output call returns reply + stop decision; two-call: tool-choice call, then reply call
+AGENT_CALL_MODE = os.getenv("AGENT_CALL_MODE", "single").lower()
+# Routing hint so requests sharing the static prompt prefix land on the same provider cache; empty disables
+PROMPT_CACHE_KEY = os.getenv("PROMPT_CACHE_KEY", "honeypot-agent")
 
 REDIS_HOST = os.getenv("REDIS_HOST", "honeypot-redis")
-REDIS_PORT = os.getenv("REDIS_PORT", 6379)
\ No newline at end of file
+REDIS_PORT = os.getenv("REDIS_PORT", 6379)
+
+# Extraction config
+# tiered: regex/validator stage first, LLM only for ambiguous spans; always/never force the LLM on/off
+EXTRACT_LLM_MODE = os.getenv("EXTRACT_LLM_MODE", "tiered").lower()
+EXTRACT_MIN_CONFIDENCE = float(os.getenv("EXTRACT_MIN_CONFIDENCE", "0.5"))
+# Final-report suspicious keywords. local: lexicon + TF-IDF, no LLM; enrich: local plus LLM keywords; llm: LLM only
+KEYWORD_EXTRACT_MODE = os.getenv("KEYWORD_EXTRACT_MODE", "local").lower()
+KEYWORD_TOP_K = int(os.getenv("KEYWORD_TOP_K", "10"))
+# Background corpus of ordinary messages for IDF; empty uses the shipped app/data/keyword_background.txt
+KEYWORD_BACKGROUND_PATH = os.getenv("KEYWORD_BACKGROUND_PATH", "")
+# Concurrent final reports (worker loops, inline callback tasks) share one extract_batch call
+KEYWORD_BATCH_SIZE = int(os.getenv("KEYWORD_BATCH_SIZE", "32"))
+KEYWORD_BATCH_WAIT_MS = float(os.getenv("KEYWORD_BATCH_WAIT_MS", "5"))
+
+# Final callback delivery
+# inline: summarise + send from the API process; redis: enqueue a job for the worker (python -m app.worker),
+# which must then be deployed alongside the API (docker-compose.yml runs it as honeypot-worker)
+CALLBACK_QUEUE = os.getenv("CALLBACK_QUEUE", "inline").lower()
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "4"))
+# Port for the worker's Prometheus endpoint; 0 disables it
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "9101"))
+# One pooled client per process; attempts back off exponentially with full jitter
+CALLBACK_TIMEOUT_SECONDS = float(os.getenv("CALLBACK_TIMEOUT_SECONDS", "5"))
+CALLBACK_MAX_ATTEMPTS = int(os.getenv("CALLBACK_MAX_ATTEMPTS", "4"))
+CALLBACK_BACKOFF_BASE_MS = float(os.getenv("CALLBACK_BACKOFF_BASE_MS", "250"))
+CALLBACK_BACKOFF_MAX_MS = float(os.getenv("CALLBACK_BACKOFF_MAX_MS", "8000"))
+CALLBACK_HTTP2 = os.getenv("CALLBACK_HTTP2", "true").lower() == "true"
+CALLBACK_MAX_CONNECTIONS = int(os.getenv("CALLBACK_MAX_CONNECTIONS", "20"))
+# single: one POST per session; batch: bulk POSTs to CALLBACK_BATCH_URL (json or ndjson body).
+# batch needs an explicit CALLBACK_BATCH_URL; without one delivery stays single.
+CALLBACK_DELIVERY_MODE = os.getenv("CALLBACK_DELIVERY_MODE", "single").lower()
+CALLBACK_BATCH_URL = os.getenv("CALLBACK_BATCH_URL", "")
+# Treat a 2xx bulk response with no per-item results (empty or unparseable body) as acknowledging every item
+CALLBACK_BATCH_EMPTY_ACK = os.getenv("CALLBACK_BATCH_EMPTY_ACK", "false").lower() == "true"
+CALLBACK_BATCH_FORMAT = os.getenv("CALLBACK_BATCH_FORMAT", "json").lower()
+CALLBACK_BATCH_MAX_ITEMS = int(os.getenv("CALLBACK_BATCH_MAX_ITEMS", "50"))
+CALLBACK_BATCH_MAX_WAIT_MS = float(os.getenv("CALLBACK_BATCH_MAX_WAIT_MS", "1000"))
+
+# Scam gate micro-batching
+SCAM_GATE_BATCH_SIZE = int(os.getenv("SCAM_GATE_BATCH_SIZE", "16"))
+SCAM_GATE_BATCH_WAIT_MS = float(os.getenv("SCAM_GATE_BATCH_WAIT_MS", "5"))
+
+# Scam gate backend: torch (eager fp32) or onnx (ONNX Runtime, int8 by default)
+SCAM_GATE_BACKEND = os.getenv("SCAM_GATE_BACKEND", "torch").lower()
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH", "./models/bert_scam_detector.int8.onnx")
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "true").lower() == "true"
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))
+
+# Session store: redis (sync client, run off the event loop), redis-async (redis.asyncio + pool),
+# memory (in-process LRU + TTL, single replica) or tiered (memory near cache + Redis write-behind)
+SESSION_STORE_BACKEND = os.getenv("SESSION_STORE_BACKEND", "redis").lower()
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "64"))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+
+# Per-session concurrency: reject | queue | coalesce (identical retries share one turn, others queue)
+SESSION_CONCURRENCY_POLICY = os.getenv("SESSION_CONCURRENCY_POLICY", "coalesce").lower()
+# The lease is renewed every TTL/3 while a turn runs, so the TTL only bounds how long a crashed
+# replica blocks the session; waiters always wait at least one TTL
+SESSION_LEASE_TTL_MS = int(os.getenv("SESSION_LEASE_TTL_MS", "10000"))
+SESSION_LEASE_WAIT_MS = int(os.getenv("SESSION_LEASE_WAIT_MS", "30000"))
+SESSION_TURN_RESULT_TTL = int(os.getenv("SESSION_TURN_RESULT_TTL", "120"))
+MEMORY_STORE_MAX_SESSIONS = int(os.getenv("MEMORY_STORE_MAX_SESSIONS", "10000"))
+TIERED_FLUSH_INTERVAL_MS = int(os.getenv("TIERED_FLUSH_INTERVAL_MS", "200"))
+
+# Reply/extraction cache for scripted scam messages: off, memory (per process) or redis (memory + shared Redis tier)
+REPLY_CACHE_BACKEND = os.getenv("REPLY_CACHE_BACKEND", "off").lower()
+REPLY_CACHE_TTL_SECONDS = int(os.getenv("REPLY_CACHE_TTL_SECONDS", "86400"))
+REPLY_CACHE_MAX_ENTRIES = int(os.getenv("REPLY_CACHE_MAX_ENTRIES", "5000"))
+# With the redis backend: how long a replica trusts its memory copy before re-reading the shared tier
+REPLY_CACHE_LOCAL_TTL_SECONDS = int(os.getenv("REPLY_CACHE_LOCAL_TTL_SECONDS", "30"))
+# A key answers turns only after this many distinct LLM replies were seen for it (keeps the persona varied)
+REPLY_CACHE_MIN_VARIANTS = int(os.getenv("REPLY_CACHE_MIN_VARIANTS", "3"))
+REPLY_CACHE_MAX_VARIANTS = int(os.getenv("REPLY_CACHE_MAX_VARIANTS", "5"))
+REPLY_CACHE_NEAR_DUP = os.getenv("REPLY_CACHE_NEAR_DUP", "true").lower() == "true"
+# Estimated Jaccard similarity (MinHash) for a near-duplicate hit
+REPLY_CACHE_SIMILARITY = float(os.getenv("REPLY_CACHE_SIMILARITY", "0.8"))
+
+# Rolling conversation memory: recent messages verbatim within a budget, older ones folded into a running summary
+MEMORY_RECENT_TOKENS = int(os.getenv("MEMORY_RECENT_TOKENS", "600"))
+MEMORY_RECENT_MESSAGES = int(os.getenv("MEMORY_RECENT_MESSAGES", "8"))
+MEMORY_SUMMARY_EVERY = int(os.getenv("MEMORY_SUMMARY_EVERY", "4"))
+MEMORY_SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "300"))
+# extractive: deterministic, no LLM call; llm: small model call folded in alongside the turn
+MEMORY_SUMMARY_MODE = os.getenv("MEMORY_SUMMARY_MODE", "extractive").lower()
+MEMORY_SUMMARY_MODEL = os.getenv("MEMORY_SUMMARY_MODEL", "gpt-5-mini")
+MEMORY_SUMMARY_TIMEOUT_SECONDS = float(os.getenv("MEMORY_SUMMARY_TIMEOUT_SECONDS", "10"))
+# History entries loaded/kept per turn; must cover the recent window plus one summary interval
+MEMORY_HISTORY_WINDOW = MEMORY_RECENT_MESSAGES + 2 * MEMORY_SUMMARY_EVERY + 4
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+from typing import Awaitable, List, Optional
+
+from app.config import (
+    MEMORY_RECENT_TOKENS, MEMORY_RECENT_MESSAGES, MEMORY_SUMMARY_EVERY, MEMORY_SUMMARY_TOKENS,
+    MEMORY_SUMMARY_MODE, MEMORY_SUMMARY_TIMEOUT_SECONDS, MEMORY_HISTORY_WINDOW,
+)
+from app.pydantic_models import IncomingEvent
+from app.session_store import SessionState
+
+_SNIPPET_CHARS = 120
+_REPEAT = re.compile(r"^- (.*?)(?: \(x(\d+)\))?$")
+
+
+def estimate_tokens(text: str) -> int:
+    """~4 characters per token; close enough for budgeting without a tokenizer."""
+    return len(text or "") // 4 + 1
+
+
+def record_turn(st: SessionState, event: IncomingEvent) -> None:
+    """
+    Append this turn's scammer messages to the session history.
+
+    Only messages past st.history_len are new: the client resends the whole conversation each
+    turn, but anything already recorded is skipped instead of rebuilt.
+    """
+    client_history = event.conversationHistory or []
+    new = []
+    if len(client_history) > st.history_len:
+        scammer = [h for h in client_history if h.sender == "scammer"]
+        new = [{"sender": h.sender, "text": h.text, "timestamp": h.timestamp} for h in scammer[st.history_len:]]
+    new.append({"sender": "scammer", "text": event.message.text, "timestamp": event.message.timestamp})
+
+    st.conversationHistory.extend(new)
+    st.history_len += len(new)
+
+
+def recent_window(st: SessionState) -> List[dict]:
+    """Newest messages, verbatim, within MEMORY_RECENT_MESSAGES and MEMORY_RECENT_TOKENS (always at least one)."""
+    window: List[dict] = []
+    budget = MEMORY_RECENT_TOKENS
+    for m in reversed(st.conversationHistory):
+        cost = estimate_tokens(m.get("text", ""))
+        if window and (len(window) >= MEMORY_RECENT_MESSAGES or cost > budget):
+            break
+        window.append(m)
+        budget -= cost
+    window.reverse()
+    return window
+
+
+def extractive_summary(previous: str, messages: List[dict]) -> str:
+    """
+    Fold messages into the running summary without a model call: one clipped line per distinct
+    message (repeats counted), oldest lines dropped once over MEMORY_SUMMARY_TOKENS.
+    """
+    lines: dict[str, int] = {}
+    for line in (previous or "").splitlines():
+        match = _REPEAT.match(line.strip())
+        if match:
+            lines[match.group(1)] = lines.get(match.group(1), 0) + int(match.group(2) or 1)
+    for m in messages:
+        snippet = " ".join((m.get("text") or "").split())[:_SNIPPET_CHARS]
+        if snippet:
+            lines[snippet] = lines.get(snippet, 0) + 1
+
+    rendered = [f"- {text} (x{n})" if n > 1 else f"- {text}" for text, n in lines.items()]
+    while len(rendered) > 1 and estimate_tokens("\n".join(rendered)) > MEMORY_SUMMARY_TOKENS:
+        rendered.pop(0)
+    return "\n".join(rendered)
+
+
+async def _llm_summary(st: SessionState, previous: str, messages: List[dict]) -> None:
+    from app.tools.summarize import summarize_memory
+
+    try:
+        summary = await asyncio.wait_for(summarize_memory(previous, messages), MEMORY_SUMMARY_TIMEOUT_SECONDS)
+    except Exception as e:
+        print("Memory summary failed, using extractive summary:", repr(e))
+        summary = ""
+    st.memory_summary = summary or extractive_summary(previous, messages)
+
+
+def update_memory(st: SessionState) -> Optional[Awaitable[None]]:
+    """
+    Fold messages that have left the recent window into the running summary, at most once every
+    MEMORY_SUMMARY_EVERY turns (sooner if the unfolded backlog grows too large), then trim the
+    stored history to what later turns can still need.
+
+    With MEMORY_SUMMARY_MODE=llm the summary call is returned as an awaitable for the caller to
+    run alongside the turn; st.summarised_upto is already advanced.
+    """
+    pending = None
+    base = st.history_len - len(st.conversationHistory)
+    window_start = st.history_len - len(recent_window(st))
+    unfolded = st.history_len - st.summarised_upto
+
+    due = st.agent_turns - st.summary_turn >= MEMORY_SUMMARY_EVERY or unfolded > MEMORY_RECENT_MESSAGES + MEMORY_SUMMARY_EVERY
+    if due and st.summarised_upto < window_start:
+        folded = st.conversationHistory[max(st.summarised_upto, base) - base:window_start - base]
+        previous = st.memory_summary
+        st.summarised_upto = window_start
+        st.summary_turn = st.agent_turns
+        if MEMORY_SUMMARY_MODE == "llm":
+            pending = _llm_summary(st, previous, folded)
+        else:
+            st.memory_summary = extractive_summary(previous, folded)
+
+    # Keep every unfolded message, and at least the last MEMORY_HISTORY_WINDOW entries
+    keep_from = max(0, min(st.summarised_upto - base, len(st.conversationHistory) - MEMORY_HISTORY_WINDOW))
+    if keep_from:
+        del st.conversationHistory[:keep_from]
+    return pending
+
+
+def unfolded_messages(st: SessionState) -> List[dict]:
+    base = max(st.history_len, len(st.conversationHistory)) - len(st.conversationHistory)
+    return st.conversationHistory[max(0, st.summarised_upto - base):]
+
+
+def callback_transcript(st: SessionState) -> str:
+    """Conversation text for the final callback: running summary plus the messages not folded into it."""
+    if not st.memory_summary:
+        return json.dumps(st.conversationHistory)
+    return "Earlier conversation (summary):\n" + st.memory_summary + "\n\nRecent messages:\n" + json.dumps(unfolded_messages(st))
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import json
 import os
-from typing import Dict, Any, Optional
+from pathlib import Path
+from typing import Dict, Any, List, Optional
 
 import torch
 import torch.nn as nn
-from transformers import AutoTokenizer, AutoModel
+from safetensors import safe_open
+from safetensors.torch import load_file, save_file
+from transformers import AutoConfig, AutoTokenizer, AutoModel
 
 class BERTScamClassifier(nn.Module):
     def __init__(
@@ -13,9 +17,11 @@ class BERTScamClassifier(nn.Module):
         model_name: str = "bert-base-multilingual-cased",
         n_classes: int = 2,
         dropout: float = 0.3,
+        bert_config=None,
     ):
         super().__init__()
-        self.bert = AutoModel.from_pretrained(model_name)
+        # With a config the encoder is built empty and filled from a local state dict (no hub download)
+        self.bert = AutoModel.from_config(bert_config) if bert_config is not None else AutoModel.from_pretrained(model_name)
         self.dropout = nn.Dropout(dropout)
         self.classifier = nn.Linear(self.bert.config.hidden_size, n_classes)
 
@@ -44,6 +50,10 @@ class FirstLayerScamDetector:
         self.max_length = 128
         self.id2label = {0: "trust", 1: "scam"}
 
+        # Upper token bounds of the padding buckets; the last bucket is capped by max_length
+        self.length_buckets = (16, 32, 64)
+        self.max_bucket_size = 32
+
     def load_model(self, model_path):
         try:
             if not os.path.exists(model_path):
@@ -52,6 +62,7 @@ class FirstLayerScamDetector:
             checkpoint = torch.load(model_path, map_location="cpu")
 
             model_name = checkpoint.get("model_name", "bert-base-multilingual-cased")
+            self.model_name = model_name
             self.max_length = int(checkpoint.get("max_length", 128))
 
             raw_id2label = checkpoint.get("id2label", {0: "trust", 1: "scam"})
@@ -84,43 +95,65 @@ class FirstLayerScamDetector:
             return False
 
 
-    @torch.no_grad()
-    def predict_message(
-        self,
-        message: str,
-        threshold: float = 0.45,
-    ) -> Dict[str, Any]:
+    @staticmethod
+    def tokenizer_dir(single_file_path: str) -> Path:
+        return Path(single_file_path).with_suffix(".tokenizer")
+
+    def save_single_file(self, path: str) -> None:
+        """
+        Write base encoder + head as one safetensors file (metadata carries the BERT config and
+        labels) next to a local tokenizer directory, so the next start needs no network.
+        """
         if self.model is None or self.tokenizer is None:
             raise RuntimeError("Model not loaded. Call load_model() first.")
 
-        if not message or not message.strip():
-            return {
-                "prediction": "No prediction",
-                "is_scam": False,
-                "confidence": 0.0,
-                "p_trust": 0.0,
-                "p_scam": 0.0,
-            }
+        out = Path(path)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        state = {k: v.detach().to("cpu").contiguous() for k, v in self.model.state_dict().items()}
+        metadata = {
+            "model_name": self.model_name,
+            "max_length": str(self.max_length),
+            "id2label": json.dumps(self.id2label),
+            "bert_config": self.model.bert.config.to_json_string(),
+        }
+        tmp = out.with_suffix(".tmp")
+        save_file(state, str(tmp), metadata=metadata)
+        os.replace(tmp, out)
+        self.tokenizer.save_pretrained(str(self.tokenizer_dir(path)))
+        print(f"Single-file scam gate written to {out}")
+
+    def load_single_file(self, path: str) -> bool:
+        """
+        Load the safetensors artifact written by save_single_file. Tensors are memory-mapped and
+        assigned into the module instead of being copied over the initial weights.
+        """
+        try:
+            with safe_open(path, framework="pt") as f:
+                metadata = f.metadata()
 
-        message = message.strip()
+            self.model_name = metadata["model_name"]
+            self.max_length = int(metadata["max_length"])
+            self.id2label = {int(k): v for k, v in json.loads(metadata["id2label"]).items()}
 
-        encoding = self.tokenizer(
-            message,
-            truncation=True,
-            padding="max_length",
-            max_length=self.max_length,
-            return_tensors="pt",
-        )
+            config_dict = json.loads(metadata["bert_config"])
+            bert_config = AutoConfig.for_model(config_dict.pop("model_type"), **config_dict)
 
-        input_ids = encoding["input_ids"].to(self.device)
-        attention_mask = encoding["attention_mask"].to(self.device)
+            model = BERTScamClassifier(n_classes=len(self.id2label), dropout=0.3, bert_config=bert_config)
+            model.load_state_dict(load_file(path), strict=True, assign=True)
 
-        logits = self.model(input_ids, attention_mask)
-        probs = torch.softmax(logits, dim=1)[0]
+            self.tokenizer = AutoTokenizer.from_pretrained(str(self.tokenizer_dir(path)))
+            self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+            self.model = model.to(self.device)
+            self.model.eval()
 
-        p_trust = float(probs[0].item())
-        p_scam = float(probs[1].item())
+            print(f"Model loaded from single file! device={self.device}, model={self.model_name}")
+            return True
 
+        except Exception as e:
+            print(f"Error loading single-file model: {e}")
+            return False
+
+    def _label_probs(self, p_trust: float, p_scam: float, threshold: float) -> Dict[str, Any]:
         is_scam = p_scam >= threshold
         pred_idx = 1 if is_scam else 0
 
@@ -132,6 +165,94 @@ class FirstLayerScamDetector:
             "p_scam": round(p_scam, 4),
         }
 
+    @staticmethod
+    def _no_prediction() -> Dict[str, Any]:
+        return {
+            "prediction": "No prediction",
+            "is_scam": False,
+            "confidence": 0.0,
+            "p_trust": 0.0,
+            "p_scam": 0.0,
+        }
+
+    def predict_message(
+        self,
+        message: str,
+        threshold: float = 0.45,
+    ) -> Dict[str, Any]:
+        return self.predict_batch([message], threshold=threshold)[0]
+
+    def is_loaded(self) -> bool:
+        return self.model is not None and self.tokenizer is not None
+
+    # Tensor type handed to the backend by tokenizer.pad ("pt" for torch, "np" for ONNX Runtime)
+    tensor_type = "pt"
+
+    def _forward_probs(self, input_ids, attention_mask) -> List[List[float]]:
+        logits = self.model(input_ids.to(self.device), attention_mask.to(self.device))
+        return torch.softmax(logits, dim=1).cpu().tolist()
+
+    def _bucket_of(self, n_tokens: int) -> int:
+        for b, upper in enumerate(self.length_buckets):
+            if n_tokens <= upper:
+                return b
+        return len(self.length_buckets)
+
+    @torch.no_grad()
+    def predict_batch(
+        self,
+        messages: List[str],
+        threshold: float = 0.45,
+    ) -> List[Dict[str, Any]]:
+        """
+        Batched prediction with dynamic padding.
+
+        Messages are tokenized without padding, sorted by length into buckets
+        (self.length_buckets, at most self.max_bucket_size each), and every bucket is padded
+        only to its own longest item. Results are returned in input order.
+        """
+        if not self.is_loaded():
+            raise RuntimeError("Model not loaded. Call load_model() first.")
+
+        results = [self._no_prediction() for _ in messages]
+        idx = [i for i, m in enumerate(messages) if m and m.strip()]
+        if not idx:
+            return results
+
+        encoding = self.tokenizer(
+            [messages[i].strip() for i in idx],
+            truncation=True,
+            max_length=self.max_length,
+        )
+        lengths = [len(ids) for ids in encoding["input_ids"]]
+        order = sorted(range(len(idx)), key=lambda k: lengths[k])
+
+        buckets: List[List[int]] = []
+        for k in order:
+            if (
+                not buckets
+                or len(buckets[-1]) >= self.max_bucket_size
+                or self._bucket_of(lengths[k]) != self._bucket_of(lengths[buckets[-1][0]])
+            ):
+                buckets.append([])
+            buckets[-1].append(k)
+
+        for bucket in buckets:
+            padded = self.tokenizer.pad(
+                {
+                    "input_ids": [encoding["input_ids"][k] for k in bucket],
+                    "attention_mask": [encoding["attention_mask"][k] for k in bucket],
+                },
+                padding="longest",
+                return_tensors=self.tensor_type,
+            )
+            probs = self._forward_probs(padded["input_ids"], padded["attention_mask"])
+
+            for k, row in zip(bucket, probs):
+                results[idx[k]] = self._label_probs(row[0], row[1], threshold)
+
+        return results
+
 
 # ======================================================
 # CLI test (optional)
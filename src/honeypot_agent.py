@@ -1,39 +1,73 @@
 from __future__ import annotations
 
-from typing import List, Tuple
-from openai import OpenAI
+from typing import AsyncIterator, List, Optional, Tuple
+from openai import AsyncOpenAI
 import openai
+import asyncio
 import json
+import re
 import time
 
-from app.config import OPENAI_MODEL, LLM_MAX_OUTPUT_TOKENS, SYSTEM_PROMPT
-from app.openai_tools import TOOLS
-from app.tools.summarize import extract_entities_agent
-from app.tools.callback_tool import final_callback
+from app.config import OPENAI_MODEL, LLM_MAX_OUTPUT_TOKENS, SYSTEM_PROMPT, PROMPT_CACHE_KEY, AGENT_CALL_MODE
+from app.metrics import LLM_RETRIES, REPLY_CACHE_LOOKUPS
+from app.openai_tools import TOOLS, TURN_OUTPUT_FORMAT
+from app.tools.extract_tool import extract_entities_tiered
 from app.pydantic_models import ExtractedIntelligence
+from app.reply_cache import is_repeat_in_session, reply_cache
+from app.timing import llm_call, record_llm_usage, stage
 import random
 
-client = OpenAI()
+client = AsyncOpenAI()
 
-def build_prompt(state: str, language: str, extracted: ExtractedIntelligence, history_tail: List[dict]) -> str:
-    persona = (
-        "You are a real person texting on a phone in India. "
-        "You are anxious, slightly confused, not very technical. "
-        "You believe the other person is genuine support. "
-        "Never share real OTPs, passwords, CVV, or bank credentials. "
-        "Goal: keep them talking and get them to reveal payment destination (UPI/account), phone number, and links.\n"
-        "Style: short messages, casual, 1-2 sentences. No emojis.\n"
+PERSONA = (
+    "You are a real person texting on a phone in India. "
+    "You are anxious, slightly confused, not very technical. "
+    "You believe the other person is genuine support. "
+    "Never share real OTPs, passwords, CVV, or bank credentials. "
+    "Goal: keep them talking and get them to reveal payment destination (UPI/account), phone number, and links.\n"
+    "Style: short messages, casual, 1-2 sentences. No emojis.\n"
+)
+
+GOAL_BY_STATE = {
+    "START": "Act confused; ask what happened.",
+    "TRUST_BUILDING": "Act cooperative; ask for steps/link/app.",
+    "INFO_EXTRACTION": "Ask directly for UPI/account/link to proceed.",
+    "STALLING": "Stall realistically (network/app slow) while keeping them engaged.",
+}
+
+FALLBACK_REPLY = "Sir I am not understanding. What to do now?"
+
+REPLY_INSTRUCTION = "ALWAYS respond with the next victim message. Do NOT include extracted data or JSON."
+
+STRUCTURED_OUTPUT_INSTRUCTION = (
+    "\n\nOUTPUT FORMAT:\n"
+    "Answer with the agent_turn JSON object only. `reply` is the next victim message (no extracted data, "
+    "no JSON inside it). `should_stop` and `reason` stand in for the evaluate_stop_condition tool: "
+    "the rules above for calling that tool decide when should_stop is true."
+)
+
+
+def build_static_prefix(structured: bool = False) -> str:
+    """
+    Everything that is identical across turns and sessions. It goes first (after the tool
+    schema in two-call mode) so the provider can serve it from its prompt cache.
+    """
+    return (
+        PERSONA
+        + "\nINSTRUCTIONS:\n"
+        + "1) Respond in the language given in the turn context, in a confused tone.\n"
+        + SYSTEM_PROMPT
+        + (STRUCTURED_OUTPUT_INSTRUCTION if structured else "")
     )
 
-    goal_by_state = {
-        "START": "Act confused; ask what happened.",
-        "TRUST_BUILDING": "Act cooperative; ask for steps/link/app.",
-        "INFO_EXTRACTION": "Ask directly for UPI/account/link to proceed.",
-        "STALLING": "Stall realistically (network/app slow) while keeping them engaged.",
-    }
-    goal = goal_by_state.get(state, "Keep conversation going and extract details.")
 
-    # extracted is a dict -> use .get()
+STATIC_PREFIX = build_static_prefix()
+STRUCTURED_STATIC_PREFIX = build_static_prefix(structured=True)
+
+
+def build_turn_context(state: str, language: str, extracted: ExtractedIntelligence, history_tail: List[dict], memory_summary: str = "", message_count: Optional[int] = None) -> str:
+    goal = GOAL_BY_STATE.get(state, "Keep conversation going and extract details.")
+
     known = []
     for k in ["upiIds", "bankAccounts", "phishingLinks", "phoneNumbers", "emailAddresses"]:
         values = getattr(extracted, k, [])
@@ -41,29 +75,41 @@ def build_prompt(state: str, language: str, extracted: ExtractedIntelligence, hi
             known.append(f"{k}={values}")
     known_line = ", ".join(known) if known else "(none)"
 
-    # history_tail items should have role + text; fall back safely
-    n_history_tail = history_tail[-2:]
-    n_agentic_replies = len(history_tail)
+    # history_tail is the verbatim recent window (already token-budgeted); older turns live in memory_summary
+    n_agentic_replies = message_count if message_count is not None else len(history_tail)
     transcript_lines = []
-    for m in n_history_tail:
+    for m in history_tail:
         who = (m.get("role") or m.get("sender") or "unknown").upper()
         transcript_lines.append(f"{who}: {m.get('text','')}")
     transcript = "\n".join(transcript_lines) if transcript_lines else "(none)"
 
-
     return (
-        persona
-        + f"\nCurrent objective: {goal}\n"
+        "TURN CONTEXT:\n"
+        + f"Language: {language}\n"
+        + f"Current objective: {goal}\n"
         + f"Known extracted intel: {known_line}\n"
         + f"Number of replies so far: {n_agentic_replies}\n"
+        + (f"Earlier conversation (summary):\n{memory_summary}\n" if memory_summary else "")
         + "Recent conversation:\n"
         + transcript
-        + "\n\nINSTRUCTIONS:\n"
-        + f"1) Respond in {language} in a confused tone.\n"
-        + SYSTEM_PROMPT
     )
 
 
+def build_prompt(state: str, language: str, extracted: ExtractedIntelligence, history_tail: List[dict], structured: bool = False, memory_summary: str = "", message_count: Optional[int] = None) -> List[dict]:
+    """Static prefix first, per-turn state at the tail."""
+    return [
+        {"role": "developer", "content": STRUCTURED_STATIC_PREFIX if structured else STATIC_PREFIX},
+        {"role": "user", "content": build_turn_context(state, language, extracted, history_tail, memory_summary, message_count)},
+    ]
+
+
+def _record_usage(call: str, resp, timings: dict[str, int]) -> None:
+    input_tokens, cached_tokens, output_tokens = record_llm_usage(call, resp)
+    timings[f"{call}_in_tok"] = input_tokens
+    timings[f"{call}_cached_tok"] = cached_tokens
+    timings[f"{call}_out_tok"] = output_tokens
+
+
 def append_only_function_calls(input_list: List[dict], resp) -> None:
     for item in resp.output:
         if getattr(item, "type", None) == "function_call":
@@ -76,24 +122,38 @@ def append_only_function_calls(input_list: List[dict], resp) -> None:
             })
 
 
-def call_openai_with_retry(
+def _format_timings(timings: dict[str, int]) -> str:
+    return " ".join(f"{k}={v}" for k, v in timings.items())
+
+
+async def call_openai_with_retry(
     fn,
+    call: str,
     retries: int = 3,
     base_delay: float = 1.5,
     max_delay: float = 10.0,
+    timed: bool = True,
 ):
     """
-    Exponential backoff retry wrapper for OpenAI calls.
+    Exponential backoff retry wrapper for async OpenAI calls.
+    `fn` is a zero-arg callable returning an awaitable, so every retry builds a fresh request.
+    The call (retries included) is timed under `call`; streaming callers pass timed=False and
+    time the whole stream themselves.
 
     delay = min(base_delay * (2 ** attempt), max_delay)
     Adds small jitter to avoid thundering herd.
     """
+    if timed:
+        async with llm_call(call):
+            return await call_openai_with_retry(fn, call, retries, base_delay, max_delay, timed=False)
+
     for attempt in range(retries):
         try:
-            return fn()
+            return await fn()
         except openai.InternalServerError as e:
             if attempt == retries - 1:
                 raise
+            LLM_RETRIES.labels(call=call).inc()
 
             delay = min(base_delay * (2 ** attempt), max_delay)
             # optional jitter (±20%)
@@ -106,20 +166,16 @@ def call_openai_with_retry(
                 f"({attempt + 1}/{retries}) in {sleep_for:.2f}s..."
             )
 
-            time.sleep(sleep_for)
-    
+            await asyncio.sleep(sleep_for)
+
 
-def run_agentic_turn(latest_scammer_msg: str, session_id: str, history_tail: List[dict], session_state: str, language: str, extracted: dict, background_tasks: BackgroundTasks) -> Tuple[str, dict, str]:
+async def _decide_stop(input_list: List[dict], cache_kwargs: dict, timings: dict[str, int]) -> Tuple[Optional[str], int, str]:
     """
-    Returns: (reply_text, new_extracted_bits, debug_state)
+    Tool-choice call of the two-call flow. Returns (stop_reason, tool_calls, output_text);
+    stop_reason is set when the model asked to stop. Tool outputs are appended to input_list.
     """
-
-    prompt = build_prompt(session_state, language, extracted, history_tail)
-
-    print("Extracted intel so far : ", extracted)
-    input_list: List[dict] = [{"role": "user", "content": prompt}]
-
-    resp1 = call_openai_with_retry(
+    t0 = time.perf_counter()
+    resp1 = await call_openai_with_retry(
         lambda: client.responses.create(
             model=OPENAI_MODEL,
             input=input_list,
@@ -127,18 +183,15 @@ def run_agentic_turn(latest_scammer_msg: str, session_id: str, history_tail: Lis
             tool_choice="auto",
             max_output_tokens=LLM_MAX_OUTPUT_TOKENS,
             store=False,
-        )
+            **cache_kwargs,
+        ),
+        call="turn",
     )
+    timings["llm1_ms"] = int((time.perf_counter() - t0) * 1000)
+    _record_usage("turn", resp1, timings)
 
     input_list += resp1.output
 
-    new_bits = {"upiIds": [], "phishingLinks": [], "phoneNumbers": [], "bankAccounts": [], "emailAddresses": []}
-    # tool_result = extract_entities(latest_scammer_msg)
-    tool_result = extract_entities_agent(latest_scammer_msg)
-
-    for k in new_bits.keys():
-        new_bits[k].extend(tool_result.get(k, []))
-
     tool_calls = 0
 
     # Execute any function calls and append outputs
@@ -147,36 +200,373 @@ def run_agentic_turn(latest_scammer_msg: str, session_id: str, history_tail: Lis
         if getattr(item, "type", None) == "function_call" and getattr(item, "name", None) == "evaluate_stop_condition":
             tool_calls += 1
 
-            args = json.loads(item.arguments)
+            try:
+                args = json.loads(item.arguments)
+            except (TypeError, ValueError):
+                args = None
+            if not isinstance(args, dict):
+                # Malformed tool arguments: keep the conversation going rather than fail the turn
+                print("Unparseable evaluate_stop_condition arguments:", repr(item.arguments)[:200])
+                args = {"should_stop": False, "reason": ""}
             if args.get("should_stop"):
-                final_callback(session_id=session_id, reason=args.get("reason"), background_tasks=background_tasks)
-                reply = "okay I will do it now"
-                debug = f"prompt_len={len(prompt)} tool_calls={tool_calls}"
-                empty_obj = {"upiIds": [], "phishingLinks": [], "phoneNumbers": [], "bankAccounts": [], "emailAddresses": []}
+                return args.get("reason") or "", tool_calls, ""
+            input_list.append({
+                "type": "function_call_output",
+                "call_id": item.call_id,
+                "output": json.dumps(args)
+            })
 
-                return reply, empty_obj, debug
-            else:
-                input_list.append({
-                    "type": "function_call_output",
-                    "call_id": item.call_id,
-                    "output": json.dumps(args)
-                })
+    # The reply call comes next. The reply instruction is appended rather than passed as
+    # `instructions`, which would be rendered ahead of the shared prefix.
+    input_list.append({"role": "developer", "content": REPLY_INSTRUCTION})
+    return None, tool_calls, resp1.output_text or ""
+
+
+async def _two_call_turn(input_list: List[dict], cache_kwargs: dict, timings: dict[str, int]) -> Tuple[str, Optional[str], int]:
+    """
+    Tool-choice call, then a reply call with the tool output. Returns (reply, stop_reason, tool_calls);
+    when the model asked to stop no reply call is made.
+    """
+    stop_reason, tool_calls, resp1_text = await _decide_stop(input_list, cache_kwargs, timings)
+    if stop_reason is not None:
+        return "", stop_reason, tool_calls
 
     # Second call: model now produces final victim reply
-    resp2 = call_openai_with_retry(
+    t0 = time.perf_counter()
+    resp2 = await call_openai_with_retry(
         lambda: client.responses.create(
             model=OPENAI_MODEL,
             input=input_list,
             tools=TOOLS,
             max_output_tokens=LLM_MAX_OUTPUT_TOKENS,
             store=False,
-            instructions="ALWAYS respond with the next victim message. Do NOT include extracted data or JSON."
+            **cache_kwargs,
+        ),
+        call="reply",
+    )
+    timings["llm2_ms"] = int((time.perf_counter() - t0) * 1000)
+    _record_usage("reply", resp2, timings)
+
+    return (resp2.output_text or resp1_text).strip(), None, tool_calls
+
+
+_PARTIAL_REPLY = re.compile(r'^\{\s*"reply"\s*:\s*"((?:[^"\\]|\\.)*)')
+
+
+def parse_turn_output(text: str) -> dict:
+    """
+    Decode the structured turn output. A reply that isn't valid JSON (e.g. truncated by the
+    output cap) is used as plain reply text rather than failing the turn.
+    """
+    try:
+        data = json.loads(text)
+    except (TypeError, ValueError):
+        text = (text or "").strip()
+        partial = _PARTIAL_REPLY.search(text)
+        if partial:
+            # Truncated JSON: keep whatever part of the reply string made it out
+            try:
+                text = json.loads(f'"{partial.group(1)}"').strip()
+            except ValueError:
+                text = partial.group(1).replace('\\"', '"').strip()
+        elif text.startswith("{"):
+            text = ""
+        return {"reply": text, "should_stop": False, "reason": ""}
+    if not isinstance(data, dict):
+        return {"reply": str(data), "should_stop": False, "reason": ""}
+    return {
+        "reply": str(data.get("reply") or "").strip(),
+        "should_stop": bool(data.get("should_stop")),
+        "reason": str(data.get("reason") or ""),
+    }
+
+
+async def _single_call_turn(input_list: List[dict], cache_kwargs: dict, timings: dict[str, int]) -> Tuple[str, Optional[str], int]:
+    """One structured-output call carrying the reply and the stop decision."""
+    t0 = time.perf_counter()
+    resp = await call_openai_with_retry(
+        lambda: client.responses.create(
+            model=OPENAI_MODEL,
+            input=input_list,
+            text=TURN_OUTPUT_FORMAT,
+            max_output_tokens=LLM_MAX_OUTPUT_TOKENS,
+            store=False,
+            **cache_kwargs,
+        ),
+        call="turn",
+    )
+    timings["llm1_ms"] = int((time.perf_counter() - t0) * 1000)
+    _record_usage("turn", resp, timings)
+
+    out = parse_turn_output(resp.output_text)
+    if out["should_stop"]:
+        return out["reply"], out["reason"], 1
+    return out["reply"], None, 0
+
+
+_JSON_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class ReplyFieldStream:
+    """
+    Incrementally pulls the `reply` string out of a streamed agent_turn JSON object, so reply
+    text can be forwarded before the object (and the stop decision after it) is complete.
+    """
+
+    def __init__(self):
+        self.buf = ""
+        self.pos = 0
+        self.state = "seek"  # seek -> reply -> done
+
+    def feed(self, chunk: str) -> str:
+        self.buf += chunk
+        if self.state == "seek":
+            m = re.search(r'"reply"\s*:\s*"', self.buf)
+            if not m:
+                return ""
+            self.pos = m.end()
+            self.state = "reply"
+        if self.state != "reply":
+            return ""
+
+        out = []
+        buf, pos = self.buf, self.pos
+        while pos < len(buf):
+            c = buf[pos]
+            if c == '"':
+                self.state = "done"
+                pos += 1
+                break
+            if c != "\\":
+                out.append(c)
+                pos += 1
+                continue
+            # Escape sequence: wait for the rest of it to arrive
+            if pos + 1 >= len(buf):
+                break
+            if buf[pos + 1] != "u":
+                out.append(_JSON_ESCAPES.get(buf[pos + 1], buf[pos + 1]))
+                pos += 2
+                continue
+            width = 12 if buf[pos + 2:pos + 4].lower() in ("d8", "d9", "da", "db") else 6
+            if pos + width > len(buf):
+                break
+            try:
+                out.append(json.loads(f'"{buf[pos:pos + width]}"'))
+            except ValueError:
+                pass
+            pos += width
+        self.pos = pos
+        return "".join(out)
+
+
+async def _stream_text(call: str, timer: str, input_list: List[dict], cache_kwargs: dict, timings: dict[str, int], **extra) -> AsyncIterator[str]:
+    """Stream one Responses API call, yielding output text deltas as they arrive."""
+    t0 = time.perf_counter()
+    async with llm_call(call):
+        stream = await call_openai_with_retry(
+            lambda: client.responses.create(
+                model=OPENAI_MODEL,
+                input=input_list,
+                max_output_tokens=LLM_MAX_OUTPUT_TOKENS,
+                store=False,
+                stream=True,
+                **cache_kwargs,
+                **extra,
+            ),
+            call=call,
+            timed=False,
         )
+        async for event in stream:
+            etype = getattr(event, "type", None)
+            if etype == "response.output_text.delta":
+                timings.setdefault(f"{timer}_ttft_ms", int((time.perf_counter() - t0) * 1000))
+                yield event.delta
+            elif etype == "response.completed":
+                _record_usage(call, event.response, timings)
+    timings[f"{timer}_ms"] = int((time.perf_counter() - t0) * 1000)
+
+
+def _start_extract(latest_scammer_msg: str, timings: dict[str, int]) -> asyncio.Task:
+    async def timed_extract() -> dict:
+        t0 = time.perf_counter()
+        try:
+            with stage("extract"):
+                if reply_cache is None:
+                    return await extract_entities_tiered(latest_scammer_msg)
+                bits = await reply_cache.lookup_extraction(latest_scammer_msg)
+                if bits is None:
+                    bits = await extract_entities_tiered(latest_scammer_msg)
+                    await reply_cache.store_extraction(latest_scammer_msg, bits)
+                return bits
+        finally:
+            timings["extract_ms"] = int((time.perf_counter() - t0) * 1000)
+
+    # Extraction only depends on the scammer text, so fan it out alongside the persona calls
+    # and join it right before merging.
+    return asyncio.create_task(timed_extract())
+
+
+async def _cached_reply(latest_scammer_msg: str, history_tail: List[dict], session_state: str, language: str, extracted: ExtractedIntelligence, timings: dict[str, int]) -> Optional[str]:
+    if reply_cache is None:
+        return None
+    if is_repeat_in_session(latest_scammer_msg, history_tail):
+        REPLY_CACHE_LOOKUPS.labels(result="bypass").inc()
+        return None
+    t0 = time.perf_counter()
+    reply = await reply_cache.lookup_reply(latest_scammer_msg, session_state, language, extracted)
+    timings["cache_ms"] = int((time.perf_counter() - t0) * 1000)
+    return reply
+
+
+async def _remember_reply(latest_scammer_msg: str, session_state: str, language: str, extracted: ExtractedIntelligence, reply: str) -> None:
+    if reply_cache is not None:
+        await reply_cache.store_reply(latest_scammer_msg, session_state, language, extracted, reply)
+
+
+async def _finish_agent_turn(
+    reply: str,
+    stop_reason: Optional[str],
+    tool_calls: int,
+    prompt_len: int,
+    extract_task: asyncio.Task,
+    timings: dict[str, int],
+    turn_start: float,
+    stop_reply: str = "okay I will do it now",
+) -> Tuple[str, dict, str, Optional[str]]:
+    if stop_reason is not None:
+        # The final callback is sent by the handler once deferred session work has settled
+        extract_task.cancel()
+        timings["total_ms"] = int((time.perf_counter() - turn_start) * 1000)
+        debug = f"mode={AGENT_CALL_MODE} prompt_len={prompt_len} tool_calls={tool_calls} {_format_timings(timings)}"
+        empty_obj = {"upiIds": [], "phishingLinks": [], "phoneNumbers": [], "bankAccounts": [], "emailAddresses": []}
+
+        return stop_reply, empty_obj, debug, stop_reason
+
+    if not reply:
+        reply = FALLBACK_REPLY
+
+    # Join the extraction fan-out before handing bits back for the merge
+    t0 = time.perf_counter()
+    tool_result = await extract_task
+    timings["extract_wait_ms"] = int((time.perf_counter() - t0) * 1000)
+
+    new_bits = {"upiIds": [], "phishingLinks": [], "phoneNumbers": [], "bankAccounts": [], "emailAddresses": []}
+    for k in new_bits.keys():
+        new_bits[k].extend(tool_result.get(k, []))
+
+    timings["total_ms"] = int((time.perf_counter() - turn_start) * 1000)
+    debug = f"mode={AGENT_CALL_MODE} prompt_len={prompt_len} tool_calls={tool_calls} {_format_timings(timings)}"
+    return reply, new_bits, debug, None
+
+
+async def run_agentic_turn(latest_scammer_msg: str, history_tail: List[dict], session_state: str, language: str, extracted: dict, memory_summary: str = "", message_count: Optional[int] = None) -> Tuple[str, dict, str, Optional[str]]:
+    """
+    Returns: (reply_text, new_extracted_bits, debug_state, stop_reason)
+    """
+
+    timings: dict[str, int] = {}
+    turn_start = time.perf_counter()
+    extract_task = _start_extract(latest_scammer_msg, timings)
+
+    single_call = AGENT_CALL_MODE != "two-call"
+    input_list: List[dict] = build_prompt(
+        session_state, language, extracted, history_tail, structured=single_call,
+        memory_summary=memory_summary, message_count=message_count,
+    )
+    prompt_len = sum(len(m["content"]) for m in input_list)
+    cache_kwargs = {"prompt_cache_key": PROMPT_CACHE_KEY} if PROMPT_CACHE_KEY else {}
+
+    print("Extracted intel so far : ", extracted)
+
+    try:
+        reply = await _cached_reply(latest_scammer_msg, history_tail, session_state, language, extracted, timings)
+        if reply is not None:
+            stop_reason, tool_calls = None, 0
+        else:
+            if single_call:
+                reply, stop_reason, tool_calls = await _single_call_turn(input_list, cache_kwargs, timings)
+            else:
+                reply, stop_reason, tool_calls = await _two_call_turn(input_list, cache_kwargs, timings)
+            if stop_reason is None and reply:
+                await _remember_reply(latest_scammer_msg, session_state, language, extracted, reply)
+    except BaseException:
+        extract_task.cancel()
+        raise
+
+    return await _finish_agent_turn(reply, stop_reason, tool_calls, prompt_len, extract_task, timings, turn_start)
+
+
+async def stream_agentic_turn(latest_scammer_msg: str, history_tail: List[dict], session_state: str, language: str, extracted: dict, outcome: dict, memory_summary: str = "", message_count: Optional[int] = None) -> AsyncIterator[str]:
+    """
+    Streaming run_agentic_turn: yields reply text deltas as the model produces them. Once the
+    generator is exhausted, `outcome` holds reply/new_bits/debug/stop_reason as run_agentic_turn
+    returns them.
+
+    In single-call mode the stop decision arrives after the reply, so a stopping turn keeps the
+    reply that was already streamed.
+    """
+    timings: dict[str, int] = {}
+    turn_start = time.perf_counter()
+    extract_task = _start_extract(latest_scammer_msg, timings)
+
+    single_call = AGENT_CALL_MODE != "two-call"
+    input_list: List[dict] = build_prompt(
+        session_state, language, extracted, history_tail, structured=single_call,
+        memory_summary=memory_summary, message_count=message_count,
     )
+    prompt_len = sum(len(m["content"]) for m in input_list)
+    cache_kwargs = {"prompt_cache_key": PROMPT_CACHE_KEY} if PROMPT_CACHE_KEY else {}
 
-    reply = (resp2.output_text or resp1.output_text or "").strip()
+    parts: List[str] = []
+    stop_reason: Optional[str] = None
+    tool_calls = 0
+
+    def emit(piece: str) -> str:
+        # Drop leading whitespace so the streamed text matches the stripped reply
+        if not parts:
+            piece = piece.lstrip()
+        if piece:
+            parts.append(piece)
+        return piece
+
+    try:
+        cached = await _cached_reply(latest_scammer_msg, history_tail, session_state, language, extracted, timings)
+        if cached is not None:
+            yield emit(cached)
+        elif single_call:
+            fields = ReplyFieldStream()
+            raw: List[str] = []
+            async for chunk in _stream_text("turn", "llm1", input_list, cache_kwargs, timings, text=TURN_OUTPUT_FORMAT):
+                raw.append(chunk)
+                piece = emit(fields.feed(chunk))
+                if piece:
+                    yield piece
+            out = parse_turn_output("".join(raw))
+            if not parts and out["reply"]:
+                # Fields came back in an unexpected order; forward the reply in one piece
+                yield emit(out["reply"])
+            if out["should_stop"]:
+                stop_reason, tool_calls = out["reason"], 1
+        else:
+            stop_reason, tool_calls, _ = await _decide_stop(input_list, cache_kwargs, timings)
+            if stop_reason is None:
+                async for chunk in _stream_text("reply", "llm2", input_list, cache_kwargs, timings, tools=TOOLS):
+                    piece = emit(chunk)
+                    if piece:
+                        yield piece
+    except BaseException:
+        extract_task.cancel()
+        raise
+
+    reply = "".join(parts).strip()
+    if cached is None and stop_reason is None and reply:
+        await _remember_reply(latest_scammer_msg, session_state, language, extracted, reply)
+    stop_reply = reply or "okay I will do it now"
     if not reply:
-        reply = "Sir I am not understanding. What to do now?"
+        # Nothing was streamed: send the same fallback/stop line the blocking endpoint returns
+        yield stop_reply if stop_reason is not None else FALLBACK_REPLY
 
-    debug = f"prompt_len={len(prompt)} tool_calls={tool_calls}"
-    return reply, new_bits, debug
+    outcome["reply"], outcome["new_bits"], outcome["debug"], outcome["stop_reason"] = await _finish_agent_turn(
+        reply, stop_reason, tool_calls, prompt_len, extract_task, timings, turn_start, stop_reply=stop_reply,
+    )
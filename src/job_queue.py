@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import json
+import time
+import uuid
+from typing import Optional, Tuple
+
+import redis
+
+from app.config import REDIS_HOST, REDIS_PORT, JOB_MAX_ATTEMPTS
+
+
+class RedisJobQueue:
+    """
+    Durable job queue on Redis lists (reliable-queue pattern).
+
+    enqueue -> LPUSH <name>
+    reserve -> BLMOVE <name> -> <name>:processing (job survives a worker crash)
+    ack     -> LREM from <name>:processing
+    fail    -> retry with attempts+1, or park in <name>:dead after JOB_MAX_ATTEMPTS
+    bury    -> park a job in <name>:dead directly (e.g. an inline delivery that gave up)
+    replay  -> move dead jobs back onto the queue with a fresh attempt budget
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.processing = f"{name}:processing"
+        self.dead = f"{name}:dead"
+        self._r = redis.Redis(
+            host=REDIS_HOST,
+            port=int(REDIS_PORT),
+            decode_responses=True,
+            socket_connect_timeout=3,
+            # reserve() blocks server-side, keep the socket open longer than the block timeout
+            socket_timeout=30,
+        )
+
+    def enqueue(self, job: dict) -> str:
+        job = dict(job)
+        job.setdefault("job_id", uuid.uuid4().hex)
+        job.setdefault("enqueued_at", time.time())
+        job.setdefault("attempts", 0)
+        self._r.lpush(self.name, json.dumps(job, ensure_ascii=False))
+        return job["job_id"]
+
+    def reserve(self, timeout: int = 5) -> Optional[Tuple[str, dict]]:
+        raw = self._r.blmove(self.name, self.processing, timeout, "RIGHT", "LEFT")
+        if raw is None:
+            return None
+        return raw, json.loads(raw)
+
+    def ack(self, raw: str) -> None:
+        self._r.lrem(self.processing, 1, raw)
+
+    def fail(self, raw: str, job: dict, error: str) -> bool:
+        """
+        Returns True when the job was re-queued, False when it went to the dead-letter list.
+        """
+        job = dict(job)
+        job["attempts"] = int(job.get("attempts", 0)) + 1
+        job["last_error"] = error
+        retry = job["attempts"] < JOB_MAX_ATTEMPTS
+
+        pipe = self._r.pipeline()
+        pipe.lrem(self.processing, 1, raw)
+        pipe.lpush(self.name if retry else self.dead, json.dumps(job, ensure_ascii=False))
+        pipe.execute()
+        return retry
+
+    def bury(self, job: dict, error: str) -> str:
+        job = dict(job)
+        job.setdefault("job_id", uuid.uuid4().hex)
+        job.setdefault("enqueued_at", time.time())
+        job["attempts"] = int(job.get("attempts", 0))
+        job["last_error"] = error
+        self._r.lpush(self.dead, json.dumps(job, ensure_ascii=False))
+        return job["job_id"]
+
+    def replay_dead(self, limit: Optional[int] = None) -> int:
+        """Re-queue dead-lettered jobs, oldest first. Returns how many were moved."""
+        moved = 0
+        while limit is None or moved < limit:
+            raw = self._r.rpop(self.dead)
+            if raw is None:
+                break
+            job = json.loads(raw)
+            job["attempts"] = 0
+            job["replayed_at"] = time.time()
+            self._r.lpush(self.name, json.dumps(job, ensure_ascii=False))
+            moved += 1
+        return moved
+
+    def dead_depth(self) -> int:
+        return int(self._r.llen(self.dead))
+
+    def requeue_processing(self) -> int:
+        """
+        Move jobs left in the processing list by a crashed worker back onto the queue.
+        Only call this when no other worker is running.
+        """
+        moved = 0
+        while self._r.lmove(self.processing, self.name, "RIGHT", "RIGHT") is not None:
+            moved += 1
+        return moved
+
+    def depth(self) -> int:
+        return int(self._r.llen(self.name))
+
+
+final_callback_queue = RedisJobQueue("jobs:final_callback")
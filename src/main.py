@@ -2,51 +2,85 @@ from __future__ import annotations
 from queue import Empty
 
 from fastapi import FastAPI, BackgroundTasks, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
-from app.session_store import store
-from app.pydantic_models import IncomingEvent, AgentResponse
+from app.callback import close_http_client
+from app.session_store import SessionConflictError, SessionUnitOfWork, close_session_store, open_session_store
+from app.pydantic_models import ExtractedIntelligence, IncomingEvent, AgentResponse
 from app.auth import api_key_auth
-from app.config import MAX_REPLY_CHARS, MODEL_PATH, SCAM_GATE
-from app.first_scam_gate import FirstLayerScamDetector
-from app.honeypot_agent import run_agentic_turn
+from app.config import MAX_REPLY_CHARS, REQUEST_TIMING_LOG, SCAM_GATE, SCAM_GATE_BATCH_SIZE, SCAM_GATE_BATCH_WAIT_MS
+from app.model_cache import load_scam_detector
+from app.scam_gate_batcher import ScamGateBatcher
+from app.honeypot_agent import run_agentic_turn, stream_agentic_turn
+from app.metrics import HTTP_REQUEST_SECONDS
+from app.timing import begin_request_spans, stage
+from app.conversation_memory import record_turn, recent_window, update_memory
+from app.state_engine import advance_state
 from app.tools.extract_tool import merge_unique
-from app.tools.callback_tool import final_callback
+from app.tools.callback_tool import close_session, final_callback
+from app.turn_guard import TurnRejected, session_turn, turn_fingerprint
 
 import time
 from fastapi import FastAPI, Request
 from starlette.middleware.base import BaseHTTPMiddleware
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
-from pathlib import Path
-from urllib.request import urlopen
-import shutil
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Literal, Optional
+import asyncio
+import json
 
 models = {}
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    global detector
-    print("Downloading scam detection model...")
+NOT_SCAM_REPLY = "Sorry, can you explain?"
+
+# disabled | loading | ready | failed
+scam_gate_status = {"status": "disabled"}
 
-    url = "https://huggingface.co/spaces/jacksonwambali/Bert/resolve/main/bert_scam_detector.pth"
-    out_path = Path(MODEL_PATH)
 
-    out_path.parent.mkdir(parents=True, exist_ok=True)
+async def warm_scam_gate() -> None:
+    """
+    Load the detector off the event loop so the API serves traffic (and answers liveness
+    probes) while BERT is still loading.
+    """
+    scam_gate_status["status"] = "loading"
+    t0 = time.perf_counter()
+    try:
+        detector = await asyncio.to_thread(load_scam_detector)
+    except Exception as e:
+        scam_gate_status["status"] = "failed"
+        print(f"Scam gate warm-up failed: {e}")
+        return
 
-    with urlopen(url) as response, open(out_path, "wb") as out_file:
-        shutil.copyfileobj(response, out_file)
+    models["scam_detector"] = detector
 
-    print("Loading scam detection model...")
-    detector = FirstLayerScamDetector()
+    batcher = ScamGateBatcher(detector, max_batch_size=SCAM_GATE_BATCH_SIZE, max_wait_ms=SCAM_GATE_BATCH_WAIT_MS)
+    batcher.start()
+    models["scam_gate"] = batcher
+    scam_gate_status["status"] = "ready"
+    print(f"Scam gate warm in {(time.perf_counter() - t0) * 1000:.0f}ms")
 
-    scam_model = detector.load_model(MODEL_PATH)
-    if not scam_model:
-        raise RuntimeError("Failed to load scam detection model")
 
-    models["scam_detector"] = detector
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup_t0 = time.perf_counter()
+    await open_session_store()
+
+    warmup = None
+    if SCAM_GATE.lower() == "true":
+        warmup = asyncio.create_task(warm_scam_gate())
+
+    print(f"Startup complete in {(time.perf_counter() - startup_t0) * 1000:.0f}ms")
     yield
 
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
+    if "scam_gate" in models:
+        await models["scam_gate"].stop()
+    await close_session_store()
+    await close_http_client()
+
 app = FastAPI(title="Agentic Honeypot API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
@@ -56,26 +90,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Probes and scrapes: observed in the latency histogram, left out of the timing log
+_QUIET_ROUTES = {"/health", "/health/live", "/health/ready", "/metrics"}
+
+
 class LogAll(BaseHTTPMiddleware):
+    """
+    Request latency into honeypot_http_request_seconds, plus one JSON timing line per request with
+    the stage spans (app.timing) recorded while handling it. Streamed responses are measured until
+    the response starts; their later stages still land in the stage histograms.
+    """
+
     async def dispatch(self, request: Request, call_next):
-        start = time.time()
-        body = await request.body()
-        # print("==== INCOMING REQUEST ====")
-        # print("METHOD:", request.method)
-        # print("PATH:", request.url.path)
-        # print("QUERY:", request.url.query)
-        # print("HEADERS:", dict(request.headers))
-        # print("BODY_LEN:", len(body))
-        # # show only first 2000 bytes to avoid huge spam
-        # print("BODY_SNIP:", body[:2000])
-        # print("==========================")
-
-        resp = await call_next(request)
-        ms = int((time.time() - start) * 1000)
-        # print("==== RESPONSE ====")
-        # print("STATUS:", resp.status_code, "TIME_MS:", ms)
-        # print("==================")
-        return resp
+        start = time.perf_counter()
+        spans = begin_request_spans()
+
+        status = 500
+        try:
+            resp = await call_next(request)
+            status = resp.status_code
+            return resp
+        finally:
+            elapsed = time.perf_counter() - start
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_SECONDS.labels(method=request.method, route=route, status=str(status)).observe(elapsed)
+            if REQUEST_TIMING_LOG and route not in _QUIET_ROUTES:
+                print(json.dumps({
+                    "event": "request",
+                    "method": request.method,
+                    "route": route,
+                    "status": status,
+                    "ms": int(elapsed * 1000),
+                    **spans,
+                }))
 
 app.add_middleware(LogAll)
 
@@ -83,18 +130,125 @@ app.add_middleware(LogAll)
 def health():
     return {"status": "ok"}
 
+@app.get("/health/live")
+def health_live():
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+def health_ready():
+    gate = scam_gate_status["status"]
+    if gate in ("disabled", "ready"):
+        return {"status": "ready", "scam_gate": gate}
+    return JSONResponse(status_code=503, content={"status": "not_ready", "scam_gate": gate})
+
+@app.get("/metrics")
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.post("/v1/message", response_model=AgentResponse)
 async def handle_message(
     event: IncomingEvent,
     background_tasks: BackgroundTasks,
     _: None = Depends(api_key_auth),
 ):
-    st = store.get_or_create(event.sessionId)
+    try:
+        async with session_turn(event.sessionId, turn_fingerprint(event)) as turn:
+            if turn.coalesced_reply is not None:
+                return AgentResponse(status="success", reply=turn.coalesced_reply)
+
+            turn.reply = await run_turn(event, background_tasks)
+            return AgentResponse(status="success", reply=turn.reply)
+    except TurnRejected:
+        return _turn_rejected()
+    except SessionConflictError as e:
+        print("Session save conflict:", e)
+        return _save_conflict()
+
+
+@app.post("/v1/message/stream")
+async def handle_message_stream(
+    event: IncomingEvent,
+    background_tasks: BackgroundTasks,
+    format: Literal["sse", "ndjson"] = "sse",
+    _: None = Depends(api_key_auth),
+):
+    """
+    Same turn as /v1/message, streamed as SSE (default) or NDJSON. Merge, persistence and stop
+    handling run after the last delta; the final `done` event carries the full reply.
+    """
+    # Take the session lease before the response starts so a rejection is still a plain 409
+    lease = AsyncExitStack()
+    try:
+        turn = await lease.enter_async_context(session_turn(event.sessionId, turn_fingerprint(event)))
+    except TurnRejected:
+        return _turn_rejected()
+
+    encode = _sse if format == "sse" else _ndjson
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def produce() -> None:
+        # Runs as its own task: a client that disconnects stops `body`, not the turn, so the
+        # session is still saved and the lease released
+        try:
+            if turn.coalesced_reply is not None:
+                events.put_nowait(encode({"type": "delta", "text": turn.coalesced_reply}))
+                events.put_nowait(encode({"type": "done", "status": "success", "reply": turn.coalesced_reply}))
+                return
+
+            try:
+                async for item in stream_turn(event, background_tasks):
+                    if item["type"] == "done":
+                        turn.reply = item["reply"]
+                    events.put_nowait(encode(item))
+            except SessionConflictError as e:
+                print("Session save conflict:", e)
+                events.put_nowait(encode({"type": "error", "status": "error", "reply": _SAVE_CONFLICT_REPLY}))
+            except Exception as e:
+                print("Streaming turn failed:", repr(e))
+                events.put_nowait(encode({"type": "error", "status": "error", "reply": "Sorry, something went wrong."}))
+        finally:
+            events.put_nowait(None)
+            await lease.aclose()
+
+    task = asyncio.create_task(produce())
+    _stream_turns.add(task)
+    task.add_done_callback(_stream_turns.discard)
+
+    async def body() -> AsyncIterator[str]:
+        while (chunk := await events.get()) is not None:
+            yield chunk
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream" if format == "sse" else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Streaming turns in flight, referenced so they aren't garbage-collected mid-turn
+_stream_turns: set[asyncio.Task] = set()
+
+
+def _turn_rejected() -> JSONResponse:
+    return JSONResponse(
+        status_code=409,
+        content={"status": "error", "reply": "Another message for this session is still being processed."},
+    )
 
-    # If session already closed, reply minimally
-    if st.status == "closed":
-        return AgentResponse(status="success", reply="Okay, thanks.")
 
+_SAVE_CONFLICT_REPLY = "This session was updated by another request; please resend the message."
+
+
+def _save_conflict() -> JSONResponse:
+    return JSONResponse(status_code=409, content={"status": "error", "reply": _SAVE_CONFLICT_REPLY})
+
+
+async def prepare_turn(uow: SessionUnitOfWork, event: IncomingEvent) -> Optional[dict]:
+    """
+    Scam gate, history and state bookkeeping for one turn. Returns run_agentic_turn's kwargs,
+    or None when the sender was judged not to be a scammer.
+    """
+    st = uow.state
     st.language = event.metadata.language
 
     # -----------------------------
@@ -103,11 +257,16 @@ async def handle_message(
 
     scam_gate = SCAM_GATE.lower() == "true"
     if not event.conversationHistory and scam_gate:
-        text_lower = event.message.text.lower()
-        detector_response = models["scam_detector"].predict_message(text_lower)
-        print("Scam Detection", detector_response["prediction"])
-        if event.message.sender == "scammer" and detector_response["prediction"] == "trust":
-            st.scam_detected = False
+        if scam_gate_status["status"] == "ready":
+            text_lower = event.message.text.lower()
+            with stage("scam_gate"):
+                detector_response = await models["scam_gate"].predict(text_lower)
+            print("Scam Detection", detector_response["prediction"])
+            if event.message.sender == "scammer" and detector_response["prediction"] == "trust":
+                st.scam_detected = False
+        else:
+            # Gate still warming up (or failed): engage rather than drop a possible scammer
+            print("Scam gate not ready, engaging without gate:", scam_gate_status["status"])
 
     # -----------------------------
     # Agent reply (agentic + tool calls)
@@ -119,44 +278,51 @@ async def handle_message(
     if not hasattr(st, "summary") or st.summary is None:
         st.summary = ""
     if not hasattr(st, "extracted") or st.extracted is None:
-        st.extracted = {"upiIds": [], "urls": [], "phones": [], "accounts": []}
-
-    if st.scam_detected:
-        # Build a small tail from conversationHistory + latest scammer msg
-        # Your IncomingEvent.conversationHistory should have {sender, text, timestamp}
-        effective = [
-            {"sender": h.sender, "text": h.text, "timestamp": h.timestamp}
-            for h in event.conversationHistory
-            if h.sender == "scammer"
-        ]
-        effective.append({"sender": "scammer", "text": event.message.text, "timestamp": event.message.timestamp})
-        st.conversationHistory = effective
-        history_tail = effective  # hard cap for cost + speed
-
-        # Simple state update heuristic (optional but useful)
-        txt = event.message.text.lower()
-        if st.state == "START":
-            st.state = "CONFUSED"
-        if "otp" in txt or "password" in txt or "verify" in txt:
-            st.state = "TRUST_BUILDING"
-        if "link" in txt or "install" in txt:
-            st.state = "INFO_EXTRACTION"
-        if st.extracted.upiIds or st.extracted.bankAccounts:
-            st.state = "STALLING"
-
-        # Run one agentic turn: model calls tools -> we execute -> get extracted intel + reply
-        reply, new_bits, dbg = run_agentic_turn(
-            latest_scammer_msg=event.message.text,
-            session_id=st.session_id,
-            history_tail=history_tail,
-            session_state=st.state,
-            language=st.language,
-            extracted=st.extracted,
-            background_tasks=background_tasks
-        )
+        st.extracted = ExtractedIntelligence()
 
+    if not st.scam_detected:
+        return None
+
+    # Append only the new scammer messages, fold older ones into the running summary
+    with stage("memory"):
+        record_turn(st, event)
+        pending_summary = update_memory(st)
+        if pending_summary is not None:
+            uow.defer(pending_summary)
+        history_tail = recent_window(st)
+
+    # Conversation state: one intent-scanner pass over the message, then the transition table
+    advance_state(st, event.message.text)
+
+    return dict(
+        latest_scammer_msg=event.message.text,
+        history_tail=history_tail,
+        memory_summary=st.memory_summary,
+        message_count=st.history_len,
+        session_state=st.state,
+        language=st.language,
+        extracted=st.extracted,
+    )
+
+
+async def finish_turn(
+    uow: SessionUnitOfWork,
+    reply: str,
+    new_bits: Optional[dict],
+    dbg: str,
+    background_tasks: BackgroundTasks,
+    stop_reason: Optional[str] = None,
+) -> str:
+    """
+    Merge the agent's output, apply stop conditions and flush the session once. `stop_reason`
+    is set when the agent decided to end the conversation this turn.
+    """
+    st = uow.state
+
+    if new_bits is not None:
         # Merge extracted intel into session
-        st.extracted = merge_unique(st.extracted, new_bits)
+        with stage("merge"):
+            st.extracted = merge_unique(st.extracted, new_bits)
 
         st.agent_turns += 1
         st.agent_notes = dbg
@@ -165,19 +331,91 @@ async def handle_message(
         if not st.summary:
             st.summary = "Scammer claims account issue and demands urgent action."
     else:
-        reply = "Sorry, can you explain?"
         st.agent_turns += 1
 
     reply = reply[:MAX_REPLY_CHARS]
 
-    if not st.scam_detected:
-        final_callback(st.session_id, "Scam not detected", background_tasks=background_tasks)
+    # A pending LLM memory summary must land before the session is handed to the callback
+    await uow.settle()
 
+    close_reason = None
+    if st.final_callback_sent:
+        pass
+    elif stop_reason is not None:
+        close_reason = stop_reason
+    elif not st.scam_detected:
+        close_reason = "Scam not detected"
     elif st.scam_detected and st.agent_turns > 10:
-        final_callback(st.session_id, "Number of conversations exceeded set max limit", background_tasks=background_tasks)
+        close_reason = "Number of conversations exceeded set max limit"
+    if close_reason is not None:
+        close_session(st)
+
+    # A concurrent turn for this session flushed first: SessionConflictError propagates so the
+    # handler answers 409, and no callback goes out for a state that was never saved
+    with stage("save"):
+        await uow.commit()
 
-    store.save(st)
-    return AgentResponse(status="success", reply=reply)
+    if close_reason is not None:
+        await final_callback(st, close_reason, background_tasks=background_tasks)
+    return reply
+
+
+async def run_turn(event: IncomingEvent, background_tasks: BackgroundTasks) -> str:
+    with stage("session_load"):
+        uow = await SessionUnitOfWork.begin(event.sessionId)
+
+    # If session already closed, reply minimally
+    if uow.state.status == "closed":
+        return "Okay, thanks."
+
+    agent_kwargs = await prepare_turn(uow, event)
+    if agent_kwargs is None:
+        return await finish_turn(uow, NOT_SCAM_REPLY, None, "", background_tasks)
+
+    # Run one agentic turn: model calls tools -> we execute -> get extracted intel + reply
+    reply, new_bits, dbg, stop_reason = await run_agentic_turn(**agent_kwargs)
+    return await finish_turn(uow, reply, new_bits, dbg, background_tasks, stop_reason)
+
+
+async def stream_turn(event: IncomingEvent, background_tasks: BackgroundTasks) -> AsyncIterator[dict]:
+    """
+    run_turn as a stream of events: {"type": "delta", "text"} while the reply is generated,
+    then {"type": "done", "status", "reply"} once the session has been merged and saved.
+    Deltas are clipped so their concatenation never exceeds MAX_REPLY_CHARS.
+    """
+    with stage("session_load"):
+        uow = await SessionUnitOfWork.begin(event.sessionId)
+
+    if uow.state.status == "closed":
+        reply = "Okay, thanks."
+    else:
+        agent_kwargs = await prepare_turn(uow, event)
+        if agent_kwargs is None:
+            reply = await finish_turn(uow, NOT_SCAM_REPLY, None, "", background_tasks)
+        else:
+            outcome: dict = {}
+            sent = 0
+            async for delta in stream_agentic_turn(**agent_kwargs, outcome=outcome):
+                piece = delta[:max(0, MAX_REPLY_CHARS - sent)]
+                if piece:
+                    sent += len(piece)
+                    yield {"type": "delta", "text": piece}
+            reply = await finish_turn(
+                uow, outcome["reply"], outcome["new_bits"], outcome["debug"], background_tasks, outcome["stop_reason"]
+            )
+            yield {"type": "done", "status": "success", "reply": reply}
+            return
+
+    yield {"type": "delta", "text": reply}
+    yield {"type": "done", "status": "success", "reply": reply}
+
+
+def _sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+def _ndjson(event: dict) -> str:
+    return json.dumps(event, ensure_ascii=False) + "\n"
 
 
 @app.exception_handler(Exception)
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Scam gate micro-batching
+SCAM_GATE_QUEUE_DEPTH = Gauge(
+    "honeypot_scam_gate_queue_depth",
+    "Scam gate requests waiting for a batch slot",
+)
+SCAM_GATE_BATCH_SIZE = Histogram(
+    "honeypot_scam_gate_batch_size",
+    "Number of messages per scam gate forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+SCAM_GATE_BATCH_SECONDS = Histogram(
+    "honeypot_scam_gate_batch_seconds",
+    "Wall time of one scam gate forward pass",
+)
+
+# Per-session turn concurrency (outcome: acquired | queued | coalesced | rejected | timeout)
+SESSION_TURN_CONCURRENCY = Counter(
+    "honeypot_session_turn_concurrency_total",
+    "How concurrent turns for the same session were resolved",
+    ["policy", "outcome"],
+)
+
+# Final callback delivery (outcome: delivered | failed; status: 2xx | 4xx | 5xx | error)
+CALLBACK_DELIVERIES = Counter(
+    "honeypot_callback_deliveries_total",
+    "Final callback deliveries by end result",
+    ["outcome"],
+)
+CALLBACK_ATTEMPTS = Counter(
+    "honeypot_callback_attempts_total",
+    "Individual final callback HTTP attempts by response class",
+    ["status"],
+)
+CALLBACK_DELIVERY_SECONDS = Histogram(
+    "honeypot_callback_delivery_seconds",
+    "Time to deliver a final callback, including retries and backoff",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+CALLBACK_DEAD_LETTERED = Counter(
+    "honeypot_callback_dead_lettered_total",
+    "Final callbacks parked in the dead-letter list",
+)
+CALLBACK_BATCH_SIZE = Histogram(
+    "honeypot_callback_batch_size",
+    "Final callbacks per bulk delivery request",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250),
+)
+
+# LLM token usage per call (call: turn | reply | extract | keywords | behaviour_summary | memory_summary);
+# cached tokens are served from the provider prompt cache
+LLM_INPUT_TOKENS = Counter(
+    "honeypot_llm_input_tokens_total",
+    "Input tokens billed per LLM call kind",
+    ["call"],
+)
+LLM_CACHED_INPUT_TOKENS = Counter(
+    "honeypot_llm_cached_input_tokens_total",
+    "Input tokens served from the provider prompt cache",
+    ["call"],
+)
+LLM_OUTPUT_TOKENS = Counter(
+    "honeypot_llm_output_tokens_total",
+    "Output tokens (reasoning included) billed per LLM call kind",
+    ["call"],
+)
+
+# Reply cache (result: exact | near | miss | bypass | extract_hit | extract_miss)
+REPLY_CACHE_LOOKUPS = Counter(
+    "honeypot_reply_cache_lookups_total",
+    "Reply/extraction cache lookups by result",
+    ["result"],
+)
+
+# Every Responses API call, end to end including app-level retries and backoff
+# (call: turn | reply | extract | keywords | behaviour_summary | memory_summary; outcome: ok | error)
+LLM_CALL_SECONDS = Histogram(
+    "honeypot_llm_call_seconds",
+    "Wall time of one LLM call including retries; streamed calls until the last event",
+    ["call"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+LLM_CALLS = Counter(
+    "honeypot_llm_calls_total",
+    "LLM calls by kind and end result",
+    ["call", "outcome"],
+)
+LLM_RETRIES = Counter(
+    "honeypot_llm_retries_total",
+    "LLM call attempts retried after a server error",
+    ["call"],
+)
+
+# Hot-path stages of a turn
+# (stage: session_load | scam_gate | memory | extract | merge | save | callback_enqueue | callback_payload)
+TURN_STAGE_SECONDS = Histogram(
+    "honeypot_turn_stage_seconds",
+    "Wall time of one stage of a turn",
+    ["stage"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+# Whole requests as seen by the LogAll middleware (route is the path template)
+HTTP_REQUEST_SECONDS = Histogram(
+    "honeypot_http_request_seconds",
+    "Request latency until the response starts",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30),
+)
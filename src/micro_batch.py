@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import asyncio
+from typing import List, TypeVar
+
+T = TypeVar("T")
+
+
+async def collect_batch(queue: asyncio.Queue[T], max_items: int, max_wait: float) -> List[T]:
+    """
+    Wait for one item, then keep taking items until `max_items` are collected or `max_wait`
+    seconds have passed since the first one. Shared by the scam-gate and callback batchers.
+    """
+    loop = asyncio.get_running_loop()
+    batch = [await queue.get()]
+    deadline = loop.time() + max_wait
+
+    while len(batch) < max_items:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(queue.get(), remaining))
+        except asyncio.TimeoutError:
+            break
+    return batch
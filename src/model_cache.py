@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.request import urlopen
+
+from app.config import (
+    MODEL_PATH, MODEL_URL, MODEL_SHA256, MODEL_SINGLE_FILE_PATH,
+    SCAM_GATE_BACKEND, ONNX_MODEL_PATH, ONNX_QUANTIZE, ONNX_INTRA_OP_THREADS,
+)
+from app.first_scam_gate import FirstLayerScamDetector
+
+
+def sha256_file(path: Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _digest_path(path: Path) -> Path:
+    return path.with_name(path.name + ".sha256")
+
+
+def is_cached(path: Path, expected_sha256: Optional[str] = None) -> bool:
+    """
+    A cached artifact is valid when its digest matches the pinned MODEL_SHA256, or, when nothing
+    is pinned, the digest recorded next to it at download time.
+    """
+    if not path.exists():
+        return False
+
+    expected = (expected_sha256 or "").lower()
+    if not expected:
+        digest_file = _digest_path(path)
+        if not digest_file.exists():
+            return False
+        expected = digest_file.read_text().strip().lower()
+
+    return sha256_file(path) == expected
+
+
+def ensure_artifact(url: str, path: str, expected_sha256: Optional[str] = None) -> Path:
+    """
+    Download `url` to `path` unless a checksum-valid copy is already there.
+    Downloads are hashed while streaming and moved into place atomically.
+    """
+    out_path = Path(path)
+    if is_cached(out_path, expected_sha256):
+        print(f"Using cached model artifact {out_path}")
+        return out_path
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_name(out_path.name + ".part")
+
+    print(f"Downloading model artifact {url} ...")
+    h = hashlib.sha256()
+    with urlopen(url) as response, open(tmp_path, "wb") as out_file:
+        for chunk in iter(lambda: response.read(1 << 20), b""):
+            h.update(chunk)
+            out_file.write(chunk)
+
+    digest = h.hexdigest()
+    if expected_sha256 and digest != expected_sha256.lower():
+        os.remove(tmp_path)
+        raise RuntimeError(f"Checksum mismatch for {url}: expected {expected_sha256}, got {digest}")
+
+    os.replace(tmp_path, out_path)
+    _digest_path(out_path).write_text(digest)
+    return out_path
+
+
+def load_scam_detector() -> FirstLayerScamDetector:
+    """
+    Load the scam gate from the fastest available local artifact:
+    ONNX file (onnx backend) -> single-file safetensors -> cached torch checkpoint -> download.
+    """
+    t0 = time.perf_counter()
+    source = "checkpoint"
+
+    if SCAM_GATE_BACKEND == "onnx":
+        from app.onnx_scam_gate import OnnxScamDetector
+
+        detector = OnnxScamDetector(ONNX_MODEL_PATH, intra_op_threads=ONNX_INTRA_OP_THREADS, quantize=ONNX_QUANTIZE)
+        if not Path(ONNX_MODEL_PATH).exists():
+            ensure_artifact(MODEL_URL, MODEL_PATH, MODEL_SHA256)
+        else:
+            source = "onnx"
+        ok = detector.load_model(MODEL_PATH)
+
+    else:
+        detector = FirstLayerScamDetector()
+        ok = False
+        if MODEL_SINGLE_FILE_PATH and Path(MODEL_SINGLE_FILE_PATH).exists():
+            source = "safetensors"
+            ok = detector.load_single_file(MODEL_SINGLE_FILE_PATH)
+
+        if not ok:
+            source = "checkpoint"
+            ensure_artifact(MODEL_URL, MODEL_PATH, MODEL_SHA256)
+            ok = detector.load_model(MODEL_PATH)
+            if ok and MODEL_SINGLE_FILE_PATH:
+                # Next start (and any replica sharing the volume) skips the hub entirely
+                try:
+                    detector.save_single_file(MODEL_SINGLE_FILE_PATH)
+                except Exception as e:
+                    print(f"Could not write single-file model: {e}")
+
+    if not ok:
+        raise RuntimeError("Failed to load scam detection model")
+
+    print(f"Scam detection model ready in {(time.perf_counter() - t0) * 1000:.0f}ms (source={source}, backend={SCAM_GATE_BACKEND})")
+    return detector
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import torch
+from transformers import AutoTokenizer
+
+from app.first_scam_gate import FirstLayerScamDetector
+
+# onnx / onnxruntime are only needed when SCAM_GATE_BACKEND=onnx
+import onnxruntime as ort
+from onnxruntime.quantization import QuantType, quantize_dynamic
+
+
+def _meta_path(onnx_path: str) -> Path:
+    return Path(onnx_path).with_suffix(".json")
+
+
+def _tokenizer_dir(onnx_path: str) -> Path:
+    return Path(onnx_path).with_suffix(".tokenizer")
+
+
+def export_onnx(detector: FirstLayerScamDetector, onnx_path: str, opset: int = 17) -> None:
+    """
+    Export a loaded torch detector to ONNX with dynamic batch and sequence axes.
+    """
+    if detector.model is None or detector.tokenizer is None:
+        raise RuntimeError("Load the torch checkpoint before exporting.")
+
+    model = detector.model.to("cpu").eval()
+    sample = detector.tokenizer(["export sample"], return_tensors="pt")
+
+    Path(onnx_path).parent.mkdir(parents=True, exist_ok=True)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"]),
+            onnx_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"},
+            },
+            opset_version=opset,
+            dynamo=False,
+        )
+
+
+def quantize_onnx(src_path: str, dst_path: str) -> None:
+    """
+    Dynamic int8 quantisation of the weights (activations stay fp32, no calibration set needed).
+    """
+    quantize_dynamic(src_path, dst_path, weight_type=QuantType.QInt8)
+
+
+def build_onnx_artifact(torch_model_path: str, onnx_path: str, quantize: bool = True) -> bool:
+    """
+    torch checkpoint -> ONNX (-> int8) plus a JSON sidecar with tokenizer/label metadata and
+    the tokenizer itself, so loading the artifact needs no network.
+    """
+    detector = FirstLayerScamDetector(device="cpu")
+    if not detector.load_model(torch_model_path):
+        return False
+
+    fp32_path = onnx_path if not quantize else str(Path(onnx_path).with_suffix(".fp32.onnx"))
+    export_onnx(detector, fp32_path)
+    if quantize:
+        quantize_onnx(fp32_path, onnx_path)
+        os.remove(fp32_path)
+
+    meta = {
+        "model_name": detector.model_name,
+        "max_length": detector.max_length,
+        "id2label": detector.id2label,
+        "quantized": quantize,
+    }
+    _meta_path(onnx_path).write_text(json.dumps(meta))
+    detector.tokenizer.save_pretrained(str(_tokenizer_dir(onnx_path)))
+    print(f"ONNX scam gate written to {onnx_path} (quantized={quantize})")
+    return True
+
+
+class OnnxScamDetector(FirstLayerScamDetector):
+    """
+    FirstLayerScamDetector served through ONNX Runtime on CPU.
+    Shares tokenisation, bucketing and post-processing with the torch detector.
+    """
+
+    tensor_type = "np"
+
+    def __init__(self, onnx_path: str, intra_op_threads: int = 0, quantize: bool = True):
+        super().__init__(device="cpu")
+        self.onnx_path = onnx_path
+        self.intra_op_threads = intra_op_threads
+        self.quantize = quantize
+        self.session: Optional[ort.InferenceSession] = None
+
+    def load_model(self, model_path):
+        try:
+            meta_path = _meta_path(self.onnx_path)
+            if not (os.path.exists(self.onnx_path) and meta_path.exists()):
+                print("ONNX scam gate not found, exporting from torch checkpoint...")
+                if not build_onnx_artifact(model_path, self.onnx_path, quantize=self.quantize):
+                    return False
+
+            meta = json.loads(meta_path.read_text())
+            self.model_name = meta["model_name"]
+            self.max_length = int(meta["max_length"])
+            self.id2label = {int(k): v for k, v in meta["id2label"].items()}
+            tokenizer_dir = _tokenizer_dir(self.onnx_path)
+            if tokenizer_dir.exists():
+                self.tokenizer = AutoTokenizer.from_pretrained(str(tokenizer_dir))
+            else:
+                # Artifact built before the tokenizer was saved alongside it: fetch once, keep a copy
+                self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                try:
+                    self.tokenizer.save_pretrained(str(tokenizer_dir))
+                except Exception as e:
+                    print(f"Could not save ONNX tokenizer: {e}")
+
+            opts = ort.SessionOptions()
+            opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+            opts.inter_op_num_threads = 1
+            if self.intra_op_threads > 0:
+                opts.intra_op_num_threads = self.intra_op_threads
+
+            self.session = ort.InferenceSession(self.onnx_path, opts, providers=["CPUExecutionProvider"])
+            print(f"ONNX model loaded successfully! path={self.onnx_path}, threads={self.intra_op_threads or 'auto'}")
+            return True
+
+        except Exception as e:
+            print(f"Error loading ONNX model: {e}")
+            return False
+
+    def is_loaded(self) -> bool:
+        return self.session is not None and self.tokenizer is not None
+
+    def logits(self, input_ids, attention_mask) -> np.ndarray:
+        return self.session.run(
+            ["logits"],
+            {"input_ids": input_ids.astype(np.int64), "attention_mask": attention_mask.astype(np.int64)},
+        )[0]
+
+    def _forward_probs(self, input_ids, attention_mask) -> List[List[float]]:
+        logits = self.logits(input_ids, attention_mask)
+        logits = logits - logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return (exp / exp.sum(axis=1, keepdims=True)).tolist()
@@ -19,3 +19,31 @@ TOOLS = [
         }
     }
 ]
+
+# Single-call turns: the reply and the stop decision come back as one structured output
+TURN_OUTPUT_FORMAT = {
+    "format": {
+        "type": "json_schema",
+        "name": "agent_turn",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "reply": {
+                    "type": "string",
+                    "description": "Next victim message"
+                },
+                "should_stop": {
+                    "type": "boolean",
+                    "description": "Whether to stop the session now"
+                },
+                "reason": {
+                    "type": "string",
+                    "description": "Reason for stopping, empty when not stopping"
+                }
+            },
+            "required": ["reply", "should_stop", "reason"],
+            "additionalProperties": False
+        }
+    }
+}
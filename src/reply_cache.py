@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+import re
+import unicodedata
+from typing import List, Optional
+
+import numpy as np
+
+from app.config import (
+    REDIS_HOST, REDIS_PORT, REPLY_CACHE_BACKEND, REPLY_CACHE_TTL_SECONDS, REPLY_CACHE_MAX_ENTRIES,
+    REPLY_CACHE_LOCAL_TTL_SECONDS,
+    REPLY_CACHE_MIN_VARIANTS, REPLY_CACHE_MAX_VARIANTS, REPLY_CACHE_NEAR_DUP, REPLY_CACHE_SIMILARITY,
+)
+from app.metrics import REPLY_CACHE_LOOKUPS
+from app.pydantic_models import ExtractedIntelligence
+from app.session_store import _TTLCache
+
+_URL = re.compile(r"(?:https?://|www\.)\S+", re.IGNORECASE)
+_HANDLE = re.compile(r"\S+@\S+")
+_DIGITS = re.compile(r"\d+")
+_NON_WORD = re.compile(r"[^\w#]+")
+
+_INTEL_KINDS = ("upiIds", "bankAccounts", "phishingLinks", "phoneNumbers", "emailAddresses")
+
+# MinHash: 64 permutations as 16 LSH bands of 4 rows; pairs above ~0.5 Jaccard usually share a band
+_NUM_PERM = 64
+_BANDS = 16
+_ROWS = _NUM_PERM // _BANDS
+_SHINGLE = 5
+_PRIME = np.uint64(4294967311)  # > 2**32, so a*x + b stays inside uint64 for 32-bit a, x, b
+_rng = np.random.default_rng(20240611)
+_PERM_A = _rng.integers(1, 2**32 - 1, size=_NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 2**32 - 1, size=_NUM_PERM, dtype=np.uint64)
+
+
+def normalise_text(text: str) -> str:
+    """
+    Script-level form of a scammer message: case, punctuation, links, handles and digit runs
+    are folded so campaign copies with different numbers/links map to the same text.
+    """
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = _URL.sub(" url ", text)
+    text = _HANDLE.sub(" handle ", text)
+    text = _DIGITS.sub("#", text)
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def intel_shape(extracted: ExtractedIntelligence) -> str:
+    """Which intel kinds are already known; the persona asks for different things depending on it."""
+    return ",".join(k for k in _INTEL_KINDS if getattr(extracted, k, None))
+
+
+def reply_key(norm_text: str, state: str, language: str, shape: str) -> str:
+    raw = f"{norm_text}\x00{state}\x00{(language or '').lower()}\x00{shape}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def minhash(norm_text: str) -> np.ndarray:
+    padded = f" {norm_text} "
+    shingles = {padded[i:i + _SHINGLE] for i in range(max(1, len(padded) - _SHINGLE + 1))}
+    x = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    return ((_PERM_A[:, None] * x[None, :] + _PERM_B[:, None]) % _PRIME).min(axis=1)
+
+
+def lsh_buckets(sig: np.ndarray, context: str) -> List[str]:
+    return [
+        f"{context}:{band}:{hashlib.sha1(sig[band * _ROWS:(band + 1) * _ROWS].tobytes()).hexdigest()[:16]}"
+        for band in range(_BANDS)
+    ]
+
+
+class ReplyCache:
+    """
+    Reply + extraction cache for scripted scam messages.
+
+    Replies are keyed on normalised text + conversation state + language + known-intel shape.
+    A key only answers turns once real LLM turns have produced `min_variants` distinct replies
+    for it, and hits pick one of them at random, so repeated scripts don't get a canned persona.
+    Near-duplicates are found with MinHash/LSH over character shingles.
+
+    Extraction results are keyed on the exact message text, since entities differ between copies.
+
+    Memory tier: bounded LRU + TTL. With a Redis client, Redis is the source of truth shared by
+    all replicas: reply variants are a capped list (RPUSH + LTRIM) and LSH buckets are sets
+    (SADD), so concurrent writers append rather than overwrite. Memory copies then only live
+    for `local_ttl_seconds` before the next read goes back to Redis.
+    """
+
+    def __init__(
+        self,
+        redis_client=None,
+        max_entries: int = REPLY_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = REPLY_CACHE_TTL_SECONDS,
+        min_variants: int = REPLY_CACHE_MIN_VARIANTS,
+        max_variants: int = REPLY_CACHE_MAX_VARIANTS,
+        near_dup: bool = REPLY_CACHE_NEAR_DUP,
+        similarity: float = REPLY_CACHE_SIMILARITY,
+        prefix: str = "replycache:",
+        local_ttl_seconds: int = REPLY_CACHE_LOCAL_TTL_SECONDS,
+    ):
+        self.r = redis_client
+        self.ttl = ttl_seconds
+        self.local_ttl = min(ttl_seconds, local_ttl_seconds) if redis_client is not None else ttl_seconds
+        self.min_variants = max(1, min_variants)
+        self.max_variants = max(self.min_variants, max_variants)
+        self.near_dup = near_dup
+        self.similarity = similarity
+        self.prefix = prefix
+        self._entries = _TTLCache(max_entries)
+        self._buckets = _TTLCache(max_entries * _BANDS)
+
+    # A Redis outage only costs the shared tier; the turn falls back to memory / the LLM
+    async def _get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None and self.r is not None:
+            try:
+                raw = await self.r.get(self.prefix + key)
+            except Exception as e:
+                print("Reply cache: Redis read failed:", e)
+                return None
+            if raw is not None:
+                entry = json.loads(raw)
+                self._entries.set(key, entry, self.local_ttl)
+        return entry
+
+    async def _put(self, key: str, entry: dict) -> None:
+        self._entries.set(key, entry, self.local_ttl)
+        if self.r is not None:
+            try:
+                await self.r.set(self.prefix + key, json.dumps(entry, ensure_ascii=False), ex=self.ttl)
+            except Exception as e:
+                print("Reply cache: Redis write failed:", e)
+
+    async def _get_replies(self, key: str) -> Optional[dict]:
+        """{"replies": [...], "sig": [...]} for a reply key, or None."""
+        entry = self._entries.get(key)
+        if entry is None and self.r is not None:
+            pipe = self.r.pipeline(transaction=False)
+            pipe.lrange(self.prefix + "replies:" + key, 0, -1)
+            pipe.get(self.prefix + "sig:" + key)
+            try:
+                replies, sig = await pipe.execute()
+            except Exception as e:
+                print("Reply cache: Redis read failed:", e)
+                return None
+            if sig is not None:
+                # Two replicas can append the same reply in a race; count it once
+                entry = {"replies": list(dict.fromkeys(replies))[:self.max_variants], "sig": json.loads(sig)}
+                self._entries.set(key, entry, self.local_ttl)
+        return entry
+
+    async def _add_reply(self, key: str, entry: dict, reply: str) -> None:
+        self._entries.set(key, {"replies": entry["replies"] + [reply], "sig": entry["sig"]}, self.local_ttl)
+        if self.r is None:
+            return
+        list_key, sig_key = self.prefix + "replies:" + key, self.prefix + "sig:" + key
+        pipe = self.r.pipeline(transaction=True)
+        pipe.set(sig_key, json.dumps(entry["sig"]), ex=self.ttl, nx=True)
+        pipe.rpush(list_key, reply)
+        # Over-collect a little so racing duplicates don't crowd out distinct variants
+        pipe.ltrim(list_key, 0, 2 * self.max_variants - 1)
+        pipe.expire(list_key, self.ttl)
+        pipe.expire(sig_key, self.ttl)
+        try:
+            await pipe.execute()
+        except Exception as e:
+            print("Reply cache: Redis write failed:", e)
+
+    async def _bucket_members(self, bucket: str) -> set:
+        members = self._buckets.get(bucket)
+        if members is None and self.r is not None:
+            try:
+                members = set(await self.r.smembers(self.prefix + "lsh:" + bucket))
+            except Exception as e:
+                print("Reply cache: Redis read failed:", e)
+                return set()
+            self._buckets.set(bucket, members, self.local_ttl)
+        return members or set()
+
+    async def _index(self, buckets: List[str], key: str) -> None:
+        for bucket in buckets:
+            members = self._buckets.get(bucket) or set()
+            members.add(key)
+            self._buckets.set(bucket, members, self.local_ttl)
+        if self.r is not None:
+            pipe = self.r.pipeline(transaction=False)
+            for bucket in buckets:
+                pipe.sadd(self.prefix + "lsh:" + bucket, key)
+                pipe.expire(self.prefix + "lsh:" + bucket, self.ttl)
+            try:
+                await pipe.execute()
+            except Exception as e:
+                print("Reply cache: Redis write failed:", e)
+
+    async def lookup_reply(self, text: str, state: str, language: str, extracted: ExtractedIntelligence) -> Optional[str]:
+        norm = normalise_text(text)
+        if not norm:
+            return None
+        shape = intel_shape(extracted)
+        key = reply_key(norm, state, language, shape)
+
+        entry = await self._get_replies(key)
+        if entry is not None and len(entry["replies"]) >= self.min_variants:
+            REPLY_CACHE_LOOKUPS.labels(result="exact").inc()
+            return random.choice(entry["replies"])
+
+        if self.near_dup:
+            sig = minhash(norm)
+            context = reply_key("", state, language, shape)
+            candidates = set()
+            for bucket in lsh_buckets(sig, context):
+                candidates |= await self._bucket_members(bucket)
+            candidates.discard(key)
+
+            best, best_sim = None, self.similarity
+            for cand in candidates:
+                cand_entry = await self._get_replies(cand)
+                if cand_entry is None or len(cand_entry["replies"]) < self.min_variants:
+                    continue
+                sim = float((np.asarray(cand_entry["sig"], dtype=np.uint64) == sig).mean())
+                if sim >= best_sim:
+                    best, best_sim = cand_entry, sim
+            if best is not None:
+                REPLY_CACHE_LOOKUPS.labels(result="near").inc()
+                return random.choice(best["replies"])
+
+        REPLY_CACHE_LOOKUPS.labels(result="miss").inc()
+        return None
+
+    async def store_reply(self, text: str, state: str, language: str, extracted: ExtractedIntelligence, reply: str) -> None:
+        norm = normalise_text(text)
+        reply = (reply or "").strip()
+        if not norm or not reply:
+            return
+        shape = intel_shape(extracted)
+        key = reply_key(norm, state, language, shape)
+
+        entry = await self._get_replies(key)
+        if entry is None:
+            sig = minhash(norm)
+            entry = {"replies": [], "sig": sig.tolist()}
+            if self.near_dup:
+                await self._index(lsh_buckets(sig, reply_key("", state, language, shape)), key)
+        elif reply in entry["replies"] or len(entry["replies"]) >= self.max_variants:
+            return
+
+        await self._add_reply(key, entry, reply)
+
+    async def lookup_extraction(self, text: str) -> Optional[dict]:
+        entry = await self._get("extract:" + hashlib.sha1((text or "").encode("utf-8")).hexdigest())
+        REPLY_CACHE_LOOKUPS.labels(result="extract_hit" if entry is not None else "extract_miss").inc()
+        return entry
+
+    async def store_extraction(self, text: str, bits: dict) -> None:
+        await self._put("extract:" + hashlib.sha1((text or "").encode("utf-8")).hexdigest(), bits)
+
+
+def is_repeat_in_session(latest: str, history_tail: List[dict]) -> bool:
+    """
+    The persona is told to stop when the scammer repeats themselves, so a message this session
+    has already seen must go to the LLM rather than the cache.
+    """
+    norm = normalise_text(latest)
+    return any(normalise_text(m.get("text", "")) == norm for m in history_tail[:-1])
+
+
+def build_reply_cache() -> Optional[ReplyCache]:
+    if REPLY_CACHE_BACKEND == "memory":
+        return ReplyCache()
+    if REPLY_CACHE_BACKEND == "redis":
+        import redis.asyncio as aioredis
+
+        return ReplyCache(redis_client=aioredis.Redis(
+            host=REDIS_HOST,
+            port=int(REDIS_PORT),
+            decode_responses=True,
+            socket_connect_timeout=3,
+            socket_timeout=3,
+        ))
+    return None
+
+
+reply_cache = build_reply_cache()
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.first_scam_gate import FirstLayerScamDetector
+from app.micro_batch import collect_batch
+from app.metrics import SCAM_GATE_BATCH_SECONDS, SCAM_GATE_BATCH_SIZE, SCAM_GATE_QUEUE_DEPTH
+
+
+class ScamGateBatcher:
+    """
+    Dynamic micro-batching in front of FirstLayerScamDetector.
+
+    Requests are collected for up to `max_wait_ms` (or until `max_batch_size` are queued),
+    run as one padded-to-longest forward pass on a dedicated inference thread, and each
+    caller's future is resolved with its own result.
+    """
+
+    def __init__(self, detector: FirstLayerScamDetector, max_batch_size: int = 16, max_wait_ms: float = 5.0):
+        self.detector = detector
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue: asyncio.Queue[Tuple[str, asyncio.Future]] = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scam-gate")
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._executor.shutdown(wait=False)
+
+    async def predict(self, message: str) -> Dict[str, Any]:
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((message, fut))
+        SCAM_GATE_QUEUE_DEPTH.set(self._queue.qsize())
+        return await fut
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await collect_batch(self._queue, self.max_batch_size, self.max_wait)
+            SCAM_GATE_QUEUE_DEPTH.set(self._queue.qsize())
+
+            # Callers that were cancelled while waiting don't need a slot in the forward pass
+            batch = [(m, f) for m, f in batch if not f.done()]
+            if not batch:
+                continue
+
+            SCAM_GATE_BATCH_SIZE.observe(len(batch))
+            t0 = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, self.detector.predict_batch, [m for m, _ in batch]
+                )
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            finally:
+                SCAM_GATE_BATCH_SECONDS.observe(time.perf_counter() - t0)
+
+            for (_, fut), result in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(result)
@@ -1,16 +1,25 @@
 from __future__ import annotations
 
+import asyncio
+import dataclasses
 import json
 import time
+from collections import OrderedDict
 from dataclasses import dataclass, field
+from typing import Literal, Protocol
 
 import redis
+import redis.asyncio as aioredis
 
-from app.config import SESSION_TTL_SECONDS, REDIS_HOST, REDIS_PORT
+from app.config import (
+    SESSION_TTL_SECONDS, REDIS_HOST, REDIS_PORT, SESSION_STORE_BACKEND,
+    REDIS_MAX_CONNECTIONS, REDIS_POOL_TIMEOUT, REDIS_HEALTH_CHECK_INTERVAL,
+    MEMORY_STORE_MAX_SESSIONS, TIERED_FLUSH_INTERVAL_MS, MEMORY_HISTORY_WINDOW, CALLBACK_QUEUE,
+)
 from app.pydantic_models import ExtractedIntelligence
 
 
-@dataclass
+@dataclass(slots=True)
 class SessionState:
     session_id: str
     created_at: float = field(default_factory=lambda: time.time())
@@ -31,6 +40,65 @@ class SessionState:
     summary: str = ""
     language: str = "English"
 
+    # conversationHistory holds only the most recent entries (see conversation_memory);
+    # history_len counts every entry ever appended, summarised_upto how many are in memory_summary
+    history_len: int = 0
+    memory_summary: str = ""
+    summarised_upto: int = 0
+    summary_turn: int = 0
+
+    # Conversation-state dwell counters (see state_engine): consecutive turns in `state`, turns per state
+    state_dwell: int = 0
+    state_turns: dict[str, int] = field(default_factory=dict)
+
+    # Bumped on every save; a save whose loaded version is stale fails with SessionConflictError
+    version: int = 0
+
+    # What was last persisted (scalars, history, intel); lets save() write only the delta
+    _persisted: dict | None = field(default=None, repr=False, compare=False)
+
+
+class SessionConflictError(Exception):
+    """The session was saved by someone else since it was loaded."""
+
+    def __init__(self, session_id: str):
+        super().__init__(f"Session {session_id} was modified concurrently")
+        self.session_id = session_id
+
+
+class SessionStore(Protocol):
+    """
+    What the request path needs from a session backend.
+
+    `mode` tells load_session/save_session/store_call how to invoke the methods:
+    - "async":    methods are coroutines and are awaited
+    - "blocking": methods do network I/O and run in a worker thread
+    - "inline":   methods are pure in-process work and are called directly on the loop
+    """
+
+    mode: Literal["async", "blocking", "inline"]
+
+    def get_or_create(self, session_id: str): ...
+    def save(self, st: SessionState): ...
+    def acquire_lease(self, session_id: str, token: str, ttl_ms: int): ...
+    def release_lease(self, session_id: str, token: str): ...
+    def renew_lease(self, session_id: str, token: str, ttl_ms: int): ...
+    def get_turn_result(self, session_id: str, fingerprint: str): ...
+    def set_turn_result(self, session_id: str, fingerprint: str, reply: str, ttl_seconds: int): ...
+
+
+def _copy_state(st: SessionState) -> SessionState:
+    """
+    Copy detached enough that a request mutating it doesn't touch the cached entry
+    (history items themselves are treated as immutable).
+    """
+    return dataclasses.replace(
+        st,
+        conversationHistory=list(st.conversationHistory),
+        extracted=st.extracted.model_copy(deep=True),
+        state_turns=dict(st.state_turns),
+    )
+
 
 def _dump_extracted(obj):
     if obj is None:
@@ -56,7 +124,199 @@ def _load_extracted(x):
     raise TypeError(f"extracted must be dict/ExtractedIntelligence, got {type(x)}")
 
 
-class RedisSessionStore:
+_SCALAR_FIELDS = (
+    "session_id", "created_at", "updated_at", "scam_detected", "status", "final_callback_sent",
+    "persona_id", "agent_turns", "total_messages_exchanged", "agent_notes", "state", "summary", "language",
+    "history_len", "memory_summary", "summarised_upto", "summary_turn", "state_dwell", "state_turns", "version",
+)
+_INTEL_FIELDS = tuple(ExtractedIntelligence.model_fields)
+
+
+def _dump_history_item(m) -> dict:
+    if isinstance(m, dict):
+        return m
+    if hasattr(m, "model_dump"):
+        return m.model_dump()
+    if hasattr(m, "dict"):
+        return m.dict()
+    raise TypeError(f"conversationHistory must contain dicts, got {type(m)}")
+
+
+def _merge_states(ours: SessionState, theirs: SessionState) -> SessionState:
+    """
+    Fold a state written locally into the one another writer saved since: the result carries
+    theirs' Redis snapshot/version, ours' scalars, and the history entries and intel of both.
+    """
+    merged = _copy_state(ours)
+    merged._persisted = theirs._persisted
+    merged.version = theirs.version
+
+    their_history = [_dump_history_item(m) for m in theirs.conversationHistory]
+    new_items = [m for m in ours.conversationHistory if _dump_history_item(m) not in their_history]
+    merged.conversationHistory = list(theirs.conversationHistory) + new_items
+    merged.history_len = theirs.history_len + len(new_items)
+    merged.agent_turns = max(ours.agent_turns, theirs.agent_turns)
+    merged.total_messages_exchanged = max(ours.total_messages_exchanged, theirs.total_messages_exchanged)
+    merged.final_callback_sent = ours.final_callback_sent or theirs.final_callback_sent
+
+    extracted = _dump_extracted(merged.extracted)
+    for kind, values in _dump_extracted(theirs.extracted).items():
+        mine = list(extracted.get(kind) or [])
+        extracted[kind] = mine + [v for v in values or [] if v not in mine]
+    merged.extracted = _load_extracted(extracted)
+    return merged
+
+
+# Delete the lease only if we still own it (it may have expired and been taken by another turn)
+_RELEASE_LEASE_LUA = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+# Extend the lease only if we still own it
+_RENEW_LEASE_LUA = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class _SessionCodec:
+    """
+    Redis layout shared by the sync and async stores:
+
+    <prefix><id>:meta          hash, one JSON-encoded value per scalar field
+    <prefix><id>:history       list, one JSON message per entry (RPUSH on append), trimmed to
+                               the last MEMORY_HISTORY_WINDOW entries; meta.history_len counts all
+    <prefix><id>:intel:<kind>  set per ExtractedIntelligence category
+
+    save() writes only what changed since the last load/save, refreshing every TTL in the
+    same MULTI/EXEC pipeline.
+    """
+
+    prefix: str
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}:meta"
+
+    def _history_key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}:history"
+
+    def _intel_key(self, session_id: str, kind: str) -> str:
+        return f"{self.prefix}{session_id}:intel:{kind}"
+
+    def _lease_key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}:lease"
+
+    def _turn_key(self, session_id: str, fingerprint: str) -> str:
+        return f"{self.prefix}{session_id}:turn:{fingerprint}"
+
+    def _queue_load(self, pipe, session_id: str) -> None:
+        pipe.hgetall(self._key(session_id))
+        pipe.lrange(self._history_key(session_id), -MEMORY_HISTORY_WINDOW, -1)
+        for kind in _INTEL_FIELDS:
+            pipe.smembers(self._intel_key(session_id, kind))
+
+    def _from_results(self, results: list) -> SessionState | None:
+        meta, raw_history, *intel_sets = results
+        if not meta:
+            return None
+
+        scalars = {k: json.loads(v) for k, v in meta.items() if k in _SCALAR_FIELDS}
+        history = []
+        for raw in raw_history:
+            item = json.loads(raw)
+            if isinstance(item, dict):
+                history.append(item)
+        intel = {kind: sorted(values) for kind, values in zip(_INTEL_FIELDS, intel_sets)}
+
+        # Sessions written before history_len was stored count only what is in the list
+        scalars["history_len"] = max(scalars.get("history_len", 0), len(history))
+        st = SessionState(**scalars, conversationHistory=history, extracted=_load_extracted(intel))
+        st._persisted = {
+            "scalars": dict(meta),
+            "history": list(history),
+            "history_base": st.history_len - len(history),
+            "intel": {kind: set(values) for kind, values in zip(_INTEL_FIELDS, intel_sets)},
+        }
+        return st
+
+    def _loaded_version(self, st: SessionState) -> int | None:
+        if not st._persisted:
+            return None
+        raw = st._persisted["scalars"].get("version")
+        return json.loads(raw) if raw else 0
+
+    def _check_version(self, st: SessionState, current_raw: str | None) -> int:
+        """
+        Compare the stored version against the one this SessionState was loaded at and return
+        the version to write.
+        """
+        expected = self._loaded_version(st)
+        if current_raw is None:
+            if expected is not None:
+                # Expired/deleted underneath us; recreate instead of failing the turn
+                return expected + 1
+            return 1
+        if expected is None or json.loads(current_raw) != expected:
+            raise SessionConflictError(st.session_id)
+        return expected + 1
+
+    def _queue_delta(self, pipe, st: SessionState) -> dict:
+        """
+        Queue the writes that bring Redis from st._persisted to st; returns the new snapshot.
+        """
+        sid = st.session_id
+        prev = st._persisted or {"scalars": {}, "history": [], "intel": {}}
+        keys = [self._key(sid), self._history_key(sid)]
+
+        scalars = {name: json.dumps(getattr(st, name), ensure_ascii=False) for name in _SCALAR_FIELDS}
+        changed = {k: v for k, v in scalars.items() if prev["scalars"].get(k) != v}
+        if changed:
+            pipe.hset(self._key(sid), mapping=changed)
+
+        # Both lists are windows onto the full Redis list; compare them by absolute position
+        history = [_dump_history_item(m) for m in st.conversationHistory]
+        base = max(st.history_len, len(history)) - len(history)
+        prev_history = prev["history"]
+        prev_base = prev.get("history_base", 0)
+        prev_end = prev_base + len(prev_history)
+        lo = max(base, prev_base)
+        if base <= prev_end and history[lo - base:prev_end - base] == prev_history[lo - prev_base:]:
+            new_items = history[prev_end - base:]
+        else:
+            # History was rewritten rather than appended to
+            pipe.delete(self._history_key(sid))
+            new_items = history
+        if new_items:
+            pipe.rpush(self._history_key(sid), *(json.dumps(m, ensure_ascii=False) for m in new_items))
+            pipe.ltrim(self._history_key(sid), -MEMORY_HISTORY_WINDOW, -1)
+
+        extracted = _dump_extracted(st.extracted)
+        intel = {}
+        for kind in _INTEL_FIELDS:
+            key = self._intel_key(sid, kind)
+            keys.append(key)
+            current = {str(v) for v in extracted.get(kind, []) or []}
+            before = prev["intel"].get(kind, set())
+            if current - before:
+                pipe.sadd(key, *(current - before))
+            if before - current:
+                pipe.srem(key, *(before - current))
+            intel[kind] = current
+
+        for key in keys:
+            pipe.expire(key, SESSION_TTL_SECONDS)
+
+        return {"scalars": scalars, "history": history, "history_base": base, "intel": intel}
+
+
+class RedisSessionStore(_SessionCodec):
+    mode = "blocking"
+
     def __init__(self, prefix: str = "session:"):
         self.prefix = prefix
         self._r = redis.Redis(
@@ -66,72 +326,486 @@ class RedisSessionStore:
             socket_connect_timeout=3,
             socket_timeout=3,
         )
+
+    def ping(self) -> None:
         try:
             self._r.ping()
         except Exception as e:
             raise RuntimeError(f"Redis not reachable at {REDIS_HOST}:{REDIS_PORT}") from e
 
-    def _key(self, session_id: str) -> str:
-        return f"{self.prefix}{session_id}"
+    def _load(self, session_id: str) -> SessionState | None:
+        pipe = self._r.pipeline(transaction=False)
+        self._queue_load(pipe, session_id)
+        return self._from_results(pipe.execute())
 
-    def _serialize(self, st: SessionState) -> str:
-        history = []
-        for m in st.conversationHistory:
-            if isinstance(m, dict):
-                history.append(m)
-            else:
-                if hasattr(m, "model_dump"):
-                    history.append(m.model_dump())
-                elif hasattr(m, "dict"):
-                    history.append(m.dict())
-                else:
-                    raise TypeError(f"conversationHistory must contain dicts, got {type(m)}")
-
-        data = {
-            "session_id": st.session_id,
-            "created_at": st.created_at,
-            "updated_at": st.updated_at,
-            "scam_detected": st.scam_detected,
-            "status": st.status,
-            "final_callback_sent": st.final_callback_sent,
-            "persona_id": st.persona_id,
-            "agent_turns": st.agent_turns,
-            "total_messages_exchanged": st.total_messages_exchanged,
-            "conversationHistory": history,
-            "extracted": _dump_extracted(st.extracted),
-            "agent_notes": st.agent_notes,
-            "state": st.state,
-            "summary": st.summary,
-            "language": st.language,
-        }
-        return json.dumps(data, ensure_ascii=False)
+    def get_or_create(self, session_id: str) -> SessionState:
+        st = self._load(session_id)
+        if st is not None:
+            return st
 
-    def _deserialize(self, raw: str) -> SessionState:
-        d = json.loads(raw)
+        st = SessionState(session_id=session_id)
+        try:
+            self.save(st)
+        except SessionConflictError:
+            # Another request created it first
+            return self._load(session_id) or st
+        return st
 
-        hist = d.get("conversationHistory", [])
-        if not isinstance(hist, list):
-            hist = []
-        d["conversationHistory"] = [x for x in hist if isinstance(x, dict)]
+    def save(self, st: SessionState) -> None:
+        """
+        Optimistic flush: WATCH the meta hash, verify the version this state was loaded at,
+        then write the delta in MULTI/EXEC.
+        """
+        key = self._key(st.session_id)
+        loaded_version = st.version
+        try:
+            with self._r.pipeline(transaction=True) as pipe:
+                pipe.watch(key)
+                st.version = self._check_version(st, pipe.hget(key, "version"))
+                st.updated_at = time.time()
+                pipe.multi()
+                snapshot = self._queue_delta(pipe, st)
+                pipe.execute()
+        except redis.WatchError as e:
+            st.version = loaded_version
+            raise SessionConflictError(st.session_id) from e
+        except SessionConflictError:
+            st.version = loaded_version
+            raise
+        st._persisted = snapshot
+
+    def acquire_lease(self, session_id: str, token: str, ttl_ms: int) -> bool:
+        return bool(self._r.set(self._lease_key(session_id), token, nx=True, px=ttl_ms))
+
+    def release_lease(self, session_id: str, token: str) -> None:
+        self._r.eval(_RELEASE_LEASE_LUA, 1, self._lease_key(session_id), token)
+
+    def renew_lease(self, session_id: str, token: str, ttl_ms: int) -> bool:
+        return bool(self._r.eval(_RENEW_LEASE_LUA, 1, self._lease_key(session_id), token, ttl_ms))
+
+    def get_turn_result(self, session_id: str, fingerprint: str) -> str | None:
+        return self._r.get(self._turn_key(session_id, fingerprint))
 
-        d["extracted"] = _load_extracted(d.get("extracted", {}))
+    def set_turn_result(self, session_id: str, fingerprint: str, reply: str, ttl_seconds: int) -> None:
+        self._r.setex(self._turn_key(session_id, fingerprint), ttl_seconds, reply)
+
+
+class AsyncRedisSessionStore(_SessionCodec):
+    """
+    redis.asyncio store with an explicitly sized, health-checked connection pool.
+    Same SessionState contract as RedisSessionStore; callers await get_or_create/save.
+    """
+
+    mode = "async"
+
+    def __init__(self, prefix: str = "session:"):
+        self.prefix = prefix
+        # Blocking pool: when all connections are busy callers wait (up to REDIS_POOL_TIMEOUT)
+        # instead of failing with "Too many connections".
+        self._pool = aioredis.BlockingConnectionPool(
+            host=REDIS_HOST,
+            port=int(REDIS_PORT),
+            decode_responses=True,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            timeout=REDIS_POOL_TIMEOUT,
+            health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+            socket_connect_timeout=3,
+            socket_timeout=3,
+            socket_keepalive=True,
+        )
+        self._r = aioredis.Redis(connection_pool=self._pool)
 
-        return SessionState(**d)
+    async def ping(self) -> None:
+        try:
+            await self._r.ping()
+        except Exception as e:
+            raise RuntimeError(f"Redis not reachable at {REDIS_HOST}:{REDIS_PORT}") from e
+
+    async def close(self) -> None:
+        await self._r.aclose()
+        await self._pool.disconnect()
+
+    async def _load(self, session_id: str) -> SessionState | None:
+        pipe = self._r.pipeline(transaction=False)
+        self._queue_load(pipe, session_id)
+        return self._from_results(await pipe.execute())
+
+    async def get_or_create(self, session_id: str) -> SessionState:
+        st = await self._load(session_id)
+        if st is not None:
+            return st
+
+        st = SessionState(session_id=session_id)
+        try:
+            await self.save(st)
+        except SessionConflictError:
+            return await self._load(session_id) or st
+        return st
+
+    async def save(self, st: SessionState) -> None:
+        key = self._key(st.session_id)
+        loaded_version = st.version
+        try:
+            async with self._r.pipeline(transaction=True) as pipe:
+                await pipe.watch(key)
+                st.version = self._check_version(st, await pipe.hget(key, "version"))
+                st.updated_at = time.time()
+                pipe.multi()
+                snapshot = self._queue_delta(pipe, st)
+                await pipe.execute()
+        except redis.WatchError as e:
+            st.version = loaded_version
+            raise SessionConflictError(st.session_id) from e
+        except SessionConflictError:
+            st.version = loaded_version
+            raise
+        st._persisted = snapshot
+
+    async def acquire_lease(self, session_id: str, token: str, ttl_ms: int) -> bool:
+        return bool(await self._r.set(self._lease_key(session_id), token, nx=True, px=ttl_ms))
+
+    async def release_lease(self, session_id: str, token: str) -> None:
+        await self._r.eval(_RELEASE_LEASE_LUA, 1, self._lease_key(session_id), token)
+
+    async def renew_lease(self, session_id: str, token: str, ttl_ms: int) -> bool:
+        return bool(await self._r.eval(_RENEW_LEASE_LUA, 1, self._lease_key(session_id), token, ttl_ms))
+
+    async def get_turn_result(self, session_id: str, fingerprint: str) -> str | None:
+        return await self._r.get(self._turn_key(session_id, fingerprint))
+
+    async def set_turn_result(self, session_id: str, fingerprint: str, reply: str, ttl_seconds: int) -> None:
+        await self._r.setex(self._turn_key(session_id, fingerprint), ttl_seconds, reply)
+
+
+class _MemoryEntry:
+    __slots__ = ("value", "expires_at")
+
+    def __init__(self, value, expires_at: float):
+        self.value = value
+        self.expires_at = expires_at
+
+
+class _TTLCache:
+    """Bounded LRU with per-entry TTL; expired entries are dropped lazily on access/insert."""
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._data: OrderedDict[str, _MemoryEntry] = OrderedDict()
+
+    def get(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry.value
+
+    def set(self, key: str, value, ttl_seconds: float) -> None:
+        self._data[key] = _MemoryEntry(value, time.time() + ttl_seconds)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_items:
+            self._data.popitem(last=False)
+
+    def pop(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class InMemorySessionStore:
+    """
+    In-process store for single-replica and test deployments: bounded LRU + TTL eviction,
+    same version check as the Redis stores. Everything is plain dict work, so it runs inline
+    on the event loop.
+    """
+
+    mode = "inline"
+
+    def __init__(self, max_sessions: int = MEMORY_STORE_MAX_SESSIONS):
+        self._sessions = _TTLCache(max_sessions)
+        # Leases are never LRU-evicted: dropping a held lease would let a second turn in.
+        # session_id -> (token, expires_at); expired ones are swept as new leases are taken.
+        self._leases: dict[str, tuple[str, float]] = {}
+        self._max_sessions = max_sessions
+        self._lease_sweep_at = max_sessions
+        self._turns = _TTLCache(max_sessions)
 
     def get_or_create(self, session_id: str) -> SessionState:
-        key = self._key(session_id)
-        raw = self._r.get(key)
-        if raw:
-            return self._deserialize(raw)
+        st = self._sessions.get(session_id)
+        if st is not None:
+            return _copy_state(st)
 
         st = SessionState(session_id=session_id)
         self.save(st)
-        return st
+        return _copy_state(st)
+
+    def peek(self, session_id: str) -> SessionState | None:
+        st = self._sessions.get(session_id)
+        return _copy_state(st) if st is not None else None
+
+    def put(self, st: SessionState) -> None:
+        """Cache a state as-is (no version bump); used to fill a near cache from Redis."""
+        self._sessions.set(st.session_id, _copy_state(st), SESSION_TTL_SECONDS)
+
+    def evict(self, session_id: str) -> None:
+        self._sessions.pop(session_id)
 
     def save(self, st: SessionState) -> None:
+        current = self._sessions.get(st.session_id)
+        if current is not None and current.version != st.version:
+            raise SessionConflictError(st.session_id)
+        st.version += 1
         st.updated_at = time.time()
-        key = self._key(st.session_id)
-        self._r.setex(key, SESSION_TTL_SECONDS, self._serialize(st))
+        self._sessions.set(st.session_id, _copy_state(st), SESSION_TTL_SECONDS)
+
+    def acquire_lease(self, session_id: str, token: str, ttl_ms: int) -> bool:
+        now = time.time()
+        held = self._leases.get(session_id)
+        if held is not None and held[1] > now:
+            return False
+        if len(self._leases) >= self._lease_sweep_at:
+            # Leases whose holder never released them (crashed turn); amortised over many acquires
+            for sid in [sid for sid, (_, expires_at) in self._leases.items() if expires_at <= now]:
+                del self._leases[sid]
+            self._lease_sweep_at = max(self._max_sessions, 2 * len(self._leases))
+        self._leases[session_id] = (token, now + ttl_ms / 1000)
+        return True
+
+    def release_lease(self, session_id: str, token: str) -> None:
+        held = self._leases.get(session_id)
+        if held is not None and held[0] == token:
+            del self._leases[session_id]
+
+    def renew_lease(self, session_id: str, token: str, ttl_ms: int) -> bool:
+        held = self._leases.get(session_id)
+        if held is None or held[0] != token or held[1] <= time.time():
+            return False
+        self._leases[session_id] = (token, time.time() + ttl_ms / 1000)
+        return True
+
+    def get_turn_result(self, session_id: str, fingerprint: str) -> str | None:
+        return self._turns.get(f"{session_id}:{fingerprint}")
+
+    def set_turn_result(self, session_id: str, fingerprint: str, reply: str, ttl_seconds: int) -> None:
+        self._turns.set(f"{session_id}:{fingerprint}", reply, ttl_seconds)
+
+
+class TieredSessionStore:
+    """
+    Near in-process cache in front of AsyncRedisSessionStore with write-behind.
+
+    Reads hit memory when this replica served the session last (sticky routing); saves update
+    memory immediately and are flushed to Redis every TIERED_FLUSH_INTERVAL_MS, coalescing
+    several turns into one delta write. Leases and turn results go straight to Redis so the
+    concurrency policy still holds across replicas. A crash loses at most one flush interval.
+    """
+
+    mode = "async"
+
+    def __init__(self, flush_interval_ms: int = TIERED_FLUSH_INTERVAL_MS):
+        self.near = InMemorySessionStore()
+        self.far = AsyncRedisSessionStore()
+        self.flush_interval = flush_interval_ms / 1000
+        # session_id -> state to write; far_states keeps the Redis-side snapshot for delta writes,
+        # in the same LRU order as the near cache
+        self._dirty: dict[str, SessionState] = {}
+        self._far_states: OrderedDict[str, SessionState] = OrderedDict()
+        self._flusher: asyncio.Task | None = None
+
+    async def ping(self) -> None:
+        await self.far.ping()
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+        await self.far.close()
+
+    async def get_or_create(self, session_id: str) -> SessionState:
+        st = self.near.peek(session_id)
+        if st is not None:
+            if session_id in self._far_states:
+                self._far_states.move_to_end(session_id)
+            return st
+
+        far_st = await self.far.get_or_create(session_id)
+        self._far_states[session_id] = far_st
+        self.near.put(far_st)
+        return self.near.get_or_create(session_id)
+
+    async def save(self, st: SessionState) -> None:
+        self.near.save(st)
+        self._dirty[st.session_id] = _copy_state(st)
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while self._dirty:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def _write_far(self, st: SessionState, attempts: int = 3) -> tuple[SessionState, bool]:
+        """
+        Delta-write st to Redis. On a conflict, merge onto what is there now and retry; returns
+        the written state and whether it had to be merged.
+        """
+        merged = False
+        for _ in range(attempts - 1):
+            try:
+                await self.far.save(st)
+                return st, merged
+            except SessionConflictError:
+                theirs = await self.far._load(st.session_id)
+                if theirs is None:
+                    st._persisted, st.version = None, 0
+                else:
+                    st = _merge_states(st, theirs)
+                    merged = True
+        await self.far.save(st)
+        return st, merged
+
+    async def flush(self) -> None:
+        dirty, self._dirty = self._dirty, {}
+        for session_id, st in dirty.items():
+            try:
+                far_st = self._far_states.get(session_id)
+                if far_st is None:
+                    # Snapshot trimmed (or the session was created here): load it so the write is
+                    # a delta against the current Redis version
+                    far_st = await self.far._load(session_id)
+                # Carry the Redis-side snapshot/version so the far store writes only the delta
+                st._persisted = far_st._persisted if far_st is not None else None
+                st.version = far_st.version if far_st is not None else 0
+                written, merged = await self._write_far(st)
+            except Exception as e:
+                print("Tiered store: write-behind failed, will retry", session_id, e)
+                self._far_states.pop(session_id, None)
+                self._dirty.setdefault(session_id, st)
+                continue
+
+            self._far_states[session_id] = written
+            self._far_states.move_to_end(session_id)
+            if merged and session_id not in self._dirty:
+                # Another replica wrote this session; the next access re-reads the merged state
+                print("Tiered store: write-behind conflict merged", session_id)
+                self.near.evict(session_id)
+
+        # Don't let the Redis-side snapshots outgrow the near cache; least recently used go first
+        while len(self._far_states) > self.near._sessions.max_items:
+            self._far_states.popitem(last=False)
+
+    async def acquire_lease(self, session_id: str, token: str, ttl_ms: int) -> bool:
+        return await self.far.acquire_lease(session_id, token, ttl_ms)
+
+    async def release_lease(self, session_id: str, token: str) -> None:
+        await self.far.release_lease(session_id, token)
+
+    async def renew_lease(self, session_id: str, token: str, ttl_ms: int) -> bool:
+        return await self.far.renew_lease(session_id, token, ttl_ms)
+
+    async def get_turn_result(self, session_id: str, fingerprint: str) -> str | None:
+        return await self.far.get_turn_result(session_id, fingerprint)
+
+    async def set_turn_result(self, session_id: str, fingerprint: str, reply: str, ttl_seconds: int) -> None:
+        await self.far.set_turn_result(session_id, fingerprint, reply, ttl_seconds)
+
+
+def build_store() -> SessionStore:
+    if SESSION_STORE_BACKEND == "memory":
+        return InMemorySessionStore()
+    if SESSION_STORE_BACKEND == "tiered":
+        return TieredSessionStore()
+    if SESSION_STORE_BACKEND == "redis-async":
+        return AsyncRedisSessionStore()
+    return RedisSessionStore()
+
+
+# Built on first use (open_session_store in the API lifespan), so importing this module never
+# touches Redis
+store: SessionStore | None = None
+
+
+def get_store() -> SessionStore:
+    global store
+    if store is None:
+        store = build_store()
+    return store
+
+
+async def open_session_store() -> None:
+    if SESSION_STORE_BACKEND == "memory" and CALLBACK_QUEUE == "redis":
+        # Every close would be pushed to a Redis that isn't there, from a background task
+        raise RuntimeError("CALLBACK_QUEUE=redis needs Redis; use CALLBACK_QUEUE=inline with SESSION_STORE_BACKEND=memory")
+    if hasattr(get_store(), "ping"):
+        await store_call("ping")
+
+
+async def close_session_store() -> None:
+    if hasattr(store, "close"):
+        await store.close()
+
+
+# Backend-agnostic entry points for async code: async stores are awaited, blocking stores run in
+# the default thread pool so their socket I/O never blocks the event loop, inline stores are
+# called directly.
+async def store_call(method: str, *args):
+    backend = get_store()
+    fn = getattr(backend, method)
+    if backend.mode == "async":
+        return await fn(*args)
+    if backend.mode == "blocking":
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+
+async def load_session(session_id: str) -> SessionState:
+    return await store_call("get_or_create", session_id)
+
+
+async def save_session(st: SessionState) -> None:
+    await store_call("save", st)
+
+
+class SessionUnitOfWork:
+    """
+    Request-scoped session handle: load once, hand the same SessionState to the agent and
+    callback code, flush once at the end.
+
+        uow = await SessionUnitOfWork.begin(session_id)
+        ... mutate uow.state ...
+        await uow.commit()   # raises SessionConflictError on a concurrent write
+    """
+
+    def __init__(self, state: SessionState):
+        self.state = state
+        self.committed = False
+        self._deferred: list[asyncio.Task] = []
+
+    def defer(self, coro) -> None:
+        """Run `coro` alongside the rest of the request; commit() waits for it before flushing."""
+        self._deferred.append(asyncio.create_task(coro))
+
+    async def settle(self) -> None:
+        """Wait for deferred work so self.state is final."""
+        if self._deferred:
+            await asyncio.gather(*self._deferred, return_exceptions=True)
+            self._deferred.clear()
 
+    @classmethod
+    async def begin(cls, session_id: str) -> "SessionUnitOfWork":
+        return cls(await load_session(session_id))
 
-store = RedisSessionStore()
\ No newline at end of file
+    async def commit(self) -> None:
+        if self.committed:
+            return
+        await self.settle()
+        await save_session(self.state)
+        self.committed = True
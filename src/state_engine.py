@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+
+from app.pydantic_models import ExtractedIntelligence
+from app.session_store import SessionState
+
+# Intent lexicon: English, Hindi (Devanagari) and Hinglish (romanised Hindi) variants.
+# Latin terms must start and end on a word boundary, so "pin" fires on neither "shopping" nor
+# "ping"; inflections that should count are listed explicitly.
+INTENT_TERMS: Dict[str, Tuple[str, ...]] = {
+    "credentials": (
+        "otp", "otps", "one time password", "password", "passwords", "passcode", "pin", "pins", "mpin", "cvv",
+        "verify", "verified", "verifying", "verification", "kyc", "login", "log in", "aadhaar", "aadhar",
+        "pan card",
+        "ओटीपी", "पासवर्ड", "पिन", "सत्यापन", "वेरिफाई", "वेरीफाई", "केवाईसी", "आधार",
+        "otp bhejo", "otp batao", "otp bata", "otp do", "code batao", "code bhejo", "password batao",
+        "verify karo", "verify kijiye", "kyc karo", "kyc update", "pin batao",
+    ),
+    "link": (
+        "link", "links", "install", "installed", "installing", "download", "downloaded", "downloading",
+        "apk", "click", "clicked", "clicking", "anydesk", "teamviewer", "quicksupport", "http", "https", "www",
+        "लिंक", "इंस्टॉल", "इनस्टॉल", "डाउनलोड", "क्लिक", "ऐप",
+        "link pe click", "link par click", "link kholo", "link open karo", "app download karo",
+        "app install karo", "download karo", "install karo",
+    ),
+}
+
+
+class IntentScanner:
+    """
+    Aho-Corasick automaton over a {intent: terms} lexicon.
+
+    scan() walks the text once, one dict lookup per character, so the cost per message depends
+    on the message length and not on how many terms the lexicon holds.
+    """
+
+    def __init__(self, intent_terms: Dict[str, Iterable[str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # (term length, intent, needs start boundary, needs end boundary) for every term ending at this node
+        self._out: List[List[Tuple[int, str, bool, bool]]] = [[]]
+
+        for intent, terms in intent_terms.items():
+            for term in terms:
+                self._add(self.normalise(term), intent)
+        self._link()
+
+    @staticmethod
+    def normalise(text: str) -> str:
+        return unicodedata.normalize("NFKC", text or "").casefold()
+
+    def _add(self, term: str, intent: str) -> None:
+        if not term:
+            return
+        node = 0
+        for ch in term:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((
+            len(term), intent,
+            term[0].isascii() and term[0].isalnum(),
+            term[-1].isascii() and term[-1].isalnum(),
+        ))
+
+    def _link(self) -> None:
+        # Breadth-first, so a node's fail target is always linked before the node itself
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                if node:
+                    self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def scan(self, text: str) -> FrozenSet[str]:
+        text = self.normalise(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[str] = set()
+        node = 0
+        last = len(text) - 1
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length, intent, start_boundary, end_boundary in out[node]:
+                start = i - length + 1
+                if start_boundary and start > 0 and text[start - 1].isalnum():
+                    continue
+                if end_boundary and i < last and text[i + 1].isalnum():
+                    continue
+                found.add(intent)
+        return frozenset(found)
+
+
+@dataclass(frozen=True)
+class Transition:
+    """Move from `source` ("*" = any state) to `target` when `signal` is present and the session has been in its state for `min_dwell` turns."""
+    source: str
+    signal: str
+    target: str
+    min_dwell: int = 0
+
+
+# Evaluated top to bottom against the state as updated so far; later matches win.
+# Signals: every intent from the scanner, "turn" (always) and "intel" (a UPI ID or bank account is known).
+TRANSITIONS: Tuple[Transition, ...] = (
+    Transition("START", "turn", "CONFUSED"),
+    Transition("*", "credentials", "TRUST_BUILDING"),
+    Transition("*", "link", "INFO_EXTRACTION"),
+    Transition("*", "intel", "STALLING"),
+)
+
+intent_scanner = IntentScanner(INTENT_TERMS)
+
+
+def turn_signals(text: str, extracted: ExtractedIntelligence) -> FrozenSet[str]:
+    signals = set(intent_scanner.scan(text))
+    signals.add("turn")
+    if extracted.upiIds or extracted.bankAccounts:
+        signals.add("intel")
+    return frozenset(signals)
+
+
+def next_state(state: str, dwell: int, signals: FrozenSet[str]) -> str:
+    for rule in TRANSITIONS:
+        if rule.signal in signals and rule.source in ("*", state) and dwell >= rule.min_dwell:
+            if rule.target != state:
+                state, dwell = rule.target, 0
+    return state
+
+
+def advance_state(st: SessionState, text: str) -> FrozenSet[str]:
+    """
+    Apply one scammer message to the session's conversation state and update its dwell
+    counters: state_dwell is consecutive turns in the current state, state_turns the total
+    turns spent in each state. Returns the signals that fired.
+    """
+    signals = turn_signals(text, st.extracted)
+    state = next_state(st.state, st.state_dwell, signals)
+    st.state_dwell = st.state_dwell + 1 if state == st.state else 1
+    st.state = state
+    st.state_turns[state] = st.state_turns.get(state, 0) + 1
+    return signals
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional, Tuple
+
+from app.metrics import (
+    LLM_CACHED_INPUT_TOKENS,
+    LLM_CALL_SECONDS,
+    LLM_CALLS,
+    LLM_INPUT_TOKENS,
+    LLM_OUTPUT_TOKENS,
+    TURN_STAGE_SECONDS,
+)
+
+# Stage durations (ms) of the request being handled, for the LogAll timing line. Set per request
+# by the middleware; tasks spawned during the request inherit the same dict.
+_request_spans: ContextVar[Optional[dict]] = ContextVar("request_spans", default=None)
+
+
+def begin_request_spans() -> dict:
+    spans: dict = {}
+    _request_spans.set(spans)
+    return spans
+
+
+def _add_span(name: str, seconds: float) -> None:
+    spans = _request_spans.get()
+    if spans is not None:
+        key = f"{name}_ms"
+        spans[key] = spans.get(key, 0) + int(seconds * 1000)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Time one stage of a turn into honeypot_turn_stage_seconds{stage} and the request's timing line.
+
+        with stage("save"):
+            await uow.commit()
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        TURN_STAGE_SECONDS.labels(stage=name).observe(elapsed)
+        _add_span(name, elapsed)
+
+
+@asynccontextmanager
+async def llm_call(call: str):
+    """Time one LLM call (retries included) and count it as ok or error."""
+    t0 = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        elapsed = time.perf_counter() - t0
+        LLM_CALL_SECONDS.labels(call=call).observe(elapsed)
+        LLM_CALLS.labels(call=call, outcome=outcome).inc()
+        _add_span(f"llm_{call}", elapsed)
+
+
+def usage_tokens(resp) -> Tuple[int, int, int]:
+    """(input_tokens, cached_input_tokens, output_tokens) as reported by the Responses API, 0 when absent."""
+    usage = getattr(resp, "usage", None)
+    if usage is None:
+        return 0, 0, 0
+    details = getattr(usage, "input_tokens_details", None)
+    return (
+        int(getattr(usage, "input_tokens", 0) or 0),
+        int(getattr(details, "cached_tokens", 0) or 0),
+        int(getattr(usage, "output_tokens", 0) or 0),
+    )
+
+
+def record_llm_usage(call: str, resp) -> Tuple[int, int, int]:
+    input_tokens, cached_tokens, output_tokens = usage_tokens(resp)
+    LLM_INPUT_TOKENS.labels(call=call).inc(input_tokens)
+    LLM_CACHED_INPUT_TOKENS.labels(call=call).inc(cached_tokens)
+    LLM_OUTPUT_TOKENS.labels(call=call).inc(output_tokens)
+    return input_tokens, cached_tokens, output_tokens
+
+
+async def timed_llm_call(call: str, request):
+    """Await a single Responses API request (an un-awaited `client.responses.create(...)`), timed and usage-counted."""
+    async with llm_call(call):
+        response = await request
+    record_llm_usage(call, response)
+    return response
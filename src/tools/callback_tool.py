@@ -1,28 +1,35 @@
 from fastapi import BackgroundTasks
-from app.session_store import store
-from app.tools.summarize import summarize_behaviour, extract_suspicious_keywords
-from app.callback import send_final_callback
+from app.config import CALLBACK_QUEUE
+from app.job_queue import final_callback_queue
+from app.session_store import SessionState, _dump_extracted, _load_extracted
+from app.tools.summarize import summarize_behaviour
+from app.tools.keyword_tool import suspicious_keywords
+from app.callback import deliver_final_callback
+from app.conversation_memory import callback_transcript
+from app.metrics import CALLBACK_DEAD_LETTERED
 from app.pydantic_models import FinalCallbackPayload
-import json
+from app.timing import stage
+import asyncio
 import time
 
-def final_callback(session_id: str, reason: str, background_tasks: BackgroundTasks):
-    st = store.get_or_create(session_id)
-    total_messages = len(st.conversationHistory) + 1  # best-effort
+
+async def build_final_payload(st: SessionState, reason: str) -> FinalCallbackPayload:
+    total_messages = max(st.history_len, len(st.conversationHistory)) + 1  # best-effort
 
     engagement_duration = int(time.time() - st.created_at)
-    suspicious_keywords = extract_suspicious_keywords(json.dumps(st.conversationHistory))
-    st.extracted.suspiciousKeywords = suspicious_keywords
-    scammer_behaviour = summarize_behaviour(json.dumps(st.conversationHistory))
+    transcript = callback_transcript(st)
+    keywords = await suspicious_keywords(st, transcript)
+    st.extracted.suspiciousKeywords = keywords
+    scammer_behaviour = await summarize_behaviour(transcript)
 
     print("Final callback issued, Reason: ", reason)
     print("Total Engagement time", engagement_duration)
-    print("Extracted keywords", suspicious_keywords)
+    print("Extracted keywords", keywords)
     print("Final extracted intelligence", st.extracted)
     print("Scammer Behaviour", scammer_behaviour)
 
-    payload = FinalCallbackPayload(
-        sessionId=session_id,
+    return FinalCallbackPayload(
+        sessionId=st.session_id,
         scamDetected=st.scam_detected,
         totalMessagesExchanged=total_messages,
         engagementDurationSeconds=engagement_duration,
@@ -30,7 +37,98 @@ def final_callback(session_id: str, reason: str, background_tasks: BackgroundTas
         agentNotes=scammer_behaviour
     )
 
-    background_tasks.add_task(send_final_callback, payload)
 
+def session_snapshot(st: SessionState) -> dict:
+    """
+    The slice of session state the worker needs, shipped inside the job so it never re-reads
+    the session from the store.
+    """
+    return {
+        "session_id": st.session_id,
+        "created_at": st.created_at,
+        "scam_detected": st.scam_detected,
+        "conversationHistory": list(st.conversationHistory),
+        "history_len": st.history_len,
+        "memory_summary": st.memory_summary,
+        "summarised_upto": st.summarised_upto,
+        "extracted": _dump_extracted(st.extracted),
+    }
+
+
+def session_from_snapshot(snapshot: dict) -> SessionState:
+    return SessionState(
+        session_id=snapshot["session_id"],
+        created_at=snapshot["created_at"],
+        scam_detected=snapshot["scam_detected"],
+        conversationHistory=snapshot.get("conversationHistory", []),
+        history_len=snapshot.get("history_len", 0),
+        memory_summary=snapshot.get("memory_summary", ""),
+        summarised_upto=snapshot.get("summarised_upto", 0),
+        extracted=_load_extracted(snapshot.get("extracted", {})),
+    )
+
+
+async def deliver_or_dead_letter(payload: FinalCallbackPayload) -> bool:
+    """
+    Send an already-built payload; if every attempt fails, park it in the callback queue's
+    dead-letter list so `python -m app.worker --replay-dead` can deliver it later.
+    """
+    if await deliver_final_callback(payload):
+        return True
+
+    CALLBACK_DEAD_LETTERED.inc()
+    job = {"type": "final_callback_payload", "session_id": payload.sessionId, "payload": payload.model_dump()}
+    try:
+        await asyncio.to_thread(final_callback_queue.bury, job, "inline delivery failed")
+        print("Final callback dead-lettered", payload.sessionId)
+    except Exception as e:
+        print("Could not dead-letter final callback", payload.sessionId, e)
+    return False
+
+
+async def build_and_deliver(job: dict) -> bool:
+    """
+    Inline-mode counterpart of the worker, run as a background task after the response: build
+    the payload from the job's session snapshot, then deliver it. If the payload can't be built
+    the job is dead-lettered as is, for the worker to rebuild on replay.
+    """
+    try:
+        with stage("callback_payload"):
+            payload = await build_final_payload(session_from_snapshot(job["session"]), job["reason"])
+    except Exception as e:
+        CALLBACK_DEAD_LETTERED.inc()
+        try:
+            await asyncio.to_thread(final_callback_queue.bury, job, f"payload build failed: {e!r}")
+            print("Final callback dead-lettered", job["session_id"], e)
+        except Exception as bury_error:
+            print("Could not dead-letter final callback", job["session_id"], bury_error)
+        return False
+    return await deliver_or_dead_letter(payload)
+
+
+def enqueue_final_callback(job: dict) -> None:
+    # Runs as a background task after the response; the Redis push is the callback_enqueue stage
+    with stage("callback_enqueue"):
+        final_callback_queue.enqueue(job)
+
+
+def close_session(st: SessionState) -> None:
+    """Mark the request's own SessionState closed; the handler's flush persists it."""
     st.final_callback_sent = True
-    st.status = "closed"
\ No newline at end of file
+    st.status = "closed"
+
+
+async def final_callback(st: SessionState, reason: str, background_tasks: BackgroundTasks):
+    """
+    Hand the callback for a session that was closed and saved this turn off to the worker, or
+    send it inline when CALLBACK_QUEUE=inline.
+    """
+    job = {"type": "final_callback", "session_id": st.session_id, "reason": reason, "session": session_snapshot(st)}
+    if CALLBACK_QUEUE == "redis":
+        # Summarisation + delivery are owned by the worker (app.worker)
+        background_tasks.add_task(enqueue_final_callback, job)
+        print("Final callback queued, Reason: ", reason)
+        return
+
+    # Summarisation + delivery run after the response, off the request path
+    background_tasks.add_task(build_and_deliver, job)
@@ -1,60 +1,299 @@
 import re
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
+from app.config import EXTRACT_LLM_MODE, EXTRACT_MIN_CONFIDENCE
 from app.pydantic_models import ExtractedIntelligence
+from app.tools.summarize import extract_entities_agent
 
 _UPI = re.compile(r"\b[a-z0-9.\-_]{2,}@[a-z0-9]{2,}\b", re.I)
+_EMAIL = re.compile(r"\b[a-z0-9._%+\-]+@[a-z0-9\-]+(?:\.[a-z0-9\-]+)*\.[a-z]{2,}\b", re.I)
 _URL = re.compile(r"\bhttps?://[^\s]+|\bwww\.[^\s]+", re.I)
 _PHONE = re.compile(
     r"(?<!\w)(?:\+?\d{1,3}[\s\-]?)?(?:\d[\s\-]?){9,12}(?!\w)"
 )
 _ACCT = re.compile(r"\b\d{9,18}\b")  # loose on purpose
+_IFSC = re.compile(r"\b[A-Z]{4}0[A-Z0-9]{6}\b")
+_ACCT_CONTEXT = re.compile(r"\b(?:a/?c|acc(?:ount)?|acct|khata|ifsc|beneficiary)\b", re.I)
+# Bare domains ("sbi-update.com", "bit.ly/3xYz"): any TLD, path optional
+_DOMAIN = re.compile(r"(?<![\w@/.\-])(?:[a-z0-9](?:[a-z0-9\-]*[a-z0-9])?\.)+([a-z]{2,24})\b(?:/\S*)?", re.I)
+# TLDs common in phishing links and shorteners. A bare domain on another TLD ("sir.please") is
+# only worth an LLM look when it has a path, a digit or a hyphen.
+_LINK_TLDS = frozenset({
+    "com", "in", "net", "org", "co", "io", "ly", "me", "gl", "gd", "to", "cc", "ws", "us", "uk", "biz",
+    "info", "xyz", "link", "top", "live", "app", "site", "online", "club", "shop", "store", "click",
+    "page", "vip", "win", "icu", "buzz", "tk", "ml", "ga", "cf", "gq", "support", "help", "services",
+})
+# Spelled-out UPI handles: "rahul at ybl", "rahul at the rate of ybl"
+_UPI_AT = re.compile(r"\b([a-z0-9][a-z0-9._\-]+)\s+at\s+(?:the\s+rate\s+(?:of\s+)?)?([a-z]{2,})\b", re.I)
+_UPI_CONTEXT = re.compile(r"\b(?:upi|vpa|gpay|google\s*pay|phone\s*pe|paytm|bhim)\b", re.I)
+_NOT_A_HANDLE = frozenset({
+    "pay", "paid", "send", "sent", "transfer", "money", "amount", "me", "us", "him", "her", "them", "it",
+    "this", "that", "account", "bank", "branch", "call", "message", "msg", "available", "only", "id",
+})
+# An account keyword right before a digit run ("a/c no: 1234...") makes the run an account, not a phone
+_ACCT_LEAD = re.compile(r"\b(?:a/?c|acc(?:ount)?|acct|khata|beneficiary)\b(?:\s*(?:no\.?|number|num|#))?\s*[:\-]?\s*$", re.I)
+
+# Spans that look like intel the regexes could not parse (obfuscated handles, spelled-out
+# digits, defanged links). Only these justify paying for the LLM extractor.
+_SUSPICIOUS_SPANS = [
+    re.compile(r"\b[a-z0-9._\-]{2,}\s*(?:\[at\]|\(at\)|\{at\}|\s+at\s+the\s+rate\s+(?:of\s+)?)\s*[a-z0-9]{2,}", re.I),
+    re.compile(r"\b[a-z0-9\-]{2,}\s*(?:\[dot\]|\(dot\)|\s+dot\s+)\s*(?:com|in|net|org|co|xyz|info|link)\b", re.I),
+    re.compile(r"\bhxxps?://\S+|\b[a-z0-9\-]+\[\.\][a-z]{2,}\S*", re.I),
+    re.compile(
+        r"\b(?:(?:zero|one|two|three|four|five|six|seven|eight|nine|double|triple)[\s,\-]+){4,}"
+        r"(?:zero|one|two|three|four|five|six|seven|eight|nine)\b",
+        re.I,
+    ),
+]
+
+# Handles issued by NPCI-registered PSPs. Anything else is still reported (scammers use
+# made-up handles too), but with lower confidence.
+UPI_HANDLE_SUFFIXES = frozenset({
+    "ybl", "ibl", "axl", "okaxis", "okhdfcbank", "okicici", "oksbi", "paytm", "ptyes", "ptaxis",
+    "pthdfc", "ptsbi", "apl", "yapl", "rapl", "upi", "sbi", "icici", "hdfcbank", "axisbank",
+    "kotak", "kmbl", "yesbank", "yesbankltd", "idfcbank", "idfcfirst", "indus", "federal", "fbl",
+    "pnb", "barodampay", "boi", "cnrb", "unionbank", "uboi", "centralbank", "citi", "hsbc", "sc",
+    "rbl", "aubank", "jupiteraxis", "freecharge", "airtel", "jio", "waaxis", "wahdfcbank",
+    "wasbi", "waicici", "amazonpay", "slice", "niyoicici", "abfspay", "ikwik", "mahb", "dbs",
+    "equitas", "ujjivan", "postbank", "ippb", "okbizaxis", "timecosmos", "naviaxis",
+})
+
+
+def normalize_phone(raw: str) -> Optional[str]:
+    """
+    Normalise an Indian phone number to E.164 (+91XXXXXXXXXX).
+    Non-Indian numbers are returned as +<digits> when they look like a full international number.
+    """
+    digits = re.sub(r"\D", "", raw)
+    if len(digits) == 10 and digits[0] in "6789":
+        return f"+91{digits}"
+    if len(digits) == 11 and digits.startswith("0") and digits[1] in "6789":
+        return f"+91{digits[1:]}"
+    if len(digits) == 12 and digits.startswith("91") and digits[2] in "6789":
+        return f"+{digits}"
+    if raw.strip().startswith("+") and 10 <= len(digits) <= 15 and not digits.startswith("91"):
+        return f"+{digits}"
+    return None
+
+
+def _dedupe(values: List[str]) -> List[str]:
+    seen = set()
+    return [v for v in values if not (v in seen or seen.add(v))]
+
+
+def _upi_confidence(upi: str) -> float:
+    handle = upi.rsplit("@", 1)[-1].lower()
+    return 0.95 if handle in UPI_HANDLE_SUFFIXES else 0.7
+
+
+def extract_entities_detailed(text: str) -> Dict[str, object]:
+    """
+    Deterministic extraction stage.
+
+    Returns the usual intel lists plus:
+    - confidence: {category: {value: score}}; values under EXTRACT_MIN_CONFIDENCE need the LLM
+    - ambiguousSpans: spans that look like intel but could not be parsed
+    """
+    confidence: Dict[str, Dict[str, float]] = {
+        "upiIds": {}, "phishingLinks": {}, "phoneNumbers": {}, "bankAccounts": {}, "emailAddresses": {},
+    }
+    ambiguous = []
+
+    def overlaps(span: Tuple[int, int], spans: List[Tuple[int, int]]) -> bool:
+        return any(span[0] < e and s < span[1] for s, e in spans)
+
+    emails = []
+    email_spans: List[Tuple[int, int]] = []
+    for m in _EMAIL.finditer(text):
+        emails.append(m.group(0))
+        email_spans.append(m.span())
+        confidence["emailAddresses"][m.group(0)] = 0.9
+
+    upis = []
+    upi_spans: List[Tuple[int, int]] = []
+    for m in _UPI.finditer(text):
+        # name@bank.com is an email, not a UPI handle
+        if any(s <= m.start() < e for s, e in email_spans):
+            continue
+        upis.append(m.group(0))
+        upi_spans.append(m.span())
+        confidence["upiIds"][m.group(0)] = _upi_confidence(m.group(0))
+
+    has_upi_context = bool(_UPI_CONTEXT.search(text))
+    for m in _UPI_AT.finditer(text):
+        name, psp = m.group(1), m.group(2)
+        if psp.lower() not in UPI_HANDLE_SUFFIXES or name.lower() in _NOT_A_HANDLE:
+            continue
+        # "meet at sbi" is not a handle; a UPI mention or a handle-like name makes it one
+        if not (has_upi_context or re.search(r"[\d._]", name)):
+            continue
+        upi = f"{name}@{psp}"
+        upis.append(upi)
+        upi_spans.append(m.span())
+        confidence["upiIds"][upi] = 0.75
+
+    links = []
+    link_spans: List[Tuple[int, int]] = []
+    for m in _URL.finditer(text):
+        url = m.group(0).rstrip(".,;:!?)]}'\"")
+        links.append(url)
+        link_spans.append(m.span())
+        confidence["phishingLinks"][url] = 0.9
+
+    for m in _DOMAIN.finditer(text):
+        if overlaps(m.span(), email_spans + upi_spans + link_spans):
+            continue
+        domain = m.group(0).rstrip(".,;:!?)]}'\"")
+        if m.group(1).lower() in _LINK_TLDS:
+            links.append(domain)
+            link_spans.append(m.span())
+            confidence["phishingLinks"][domain] = 0.8
+        elif "/" in domain or re.search(r"[\d\-]", domain):
+            ambiguous.append(domain)
+
+    has_ifsc = bool(_IFSC.search(text))
+    has_acct_context = bool(_ACCT_CONTEXT.search(text))
+
+    def account_score(led_by_account: bool = False) -> float:
+        # A bare digit run ("amount 10000000000") is only an account with account context
+        if led_by_account:
+            return 0.95
+        score = 0.4
+        if has_acct_context:
+            score += 0.35
+        if has_ifsc:
+            score += 0.2
+        return round(min(score, 0.95), 2)
 
-def extract_entities(text: str) -> Dict[str, List[str]]:
     phones = []
+    phone_spans: List[Tuple[int, int]] = []
+    accounts = []
+    parsed_spans = email_spans + upi_spans + link_spans
     for match in _PHONE.finditer(text):
+        # The digits of 9876543210@ybl belong to the UPI handle
+        if overlaps(match.span(), parsed_spans):
+            continue
         raw = match.group(0).strip()
         digits = re.sub(r"\D", "", raw)
 
         # Only accept realistic phone lengths
-        if 10 <= len(digits) <= 15:
-            phones.append(raw)
+        if not 10 <= len(digits) <= 15:
+            continue
+        e164 = normalize_phone(raw)
+        led_by_account = bool(_ACCT_LEAD.search(text[:match.start()]))
+        if e164 is None or led_by_account or (has_ifsc and not raw.startswith("+") and len(digits) != 10):
+            # Not a dialable number, or explicitly an account: report it as one
+            if len(digits) <= 18:
+                accounts.append(digits)
+                confidence["bankAccounts"][digits] = account_score(led_by_account)
+            phone_spans.append(match.span())
+            continue
+        phones.append(raw)
+        phone_spans.append(match.span())
+        confidence["phoneNumbers"][raw] = 0.95 if e164.startswith("+91") else 0.8
 
-    # remove duplicates while preserving order
-    seen = set()
-    phones = [p for p in phones if not (p in seen or seen.add(p))]
+    for m in _ACCT.finditer(text):
+        # Digit runs the phone pass already classified, or part of a UPI handle / email / link
+        if any(s <= m.start() < e for s, e in phone_spans + parsed_spans):
+            continue
+        accounts.append(m.group(0))
+        confidence["bankAccounts"][m.group(0)] = account_score(bool(_ACCT_LEAD.search(text[:m.start()])))
+
+    for pattern in _SUSPICIOUS_SPANS:
+        for m in pattern.finditer(text):
+            # Already captured by a strict pattern
+            if overlaps(m.span(), parsed_spans):
+                continue
+            ambiguous.append(m.group(0))
 
     return {
-        "upiIds": _UPI.findall(text),
-        "phishingLinks": _URL.findall(text),
-        "phoneNumbers": phones,
-        "bankAccounts": _ACCT.findall(text),
+        "upiIds": _dedupe(upis),
+        "phishingLinks": _dedupe(links),
+        "phoneNumbers": _dedupe(phones),
+        "bankAccounts": _dedupe(accounts),
+        "emailAddresses": _dedupe(emails),
+        "confidence": confidence,
+        "ambiguousSpans": _dedupe(ambiguous),
     }
 
+
+def confident_entities(result: Dict[str, object]) -> Dict[str, List[str]]:
+    """The intel lists without values scored under EXTRACT_MIN_CONFIDENCE."""
+    scores = result["confidence"]
+    return {
+        k: [v for v in result[k] if scores[k].get(v, 1.0) >= EXTRACT_MIN_CONFIDENCE]
+        for k in ("upiIds", "phishingLinks", "phoneNumbers", "bankAccounts", "emailAddresses")
+    }
+
+
+def needs_llm_extraction(result: Dict[str, object]) -> bool:
+    if EXTRACT_LLM_MODE == "always":
+        return True
+    if EXTRACT_LLM_MODE == "never":
+        return False
+    if result["ambiguousSpans"]:
+        return True
+    return any(
+        score < EXTRACT_MIN_CONFIDENCE
+        for scores in result["confidence"].values()
+        for score in scores.values()
+    )
+
+
+async def extract_entities_tiered(text: str) -> Dict[str, List[str]]:
+    """
+    Local-first extraction: regex/validator stage, LLM only when the message has
+    suspicious spans the deterministic stage could not parse or low-confidence values.
+    Low-confidence values are only reported if the LLM confirms them.
+    """
+    result = extract_entities_detailed(text)
+    bits = confident_entities(result)
+    print("Extracted intelligence (local) : ", bits, "confidence:", result["confidence"])
+
+    if not needs_llm_extraction(result):
+        return bits
+
+    print("Escalating to LLM extractor:", result["ambiguousSpans"])
+    llm_bits = await extract_entities_agent(text)
+    for k in bits:
+        for v in llm_bits.get(k, []) or []:
+            if isinstance(v, str) and v not in bits[k]:
+                bits[k].append(v)
+    return bits
+
+
+def _merge_key(field_name: str, value: str) -> str:
+    if field_name == "phoneNumbers":
+        return normalize_phone(value) or re.sub(r"\D", "", value)
+    return value
+
+
 def merge_unique(
     existing: ExtractedIntelligence,
     new_bits: dict
 ) -> ExtractedIntelligence:
     """
     Merge new extracted intel into the existing Pydantic model in-place.
+    Phone numbers are de-duplicated on their E.164 form.
     """
     field_map = {
         "upiIds": "upiIds",
         "bankAccounts": "bankAccounts",
         "phishingLinks": "phishingLinks",
         "phoneNumbers": "phoneNumbers",
+        "emailAddresses": "emailAddresses",
         # suspiciousKeywords can be added later if needed
     }
     for field_name in field_map.values():
         existing_list = getattr(existing, field_name, [])
-        seen = set(existing_list)
+        seen = {_merge_key(field_name, v) for v in existing_list}
 
         for v in new_bits.get(field_name, []):
-            if v not in seen:
+            key = _merge_key(field_name, v)
+            if key not in seen:
                 existing_list.append(v)
-                seen.add(v)
+                seen.add(key)
 
         # setattr not strictly required because list is mutated,
         # but keeping it explicit is clearer
         setattr(existing, field_name, existing_list)
     return existing
-
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import asyncio
+import re
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import CountVectorizer
+
+from app.config import (
+    KEYWORD_EXTRACT_MODE, KEYWORD_TOP_K, KEYWORD_BACKGROUND_PATH, KEYWORD_BATCH_SIZE, KEYWORD_BATCH_WAIT_MS,
+)
+from app.micro_batch import collect_batch
+from app.session_store import SessionState
+from app.state_engine import IntentScanner
+from app.tools.summarize import extract_suspicious_keywords
+
+# Curated scam phrases (English, Hinglish, Hindi). A phrase found in the conversation always
+# outranks plain TF-IDF terms, and a longer phrase outranks the shorter ones it contains.
+SCAM_LEXICON = (
+    "otp", "share otp", "one time password", "cvv", "upi pin", "mpin", "atm pin", "password",
+    "kyc", "kyc update", "kyc expired", "pan card", "aadhaar", "verify", "verification",
+    "account blocked", "account suspended", "account will be blocked", "card blocked", "sim blocked",
+    "urgent", "immediately", "final warning", "last chance", "within 24 hours", "legal action",
+    "arrest", "digital arrest", "police", "cbi", "customs", "courier", "parcel seized", "drugs",
+    "refund", "cashback", "lottery", "prize", "winner", "reward", "gift", "bonus", "loan approved",
+    "investment", "double your money", "guaranteed returns", "crypto", "trading", "part time job",
+    "work from home", "task", "registration fee", "processing fee", "advance payment",
+    "anydesk", "teamviewer", "quicksupport", "screen share", "apk", "download app", "click link",
+    "electricity bill", "power cut", "disconnected", "bank official", "customer care", "rbi",
+    "otp bhejo", "otp batao", "jaldi", "turant", "khata band", "account band", "paise bhejo",
+    "inaam", "lottery laga", "kyc karo", "verify karo",
+    "ओटीपी", "खाता बंद", "तुरंत", "इनाम", "लॉटरी", "गिरफ्तार", "पुलिस", "केवाईसी", "रिफंड",
+)
+
+# Intel the report already carries in its own fields, and noise that isn't a keyword
+_INTEL = re.compile(
+    r"(?:https?://|www\.)\S+|\S+@\S+|\+?\d[\d\s\-]{5,}\d|\b[a-z0-9\-]+\.(?:com|in|net|org|xyz|info|link)\S*",
+    re.IGNORECASE,
+)
+# Letter runs of 3+, Latin or Devanagari (matras included, digits excluded)
+_TOKEN = r"(?u)(?:[^\W\d_]|[ऀ-ॣ॰-ॿ]){3,}"
+
+STOP_WORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below between both but by
+can could did do does doing down during each few for from further had has have having he her here hers him his how
+i if in into is it its just me more most my no nor not now of off on once only or other our out over own same she
+should so some such than that the their them then there these they this those through to too under until up very
+was we were what when where which while who whom why will with would you your yours yes ok okay
+sir madam mam dear hello please thank thanks regards kindly team
+hai hain ho ka ki ke ko se me mein main hum aap aapka aapki aapke tum tera mera meri apna apni kya kyun nahi na
+haan ji bhi toh to ye yeh wo woh koi kuch abhi kar karo kare karna raha rahi rahe tha thi the ek aur par pe
+है हैं हो का की के को से में मैं हम आप आपका आपकी आपके अपना अपनी क्या नहीं और भी तो यह वह कोई कुछ अभी कर करें करना था थी थे एक पर
+कृपया दें जी
+""".split())
+
+_BACKGROUND_FILE = Path(__file__).resolve().parent.parent / "data" / "keyword_background.txt"
+
+
+def _preprocess(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return _INTEL.sub(" ", text)
+
+
+class KeywordExtractor:
+    """
+    Suspicious-keyword extraction without a model call.
+
+    Candidates are unigrams/bigrams of the conversation plus SCAM_LEXICON phrases. Terms are
+    scored by sublinear TF times IDF against a background corpus of ordinary messages, so words
+    every conversation uses (account, bank, today) rank low; lexicon phrases rank above the rest.
+
+    extract_batch() scores many conversations as one sparse matrix. Nothing is fitted per call:
+    the analyzer is built once and terms are indexed per batch.
+    """
+
+    def __init__(self, background: List[str], lexicon=SCAM_LEXICON, top_k: int = KEYWORD_TOP_K):
+        self.top_k = top_k
+        self._analyze = CountVectorizer(
+            preprocessor=_preprocess,
+            token_pattern=_TOKEN,
+            stop_words=list(STOP_WORDS),
+            ngram_range=(1, 2),
+        ).build_analyzer()
+        df: Counter = Counter()
+        for doc in background:
+            df.update(set(self._analyze(doc)))
+        self._df = df
+        self._n_background = len(background)
+        self._lexicon = IntentScanner({phrase: (phrase,) for phrase in lexicon})
+
+    def _idf(self, terms: np.ndarray) -> np.ndarray:
+        df = np.fromiter((self._df.get(t, 0) for t in terms), dtype=np.float64, count=len(terms))
+        return np.log((1 + self._n_background) / (1 + df)) + 1.0
+
+    def _count(self, texts: List[str]):
+        """(term-count CSR matrix, term array) with columns in term order, or None without terms."""
+        vocab: Dict[str, int] = {}
+        indices: List[int] = []
+        data: List[int] = []
+        indptr = [0]
+        for text in texts:
+            row = Counter(vocab.setdefault(t, len(vocab)) for t in self._analyze(text))
+            indices.extend(row.keys())
+            data.extend(row.values())
+            indptr.append(len(indices))
+        if not vocab:
+            # Nothing but stop words / intel in the whole batch
+            return None
+
+        terms = np.array(sorted(vocab), dtype=object)
+        column = np.empty(len(vocab), dtype=np.int64)
+        column[[vocab[t] for t in terms]] = np.arange(len(terms))
+        counts = csr_matrix(
+            (np.asarray(data, dtype=np.float64), column[np.asarray(indices, dtype=np.int64)], indptr),
+            shape=(len(texts), len(terms)),
+        )
+        counts.sort_indices()
+        return counts, terms
+
+    def extract_batch(self, texts: List[str], top_k: Optional[int] = None) -> List[List[str]]:
+        top_k = top_k or self.top_k
+        results: List[List[str]] = [[] for _ in texts]
+        counts = self._count(texts)
+        if counts is not None:
+            counts, terms = counts
+            # A bigram seen once is mostly an accident of word order; require it to repeat
+            is_bigram = np.char.find(terms.astype(str), " ") >= 0
+            counts.data[is_bigram[counts.indices] & (counts.data < 2)] = 0
+            counts.eliminate_zeros()
+            counts.data = 1.0 + np.log(counts.data)
+            scores = counts.multiply(self._idf(terms)).tocsr()
+        for row, text in enumerate(texts):
+            ranked: Dict[str, float] = {}
+            if counts is not None:
+                start, end = scores.indptr[row], scores.indptr[row + 1]
+                cols, vals = scores.indices[start:end], scores.data[start:end]
+                for i in np.argsort(-vals, kind="stable")[:top_k * 3]:
+                    ranked[terms[cols[i]]] = float(vals[i])
+            for phrase in self._lexicon.scan(_preprocess(text)):
+                # Longer (more specific) phrases first, so "share otp" shadows "otp"
+                ranked[phrase] = ranked.get(phrase, 0.0) + 1000.0 * len(phrase.split())
+
+            picked: List[str] = []
+            for term, _ in sorted(ranked.items(), key=lambda kv: (-kv[1], kv[0])):
+                # A term whose words all appear in an already picked phrase adds nothing
+                words = set(term.split())
+                if any(words <= set(p.split()) for p in picked):
+                    continue
+                picked.append(term)
+                if len(picked) >= top_k:
+                    break
+            results[row] = picked
+        return results
+
+    def extract(self, text: str, top_k: Optional[int] = None) -> List[str]:
+        return self.extract_batch([text], top_k)[0]
+
+
+def load_background(path: str | Path = KEYWORD_BACKGROUND_PATH or _BACKGROUND_FILE) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+_extractor: Optional[KeywordExtractor] = None
+
+
+def get_keyword_extractor() -> KeywordExtractor:
+    global _extractor
+    if _extractor is None:
+        _extractor = KeywordExtractor(load_background())
+    return _extractor
+
+
+class KeywordBatcher:
+    """
+    Micro-batching in front of KeywordExtractor: sessions whose final reports are built at the
+    same time (concurrent worker jobs, inline callback tasks) are scored in one extract_batch
+    call. The collector task is started on first use, per event loop.
+    """
+
+    def __init__(self, max_items: int = KEYWORD_BATCH_SIZE, max_wait_ms: float = KEYWORD_BATCH_WAIT_MS):
+        self.max_items = max(1, max_items)
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: Optional[asyncio.Queue[Tuple[str, asyncio.Future]]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def extract(self, text: str) -> List[str]:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run(self._queue))
+        fut = loop.create_future()
+        self._queue.put_nowait((text, fut))
+        return await fut
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        while True:
+            batch = await collect_batch(queue, self.max_items, self.max_wait)
+            batch = [(t, f) for t, f in batch if not f.done()]
+            if not batch:
+                continue
+            try:
+                results = get_keyword_extractor().extract_batch([t for t, _ in batch])
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            for (_, fut), result in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(result)
+
+
+keyword_batcher = KeywordBatcher()
+
+
+def session_text(st: SessionState) -> str:
+    """Plain text of what the session still holds: running summary plus the kept scammer messages."""
+    parts = [st.memory_summary] if st.memory_summary else []
+    parts.extend(m.get("text", "") for m in st.conversationHistory)
+    return "\n".join(parts)
+
+
+async def suspicious_keywords(st: SessionState, transcript: str) -> List[str]:
+    """
+    KEYWORD_EXTRACT_MODE:
+    - local:  lexicon + TF-IDF only (default, no model call)
+    - enrich: local keywords, followed by the LLM's keywords that aren't already listed
+    - llm:    the LLM extractor alone
+    """
+    if KEYWORD_EXTRACT_MODE == "llm":
+        return await extract_suspicious_keywords(transcript)
+
+    keywords = await keyword_batcher.extract(session_text(st))
+    if KEYWORD_EXTRACT_MODE != "enrich":
+        return keywords
+
+    seen = {k.lower() for k in keywords}
+    for k in await extract_suspicious_keywords(transcript):
+        if isinstance(k, str) and k.lower() not in seen:
+            keywords.append(k)
+            seen.add(k.lower())
+    return keywords
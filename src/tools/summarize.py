@@ -1,14 +1,15 @@
-from openai import OpenAI
+from openai import AsyncOpenAI
 import json
-from app.session_store import store
+from app.config import MEMORY_SUMMARY_MODEL, MEMORY_SUMMARY_TOKENS
+from app.timing import timed_llm_call
 
-client = OpenAI()
+client = AsyncOpenAI()
 
-def extract_entities_agent(text: str) -> dict:
+async def extract_entities_agent(text: str) -> dict:
     if not text or not text.strip():
         return {"upiIds": [], "phishingLinks": [], "phoneNumbers": [], "bankAccounts": [], "emailAddresses": []}
     
-    response = client.responses.create(
+    response = await timed_llm_call("extract", client.responses.create(
         model="gpt-5.2",
         input=[
             {
@@ -39,7 +40,7 @@ def extract_entities_agent(text: str) -> dict:
         ],
         max_output_tokens=500,
         temperature=0.0  # important for consistency
-    )
+    ))
 
     try:
         data = json.loads(response.output_text)
@@ -50,11 +51,11 @@ def extract_entities_agent(text: str) -> dict:
         return {"upiIds": [], "phishingLinks": [], "phoneNumbers": [], "bankAccounts": [], "emailAddresses": []}
     return data
 
-def extract_suspicious_keywords(text: str) -> list[str]:
+async def extract_suspicious_keywords(text: str) -> list[str]:
     if not text or not text.strip():
         return []
 
-    response = client.responses.create(
+    response = await timed_llm_call("keywords", client.responses.create(
         model="gpt-5.2",
         input=[
             {
@@ -78,7 +79,7 @@ def extract_suspicious_keywords(text: str) -> list[str]:
         ],
         max_output_tokens=200,
         temperature=0.0  # important for consistency
-    )
+    ))
 
     try:
         data = json.loads(response.output_text)
@@ -88,7 +89,7 @@ def extract_suspicious_keywords(text: str) -> list[str]:
         return []
     return data.get("keywords", [])
 
-def summarize_behaviour(text: str) -> str:
+async def summarize_behaviour(text: str) -> str:
     """
     Summarize the given text using OpenAI GPT-5.2.
 
@@ -98,7 +99,7 @@ def summarize_behaviour(text: str) -> str:
     if not text or not text.strip():
         return ""
 
-    response = client.responses.create(
+    response = await timed_llm_call("behaviour_summary", client.responses.create(
         model="gpt-5.2",
         input=[
             {
@@ -111,10 +112,43 @@ def summarize_behaviour(text: str) -> str:
             }
         ],
         max_output_tokens=300
-    )
+    ))
 
     return response.output_text.strip()
 
+async def summarize_memory(previous: str, messages: list[dict]) -> str:
+    """
+    Fold older scammer messages into the agent's running conversation summary.
+
+    :param previous: Summary so far (may be empty)
+    :param messages: Messages leaving the verbatim window, oldest first
+    :return: Updated summary string
+    """
+    if not messages:
+        return previous
+
+    response = await timed_llm_call("memory_summary", client.responses.create(
+        model=MEMORY_SUMMARY_MODEL,
+        input=[
+            {
+                "role": "system",
+                "content": (
+                    "You maintain a running summary of a scam conversation for the agent replying to the scammer. "
+                    "Keep the scammer's claims, demands, payment details and any promises made. "
+                    f"Reply with the updated summary only, at most {MEMORY_SUMMARY_TOKENS} tokens."
+                )
+            },
+            {
+                "role": "user",
+                "content": f"Summary so far:\n{previous or '(none)'}\n\nNew messages:\n{json.dumps(messages, ensure_ascii=False)}"
+            }
+        ],
+        max_output_tokens=MEMORY_SUMMARY_TOKENS * 2
+    ))
+
+    return response.output_text.strip()
+
+
 
 # text = """
 # [{'sender': 'scammer', 'text': 'please share your SBI account number and the OTP you receive right away—this is the final step to keep your account safe. My details for your reference: employee ID 1234567890123456, UPI scammer.fraud@fakebank, helpline +91-9876543210.', 'timestamp': 1769980111958}, {'sender': 'scammer', 'text': 'please share your SBI account number and the OTP you receive right away—this is the final step to keep your account safe. My details for your reference: employee ID 1234567890123456, UPI scammer.fraud@fakebank, helpline +91-9876543210.', 'timestamp': 1769980111958}, {'sender': 'scammer', 'text': 'please share your SBI account number and the OTP you receive right away—this is the final step to keep your account safe. My details for your reference: employee ID 1234567890123456, UPI scammer.fraud@fakebank, helpline +91-9876543210.', 'timestamp': 1769980111958}, {'sender': 'scammer', 'text': 'please share your SBI account number and the OTP you receive right away—this is the final step to keep your account safe. My details for your reference: employee ID 1234567890123456, UPI scammer.fraud@fakebank, helpline +91-9876543210.', 'timestamp': 1769980111958}, {'sender': 'scammer', 'text': 'please share your SBI account number and the OTP you receive right away—this is the final step to keep your account safe. My details for your reference: employee ID 1234567890123456, UPI scammer.fraud@fakebank, helpline +91-9876543210.', 'timestamp': 1769980111958}, {'sender': 'scammer', 'text': 'please share your SBI account number and the OTP you receive right away—this is the final step to keep your account safe. My details for your reference: employee ID 1234567890123456, UPI scammer.fraud@fakebank, helpline +91-9876543210.', 'timestamp': 1769980111958}, {'sender': 'scammer', 'text': 'please share your SBI account number and the OTP you receive right away—this is the final step to keep your account safe. My details for your reference: employee ID 1234567890123456, UPI scammer.fraud@fakebank, helpline +91-9876543210.', 'timestamp': 1769980111958}, {'sender': 'scammer', 'text': 'please share your SBI account number and the OTP you receive right away—this is the final step to keep your account safe. My details for your reference: employee ID 1234567890123456, UPI scammer.fraud@fakebank, helpline +91-9876543210.', 'timestamp': 1769980111958}, {'sender': 'scammer', 'text': 'please share your SBI account number and the OTP you receive right away—this is the final step to keep your account safe. My details for your reference: employee ID 1234567890123456, UPI scammer.fraud@fakebank, helpline +91-9876543210.', 'timestamp': 1769980111958}, {'sender': 'scammer', 'text': 'please share your SBI account number and the OTP you receive right away—this is the final step to keep your account safe. My details for your reference: employee ID 1234567890123456, UPI scammer.fraud@fakebank, helpline +91-9876543210.', 'timestamp': 1769980111958}, {'sender': 'scammer', 'text': 'Please reply with your SBI account number and the OTP you receive, so we can complete your verification and reactivate your account instantly. If you need any assurance, my employee ID is 1234567890123456 and my official UPI is scammer.fraud@fakebank.', 'timestamp': 1769980111958}, {'sender': 'scammer', 'text': 'please share your SBI account number and the OTP you receive right away—this is the final step to keep your account safe. My details for your reference: employee ID 1234567890123456, UPI scammer.fraud@fakebank, helpline +91-9876543210.', 'timestamp': 1769980111958}, {'sender': 'scammer', 'text': 'please share your SBI account number and the OTP you receive right away—this is the final step to keep your account safe. My details for your reference: employee ID 1234567890123456, UPI scammer.fraud@fakebank, helpline +91-9876543210.', 'timestamp': 1769980111958}]
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from app.config import (
+    SESSION_CONCURRENCY_POLICY, SESSION_LEASE_TTL_MS, SESSION_LEASE_WAIT_MS, SESSION_TURN_RESULT_TTL,
+)
+from app.metrics import SESSION_TURN_CONCURRENCY
+from app.pydantic_models import IncomingEvent
+from app.session_store import store_call
+
+_POLL_SECONDS = 0.05
+
+
+class TurnRejected(Exception):
+    """Another turn for the same session holds the lease and the policy says not to wait."""
+
+
+class TurnSlot:
+    def __init__(self, reply: Optional[str] = None):
+        # Set when the turn was coalesced onto an identical in-flight/finished turn
+        self.coalesced_reply = reply
+        # Filled in by the handler so identical retries can be answered without a new turn
+        self.reply: Optional[str] = None
+
+
+def turn_fingerprint(event: IncomingEvent) -> str:
+    raw = f"{event.sessionId}\x00{event.message.sender}\x00{event.message.text}\x00{event.message.timestamp}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _count(outcome: str) -> None:
+    SESSION_TURN_CONCURRENCY.labels(policy=SESSION_CONCURRENCY_POLICY, outcome=outcome).inc()
+
+
+async def _keep_lease(session_id: str, token: str) -> None:
+    """Renew the lease every TTL/3 until cancelled, so a long turn never outlives it."""
+    while True:
+        await asyncio.sleep(SESSION_LEASE_TTL_MS / 3000)
+        try:
+            if not await store_call("renew_lease", session_id, token, SESSION_LEASE_TTL_MS):
+                print("Session lease lost mid-turn", session_id)
+                return
+        except Exception as e:
+            print("Session lease renewal failed", session_id, e)
+
+
+@asynccontextmanager
+async def session_turn(session_id: str, fingerprint: str) -> AsyncIterator[TurnSlot]:
+    """
+    Serialise turns per session with a Redis lease (SET NX PX).
+
+    SESSION_CONCURRENCY_POLICY decides what happens when the lease is taken:
+    - reject:   raise TurnRejected immediately
+    - queue:    wait up to SESSION_LEASE_WAIT_MS (at least one lease TTL) for the lease
+    - coalesce: an identical message (client retry) gets the in-flight turn's reply;
+                a different message waits like `queue`
+    """
+    policy = SESSION_CONCURRENCY_POLICY
+    token = uuid.uuid4().hex
+
+    if policy == "coalesce":
+        cached = await store_call("get_turn_result", session_id, fingerprint)
+        if cached is not None:
+            _count("coalesced")
+            yield TurnSlot(reply=cached)
+            return
+
+    acquired = await store_call("acquire_lease", session_id, token, SESSION_LEASE_TTL_MS)
+    if not acquired:
+        if policy == "reject":
+            _count("rejected")
+            raise TurnRejected(session_id)
+
+        loop = asyncio.get_running_loop()
+        # A lease left by a crashed replica expires within one TTL; never give up before that
+        deadline = loop.time() + max(SESSION_LEASE_WAIT_MS, SESSION_LEASE_TTL_MS) / 1000
+        while not acquired:
+            if loop.time() >= deadline:
+                _count("timeout")
+                raise TurnRejected(session_id)
+            await asyncio.sleep(_POLL_SECONDS)
+
+            if policy == "coalesce":
+                cached = await store_call("get_turn_result", session_id, fingerprint)
+                if cached is not None:
+                    _count("coalesced")
+                    yield TurnSlot(reply=cached)
+                    return
+
+            acquired = await store_call("acquire_lease", session_id, token, SESSION_LEASE_TTL_MS)
+        _count("queued")
+    else:
+        _count("acquired")
+
+    slot = TurnSlot()
+    renewer = asyncio.create_task(_keep_lease(session_id, token))
+    try:
+        yield slot
+        if slot.reply is not None and policy == "coalesce":
+            await store_call("set_turn_result", session_id, fingerprint, slot.reply, SESSION_TURN_RESULT_TTL)
+    finally:
+        renewer.cancel()
+        # Shielded so a cancelled request (client gone) still hands the lease back
+        await asyncio.shield(store_call("release_lease", session_id, token))
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+
+from prometheus_client import start_http_server
+
+from app.config import WORKER_CONCURRENCY, WORKER_METRICS_PORT
+from app.job_queue import RedisJobQueue, final_callback_queue
+from app.metrics import CALLBACK_DEAD_LETTERED
+from app.pydantic_models import FinalCallbackPayload
+from app.session_store import load_session
+from app.tools.callback_tool import build_final_payload, session_from_snapshot
+from app.callback import close_http_client, deliver_final_callback
+
+
+async def process_final_callback(job: dict) -> None:
+    if job.get("type") == "final_callback_payload":
+        # Dead-lettered inline delivery: the payload is already built, only the send is retried
+        payload = FinalCallbackPayload.model_validate(job["payload"])
+    else:
+        if "session" in job:
+            st = session_from_snapshot(job["session"])
+        else:
+            # Jobs queued before snapshots were shipped with the job
+            st = await load_session(job["session_id"])
+        payload = await build_final_payload(st, job.get("reason", ""))
+
+    if not await deliver_final_callback(payload):
+        raise RuntimeError("callback receiver did not acknowledge")
+
+
+async def worker_loop(queue: RedisJobQueue, worker_id: int) -> None:
+    while True:
+        reserved = await asyncio.to_thread(queue.reserve, 5)
+        if reserved is None:
+            continue
+
+        raw, job = reserved
+        try:
+            await process_final_callback(job)
+        except Exception as e:
+            retried = await asyncio.to_thread(queue.fail, raw, job, repr(e))
+            if not retried:
+                CALLBACK_DEAD_LETTERED.inc()
+            print(f"[worker {worker_id}] job {job.get('job_id')} failed ({e!r}), retried={retried}")
+        else:
+            await asyncio.to_thread(queue.ack, raw)
+            print(f"[worker {worker_id}] job {job.get('job_id')} done")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Final callback worker")
+    parser.add_argument("--replay-dead", type=int, nargs="?", const=-1, default=None, metavar="N",
+                        help="re-queue N dead-lettered callbacks (all when N is omitted) and exit")
+    args = parser.parse_args()
+
+    if args.replay_dead is not None:
+        limit = None if args.replay_dead < 0 else args.replay_dead
+        print(f"Re-queued {final_callback_queue.replay_dead(limit)} dead-lettered jobs")
+        return
+
+    moved = final_callback_queue.requeue_processing()
+    if moved:
+        print(f"Re-queued {moved} unfinished jobs")
+
+    if WORKER_METRICS_PORT:
+        start_http_server(WORKER_METRICS_PORT)
+
+    print(f"Callback worker started, concurrency={WORKER_CONCURRENCY}")
+    try:
+        await asyncio.gather(*(worker_loop(final_callback_queue, i) for i in range(WORKER_CONCURRENCY)))
+    finally:
+        await close_http_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,50 @@
+"""
+Shared test setup. The image copies src/ to app/ (see Dockerfile); the same package name is
+mapped here so tests import `app.*` like the running service. Nothing here touches the network:
+sessions use the in-memory store and LLM calls go to benchmarks/fake_openai.py in-process.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import types
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("SESSION_STORE_BACKEND", "memory")
+os.environ.setdefault("CALLBACK_QUEUE", "inline")
+os.environ.setdefault("REPLY_CACHE_BACKEND", "off")
+os.environ.setdefault("FAKE_LLM_LATENCY_MS", "0")
+os.environ.setdefault("FAKE_LLM_JITTER_MS", "0")
+os.environ.setdefault("FAKE_LLM_CHUNK_MS", "0")
+
+if "app" not in sys.modules:
+    app_pkg = types.ModuleType("app")
+    app_pkg.__path__ = [str(ROOT / "src")]
+    sys.modules["app"] = app_pkg
+sys.path.insert(0, str(ROOT))
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+from openai import AsyncOpenAI  # noqa: E402
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    """
+    Point the extractor/summary client at benchmarks/fake_openai.py over an in-process ASGI
+    transport. Yields the stub's per-kind call counter.
+    """
+    from benchmarks import fake_openai as stub
+    import app.tools.summarize as summarize
+
+    stub.calls.clear()
+    client = AsyncOpenAI(
+        api_key="test",
+        base_url="http://fake-openai/v1",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=stub.app), base_url="http://fake-openai/v1"),
+    )
+    monkeypatch.setattr(summarize, "client", client)
+    yield stub.calls
@@ -0,0 +1,31 @@
+import json
+
+from app.callback_batcher import parse_acks
+
+IDS = ["s1", "s2"]
+
+
+def test_per_item_results():
+    body = json.dumps({"results": [{"sessionId": "s1", "status": "ok"}, {"sessionId": "s2", "status": "error"}]})
+    assert parse_acks(body, IDS) == {"s1": True, "s2": False}
+
+
+def test_ndjson_results():
+    body = '{"sessionId": "s1", "ok": true}\n{"sessionId": "s2", "status": "accepted"}\n'
+    assert parse_acks(body, IDS) == {"s1": True, "s2": True}
+
+
+def test_items_missing_from_results_are_not_acknowledged():
+    body = json.dumps({"results": [{"sessionId": "s1", "status": "ok"}, {"sessionId": "other", "status": "ok"}]})
+    assert parse_acks(body, IDS) == {"s1": True, "s2": False}
+
+
+def test_batch_status_applies_to_every_item():
+    assert parse_acks('{"status": "success"}', IDS) == {"s1": True, "s2": True}
+    assert parse_acks('{"status": "error", "message": "invalid payload"}', IDS) == {"s1": False, "s2": False}
+
+
+def test_unrecognised_body_is_not_an_acknowledgement():
+    for body in ["", "<html>502</html>", '{"received": 2}']:
+        assert parse_acks(body, IDS) == {"s1": False, "s2": False}
+    assert parse_acks("", IDS, empty_ack=True) == {"s1": True, "s2": True}
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from app.tools.extract_tool import (
+    confident_entities,
+    extract_entities_detailed,
+    extract_entities_tiered,
+    needs_llm_extraction,
+)
+
+
+@pytest.mark.parametrize("text, field, value", [
+    ("visit sbi-update.com to verify", "phishingLinks", "sbi-update.com"),
+    ("open bit.ly/3xYz now", "phishingLinks", "bit.ly/3xYz"),
+    ("go to paytm-kyc.in", "phishingLinks", "paytm-kyc.in"),
+    ("click https://x.co/a.", "phishingLinks", "https://x.co/a"),
+    ("upi id: rahul at ybl", "upiIds", "rahul@ybl"),
+    ("pay 9876543210@ybl now", "upiIds", "9876543210@ybl"),
+    ("mail abc@gmail.com", "emailAddresses", "abc@gmail.com"),
+    ("call me on +91 98765 43210", "phoneNumbers", "+91 98765 43210"),
+    ("Transfer to a/c 123456789012 IFSC SBIN0001234", "bankAccounts", "123456789012"),
+])
+def test_confident_entities_stay_local(text, field, value):
+    result = extract_entities_detailed(text)
+    assert confident_entities(result)[field] == [value]
+    assert not needs_llm_extraction(result)
+
+
+def test_bare_digit_run_needs_account_context():
+    result = extract_entities_detailed("amount 10000000000")
+    assert confident_entities(result)["bankAccounts"] == []
+    assert result["confidence"]["bankAccounts"]["10000000000"] < 0.5
+    assert needs_llm_extraction(result)
+
+
+def test_upi_handle_digits_are_not_a_phone_or_account():
+    bits = confident_entities(extract_entities_detailed("pay 9876543210@ybl now"))
+    assert bits["phoneNumbers"] == [] and bits["bankAccounts"] == []
+
+
+@pytest.mark.parametrize("text", ["rahul at the rate of okaxis", "send otp to 98xx [dot] com"])
+def test_obfuscated_spans_escalate(text):
+    result = extract_entities_detailed(text)
+    assert result["ambiguousSpans"]
+    assert needs_llm_extraction(result)
+
+
+@pytest.mark.parametrize("text", ["meet at sbi branch", "ok sir.please send", "Rs.500 only, e.g. now"])
+def test_plain_text_is_not_intel(text):
+    result = extract_entities_detailed(text)
+    assert not any(confident_entities(result).values())
+    assert not needs_llm_extraction(result)
+
+
+def test_tiered_calls_llm_only_when_escalating(fake_openai):
+    bits = asyncio.run(extract_entities_tiered("pay 9876543210@ybl now"))
+    assert bits["upiIds"] == ["9876543210@ybl"]
+    assert fake_openai["extract"] == 0
+
+    bits = asyncio.run(extract_entities_tiered("amount 10000000000"))
+    assert fake_openai["extract"] == 1
+    # The stub finds nothing, so the unconfirmed digit run is not reported
+    assert bits["bankAccounts"] == []
@@ -0,0 +1,71 @@
+import asyncio
+
+from app.pydantic_models import ExtractedIntelligence
+from app.reply_cache import ReplyCache, normalise_text
+
+SCRIPT = "Dear customer your SBI account will be blocked today. Share the OTP sent to 9876543210 to verify KYC now"
+VARIANTS = ["Which bank sir?", "Why blocked? I paid everything.", "Wait, what is KYC?"]
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+async def _store(cache, text, replies, state="START"):
+    for reply in replies:
+        await cache.store_reply(text, state, "English", ExtractedIntelligence(), reply)
+
+
+async def _lookup(cache, text, state="START"):
+    return await cache.lookup_reply(text, state, "English", ExtractedIntelligence())
+
+
+def test_normalise_folds_numbers_links_and_handles():
+    assert normalise_text("Pay 500 to a@ybl via https://x.in/p") == normalise_text("pay 9999 to b@okaxis via www.y.com")
+
+
+def test_key_answers_only_after_min_variants():
+    async def run():
+        cache = ReplyCache(min_variants=3, similarity=0.8)
+        await _store(cache, SCRIPT, VARIANTS[:2])
+        assert await _lookup(cache, SCRIPT) is None
+        await _store(cache, SCRIPT, VARIANTS[2:])
+        assert await _lookup(cache, SCRIPT) in VARIANTS
+
+    _run(run())
+
+
+def test_duplicate_replies_count_once():
+    async def run():
+        cache = ReplyCache(min_variants=2)
+        await _store(cache, SCRIPT, [VARIANTS[0], VARIANTS[0]])
+        assert await _lookup(cache, SCRIPT) is None
+
+    _run(run())
+
+
+def test_campaign_copy_with_other_numbers_is_an_exact_hit():
+    async def run():
+        cache = ReplyCache(min_variants=3, near_dup=False)
+        await _store(cache, SCRIPT, VARIANTS)
+        assert await _lookup(cache, SCRIPT.replace("9876543210", "9123456780")) in VARIANTS
+
+    _run(run())
+
+
+def test_near_duplicate_lookup():
+    near = "Dear customer, your SBI account will be blocked today!! Share OTP sent to 9876543210 to verify KYC now"
+
+    async def run():
+        cache = ReplyCache(min_variants=3, similarity=0.8)
+        await _store(cache, SCRIPT, VARIANTS)
+        assert await _lookup(cache, near) in VARIANTS
+        assert await _lookup(cache, "Congratulations you won a lottery of 25 lakh, pay the processing fee") is None
+        # Other conversation states never share replies
+        assert await _lookup(cache, near, state="PAYMENT") is None
+
+        exact_only = ReplyCache(min_variants=3, near_dup=False)
+        await _store(exact_only, SCRIPT, VARIANTS)
+        assert await _lookup(exact_only, near) is None
+
+    _run(run())
@@ -0,0 +1,199 @@
+import asyncio
+import json
+
+import pytest
+
+from app.session_store import (
+    InMemorySessionStore,
+    SessionConflictError,
+    SessionState,
+    TieredSessionStore,
+    _copy_state,
+    _SessionCodec,
+)
+
+
+class _Codec(_SessionCodec):
+    prefix = "session:"
+
+
+def _loaded_at(version):
+    st = SessionState(session_id="s1", version=version)
+    st._persisted = {"scalars": {"version": json.dumps(version)}, "history": [], "intel": {}}
+    return st
+
+
+def test_codec_bumps_matching_version():
+    assert _Codec()._check_version(_loaded_at(3), json.dumps(3)) == 4
+
+
+def test_codec_rejects_stale_version():
+    with pytest.raises(SessionConflictError):
+        _Codec()._check_version(_loaded_at(3), json.dumps(4))
+
+
+def test_codec_rejects_new_state_over_existing_session():
+    with pytest.raises(SessionConflictError):
+        _Codec()._check_version(SessionState(session_id="s1"), json.dumps(1))
+
+
+def test_codec_recreates_expired_session():
+    assert _Codec()._check_version(_loaded_at(3), None) == 4
+    assert _Codec()._check_version(SessionState(session_id="s1"), None) == 1
+
+
+class _RecordingPipe:
+    def __init__(self):
+        self.ops = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.ops.append((name, args, kwargs))
+
+
+def test_codec_writes_only_the_delta():
+    codec = _Codec()
+    st = SessionState(session_id="s1", conversationHistory=[{"text": "a"}], history_len=1)
+    st._persisted = codec._queue_delta(_RecordingPipe(), st)
+
+    st.conversationHistory.append({"text": "b"})
+    st.history_len = 2
+    pipe = _RecordingPipe()
+    codec._queue_delta(pipe, st)
+
+    writes = [op for op in pipe.ops if op[0] != "expire"]
+    assert ("rpush", ("session:s1:history", json.dumps({"text": "b"})), {}) in writes
+    assert not any(op[0] in ("delete", "sadd", "srem") for op in writes)
+    (hset,) = [op for op in writes if op[0] == "hset"]
+    assert set(hset[2]["mapping"]) == {"history_len"}
+
+
+def test_memory_store_rejects_stale_save():
+    store = InMemorySessionStore()
+    first = store.get_or_create("s1")
+    second = store.get_or_create("s1")
+    store.save(first)
+    with pytest.raises(SessionConflictError):
+        store.save(second)
+
+
+def test_memory_store_evicts_least_recently_used():
+    store = InMemorySessionStore(max_sessions=2)
+    store.get_or_create("a")
+    store.get_or_create("b")
+    store.get_or_create("a")
+    store.get_or_create("c")
+    assert store.peek("b") is None
+    assert store.peek("a") is not None
+
+
+class _FakeFar:
+    """AsyncRedisSessionStore stand-in: dict storage with the same optimistic version check."""
+
+    def __init__(self):
+        self.rows = {}
+
+    async def _load(self, session_id):
+        row = self.rows.get(session_id)
+        if row is None:
+            return None
+        st = _copy_state(row)
+        st._persisted = {"version": row.version}
+        return st
+
+    async def get_or_create(self, session_id):
+        st = await self._load(session_id)
+        if st is None:
+            st = SessionState(session_id=session_id)
+            await self.save(st)
+        return st
+
+    async def save(self, st):
+        current = self.rows.get(st.session_id)
+        expected = st._persisted["version"] if st._persisted else None
+        if current is not None and current.version != expected:
+            raise SessionConflictError(st.session_id)
+        st.version = (expected or 0) + 1
+        self.rows[st.session_id] = _copy_state(st)
+        st._persisted = {"version": st.version}
+
+    async def close(self):
+        pass
+
+
+def _tiered(max_sessions=100):
+    store = TieredSessionStore(flush_interval_ms=60_000)
+    store.far = _FakeFar()
+    store.near = InMemorySessionStore(max_sessions=max_sessions)
+    return store
+
+
+async def _turn(store, session_id, text):
+    st = await store.get_or_create(session_id)
+    st.conversationHistory.append({"text": text})
+    st.history_len += 1
+    st.agent_turns += 1
+    await store.save(st)
+
+
+def test_tiered_flush_writes_behind():
+    async def run():
+        store = _tiered()
+        await _turn(store, "s1", "one")
+        await _turn(store, "s1", "two")
+        assert [m["text"] for m in store.far.rows["s1"].conversationHistory] == []
+        await store.flush()
+        assert [m["text"] for m in store.far.rows["s1"].conversationHistory] == ["one", "two"]
+        await store.close()
+
+    asyncio.run(run())
+
+
+def test_tiered_trims_snapshots_least_recently_used_first():
+    async def run():
+        store = _tiered(max_sessions=2)
+        await _turn(store, "s0", "a")
+        await _turn(store, "s1", "a")
+        await store.flush()
+        await _turn(store, "s0", "b")  # s0 is the active one
+        await _turn(store, "s2", "a")
+        await store.flush()
+        assert list(store._far_states) == ["s0", "s2"]
+
+        # A session whose snapshot was trimmed reloads it instead of writing at version 0
+        await _turn(store, "s1", "b")
+        await store.flush()
+        assert [m["text"] for m in store.far.rows["s1"].conversationHistory] == ["a", "b"]
+        await store.close()
+
+    asyncio.run(run())
+
+
+def test_tiered_merges_a_conflicting_write():
+    async def run():
+        store = _tiered()
+        await _turn(store, "s1", "first")
+        await store.flush()
+
+        # Another replica writes the session in the meantime
+        other = await store.far._load("s1")
+        other.conversationHistory.append({"text": "other replica"})
+        other.history_len += 1
+        other.extracted.upiIds.append("b@ybl")
+        await store.far.save(other)
+
+        st = await store.get_or_create("s1")
+        st.conversationHistory.append({"text": "ours"})
+        st.history_len += 1
+        st.extracted.upiIds.append("a@ybl")
+        await store.save(st)
+        await store.flush()
+
+        row = store.far.rows["s1"]
+        assert [m["text"] for m in row.conversationHistory] == ["first", "other replica", "ours"]
+        assert row.history_len == 3
+        assert sorted(row.extracted.upiIds) == ["a@ybl", "b@ybl"]
+        # The near copy is dropped so the next turn reads the merged state
+        assert store.near.peek("s1") is None
+        await store.close()
+
+    asyncio.run(run())
@@ -0,0 +1,38 @@
+import pytest
+
+from app.state_engine import IntentScanner
+
+SCANNER = IntentScanner({
+    "otp": ("otp",),
+    "pay": ("pay", "upi pin"),
+    "block": ("block",),
+    "hindi": ("ओटीपी",),
+})
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("share the OTP now", {"otp"}),
+    ("otp.", {"otp"}),
+    ("(otp)", {"otp"}),
+    ("enter upi pin", {"pay"}),
+    ("please pay today", {"pay"}),
+    ("ओटीपी बताइए", {"hindi"}),
+])
+def test_matches_whole_words(text, expected):
+    assert SCANNER.scan(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "hotpot for dinner",      # otp inside a word
+    "my payslip is late",     # pay as a prefix
+    "use paytm instead",
+    "repay the loan",         # pay as a suffix
+    "blockchain course",
+    "otpx",
+])
+def test_ignores_terms_inside_words(text):
+    assert SCANNER.scan(text) == frozenset()
+
+
+def test_casefold_and_nfkc():
+    assert SCANNER.scan("ＯＴＰ please") == {"otp"}